@@ -1,5 +1,8 @@
 from django.contrib import admin
-from .models import AttendanceRecord, AttendanceSession, Holiday
+from .models import (
+    AttendanceRecord, AttendanceMonthlySummary, ArchivedPartition, AttendanceSession, CheckEvent,
+    Holiday, StudentAttendanceAnalytics
+)
 
 
 @admin.register(AttendanceRecord)
@@ -17,6 +20,44 @@ class AttendanceRecordAdmin(admin.ModelAdmin):
     readonly_fields = ['created_at', 'updated_at']
 
 
+@admin.register(AttendanceMonthlySummary)
+class AttendanceMonthlySummaryAdmin(admin.ModelAdmin):
+    list_display = [
+        'user', 'month', 'present_days', 'absent_days', 'late_days',
+        'worked_time', 'check_in_count'
+    ]
+    list_filter = ['month', 'user__user_type', 'user__department']
+    search_fields = ['user__username', 'user__email']
+    readonly_fields = ['updated_at']
+
+
+@admin.register(StudentAttendanceAnalytics)
+class StudentAttendanceAnalyticsAdmin(admin.ModelAdmin):
+    list_display = [
+        'user', 'attendance_rate', 'recent_rate', 'late_rate',
+        'current_absence_streak', 'at_risk', 'computed_at'
+    ]
+    list_filter = ['at_risk']
+    search_fields = ['user__username', 'user__email']
+    readonly_fields = ['computed_at']
+
+
+@admin.register(CheckEvent)
+class CheckEventAdmin(admin.ModelAdmin):
+    list_display = ['user', 'timestamp', 'source', 'confidence_score', 'location', 'projected']
+    list_filter = ['source', 'projected']
+    search_fields = ['user__username', 'user__email']
+    date_hierarchy = 'timestamp'
+    readonly_fields = ['user', 'timestamp', 'source', 'confidence_score', 'location', 'projected', 'created_at']
+
+
+@admin.register(ArchivedPartition)
+class ArchivedPartitionAdmin(admin.ModelAdmin):
+    list_display = ['table', 'start_date', 'end_date', 'row_count', 'path', 'created_at']
+    list_filter = ['table']
+    readonly_fields = ['table', 'start_date', 'end_date', 'path', 'row_count', 'summary', 'created_at']
+
+
 @admin.register(AttendanceSession)
 class AttendanceSessionAdmin(admin.ModelAdmin):
     list_display = ['name', 'start_time', 'end_time', 'is_active', 'created_by', 'location']
@@ -0,0 +1,228 @@
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from students.models import Student
+from .archive import ATTENDANCE_TABLE, load_archived
+from .models import AttendanceRecord, StudentAttendanceAnalytics
+from .working_days import working_dates
+
+# int8 codes of the status matrix (they fit in 2 bits); NO_RECORD is a
+# working day without an attendance row
+NO_RECORD = 0
+STATUS_CODES = {
+    'present': 1,
+    'late': 2,
+    'absent': 3,
+}
+
+
+class StatusMatrix:
+    """
+    Students x working days attendance as int8 status codes.
+
+    codes[i, j] is the status of user_ids[i] on dates[j]; enrolled[i, j] is
+    False for days before the student's admission, which no metric counts.
+    """
+
+    def __init__(self, user_ids, dates, codes, enrolled):
+        self.user_ids = user_ids
+        self.dates = dates
+        self.codes = codes
+        self.enrolled = enrolled
+
+
+def _fill(codes, row_of, column_of, user_ids, offsets, statuses):
+    """Write (user, day offset, status code) triples into codes, skipping unknown users and non-working days"""
+    import numpy as np
+
+    if not len(user_ids):
+        return
+    rows = np.searchsorted(row_of, user_ids)
+    rows = np.minimum(rows, len(row_of) - 1)
+    columns = column_of[offsets]
+    keep = (row_of[rows] == user_ids) & (columns >= 0)
+    codes[rows[keep], columns[keep]] = statuses[keep]
+
+
+def load_status_matrix(start_date, end_date, user_ids=None):
+    """
+    Load active students' statuses for the working days in [start_date,
+    end_date] with one query over attendance_records (plus the roster),
+    merging archived months from the archive files
+    """
+    import numpy as np
+
+    students = Student.objects.filter(is_active=True, user__is_active=True)
+    if user_ids is not None:
+        students = students.filter(user_id__in=user_ids)
+    roster = list(students.order_by('user_id').values_list('user_id', 'admission_date'))
+
+    dates = working_dates(start_date, end_date)
+    span = (end_date - start_date).days + 1
+    column_of = np.full(span, -1, dtype=np.int64)
+    column_of[[(day - start_date).days for day in dates]] = np.arange(len(dates))
+
+    row_of = np.array([user_id for user_id, _ in roster], dtype=np.int64)
+    codes = np.zeros((len(roster), len(dates)), dtype=np.int8)
+    admitted = np.array([admission for _, admission in roster], dtype='datetime64[D]')
+    enrolled = np.array(dates, dtype='datetime64[D]')[None, :] >= admitted[:, None]
+    if not roster or not dates:
+        return StatusMatrix(row_of, dates, codes, enrolled)
+
+    rows = list(
+        AttendanceRecord.objects.filter(
+            date__range=[start_date, end_date],
+            user_id__in=students.values('user_id')
+        ).values_list('user_id', 'date', 'status')
+    )
+    status_code = np.vectorize(lambda status: STATUS_CODES.get(status, NO_RECORD), otypes=[np.int8])
+    if rows:
+        _fill(
+            codes, row_of, column_of,
+            np.fromiter((row[0] for row in rows), dtype=np.int64, count=len(rows)),
+            np.fromiter(((row[1] - start_date).days for row in rows), dtype=np.int64, count=len(rows)),
+            status_code(np.array([row[2] for row in rows]))
+        )
+
+    archived = load_archived(ATTENDANCE_TABLE, start_date, end_date)
+    if archived is not None and len(archived['user_id']):
+        _fill(
+            codes, row_of, column_of,
+            archived['user_id'],
+            (archived['date'] - np.datetime64(start_date)).astype(np.int64),
+            status_code(archived['status'])
+        )
+    return StatusMatrix(row_of, dates, codes, enrolled)
+
+
+def _window_sums(values, window):
+    """Sum of each run of `window` consecutive columns, via one cumulative sum"""
+    import numpy as np
+
+    totals = np.zeros((values.shape[0], values.shape[1] + 1), dtype=np.int32)
+    np.cumsum(values, axis=1, out=totals[:, 1:])
+    return totals[:, window:] - totals[:, :-window]
+
+
+def compute_metrics(matrix, window=20):
+    """
+    All students' metrics in one vectorized pass over the status matrix.
+    Working days without a record count as absences.
+    Returns:
+        dict: metric name -> array with one value per student
+    """
+    import numpy as np
+
+    codes, enrolled = matrix.codes, matrix.enrolled
+    student_count, day_count = codes.shape
+    attended = ((codes == STATUS_CODES['present']) | (codes == STATUS_CODES['late'])) & enrolled
+    late = (codes == STATUS_CODES['late']) & enrolled
+    absent = enrolled & ~attended
+
+    days = enrolled.sum(axis=1)
+    attended_days = attended.sum(axis=1)
+    attendance_rate = attended_days / np.maximum(days, 1)
+    late_rate = late.sum(axis=1) / np.maximum(attended_days, 1)
+
+    # Rolling attendance rate; the change compares the last window to the one before it
+    window = max(1, min(window, day_count))
+    if day_count:
+        rolling = _window_sums(attended, window) / np.maximum(_window_sums(enrolled, window), 1)
+        recent_rate = rolling[:, -1]
+        if rolling.shape[1] > window:
+            rate_change = recent_rate - rolling[:, -1 - window]
+        else:
+            rate_change = np.zeros(student_count)
+    else:
+        recent_rate = rate_change = np.zeros(student_count)
+
+    # Least-squares slope of the late indicator over enrolled days, scaled to a window
+    x = np.arange(day_count, dtype=np.float64)
+    weights = enrolled.astype(np.float64)
+    y = late.astype(np.float64)
+    n = weights.sum(axis=1)
+    sum_x = weights @ x
+    sum_y = y.sum(axis=1)
+    sum_xx = weights @ (x * x)
+    sum_xy = y @ x
+    denominator = n * sum_xx - sum_x * sum_x
+    slope = np.divide(
+        n * sum_xy - sum_x * sum_y, denominator,
+        out=np.zeros(student_count), where=denominator > 0
+    )
+    late_trend = slope * window
+
+    # Absence runs: distance to the last day that was not an absence
+    index = np.arange(day_count)
+    if day_count:
+        last_break = np.maximum.accumulate(np.where(absent, -1, index[None, :]), axis=1)
+        run = index[None, :] - last_break
+        longest_streak = run.max(axis=1)
+        current_streak = run[:, -1]
+    else:
+        longest_streak = current_streak = np.zeros(student_count, dtype=np.int64)
+
+    return {
+        'working_days': days,
+        'attendance_rate': attendance_rate,
+        'recent_rate': recent_rate,
+        'rate_change': rate_change,
+        'late_rate': late_rate,
+        'late_trend': late_trend,
+        'longest_absence_streak': longest_streak,
+        'current_absence_streak': current_streak,
+    }
+
+
+def risk_flags(metrics):
+    """
+    Boolean array per risk reason: chronic absence (rate below the
+    threshold), an ongoing absence streak and a sharp recent decline
+    """
+    return {
+        'chronic_absence': metrics['attendance_rate'] < getattr(settings, 'ATTENDANCE_AT_RISK_RATE', 0.9),
+        'absence_streak': (
+            metrics['current_absence_streak'] >= getattr(settings, 'ATTENDANCE_AT_RISK_STREAK', 3)
+        ),
+        'declining': metrics['rate_change'] <= -getattr(settings, 'ATTENDANCE_AT_RISK_DECLINE', 0.1),
+    }
+
+
+def refresh_analytics(start_date, end_date, batch_size=1000):
+    """
+    Recompute every active student's metrics for [start_date, end_date]
+    and replace the cached rows.
+    Returns:
+        int: students analysed
+    """
+    matrix = load_status_matrix(start_date, end_date)
+    metrics = compute_metrics(matrix, getattr(settings, 'ATTENDANCE_ANALYTICS_WINDOW', 20))
+    flags = risk_flags(metrics)
+
+    now = timezone.now()
+    rows = []
+    for i, user_id in enumerate(matrix.user_ids.tolist()):
+        if not metrics['working_days'][i]:
+            continue  # admitted after the range
+        reasons = [reason for reason, flagged in flags.items() if flagged[i]]
+        rows.append(StudentAttendanceAnalytics(
+            user_id=user_id,
+            start_date=start_date,
+            end_date=end_date,
+            working_days=int(metrics['working_days'][i]),
+            attendance_rate=round(float(metrics['attendance_rate'][i]), 4),
+            recent_rate=round(float(metrics['recent_rate'][i]), 4),
+            rate_change=round(float(metrics['rate_change'][i]), 4),
+            late_rate=round(float(metrics['late_rate'][i]), 4),
+            late_trend=round(float(metrics['late_trend'][i]), 4),
+            longest_absence_streak=int(metrics['longest_absence_streak'][i]),
+            current_absence_streak=int(metrics['current_absence_streak'][i]),
+            at_risk=bool(reasons),
+            risk_reasons=reasons,
+            computed_at=now,
+        ))
+
+    with transaction.atomic():
+        StudentAttendanceAnalytics.objects.all().delete()
+        StudentAttendanceAnalytics.objects.bulk_create(rows, batch_size=batch_size)
+    return len(rows)
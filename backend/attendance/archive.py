@@ -0,0 +1,442 @@
+import io
+import os
+import threading
+from collections import defaultdict
+from datetime import datetime, time, timedelta, timezone as dt_timezone
+from functools import lru_cache
+from time import monotonic
+from django.conf import settings
+from django.db import connections, router, transaction
+from django.utils import timezone
+from face_recognition_app.models import FaceRecognitionLog
+from .models import AttendanceRecord, ArchivedPartition
+from .summaries import STATUS_FIELDS, month_start, next_month
+
+ATTENDANCE_TABLE = AttendanceRecord._meta.db_table
+LOG_TABLE = FaceRecognitionLog._meta.db_table
+
+# Column name -> storage kind. Nulls become -1 (int), NaT (date/datetime), NaN (float) or '' (str).
+COLUMNS = {
+    ATTENDANCE_TABLE: {
+        'id': 'int',
+        'user_id': 'int',
+        'date': 'date',
+        'check_in_time': 'datetime',
+        'check_out_time': 'datetime',
+        'status': 'str',
+        'marked_by_face_recognition': 'bool',
+        'confidence_score': 'float',
+        'location': 'str',
+        'notes': 'str',
+        'created_at': 'datetime',
+        'updated_at': 'datetime',
+    },
+    LOG_TABLE: {
+        'id': 'int',
+        'user_id': 'int',
+        'status': 'str',
+        'confidence_score': 'float',
+        'image_path': 'str',
+        'location': 'str',
+        'timestamp': 'datetime',
+        'error_message': 'str',
+        'processing_time': 'float',
+    },
+}
+MODELS = {
+    ATTENDANCE_TABLE: AttendanceRecord,
+    LOG_TABLE: FaceRecognitionLog,
+}
+
+
+def archive_root():
+    return getattr(settings, 'ATTENDANCE_ARCHIVE_ROOT', os.path.join(settings.BASE_DIR, 'archive'))
+
+
+def _local_day_bounds(start_date, end_date):
+    start = timezone.make_aware(datetime.combine(start_date, time.min))
+    end = timezone.make_aware(datetime.combine(end_date + timedelta(days=1), time.min))
+    return start, end
+
+
+def _hot_rows(table, start_date, end_date):
+    if table == ATTENDANCE_TABLE:
+        queryset = AttendanceRecord.objects.filter(date__range=[start_date, end_date])
+    else:
+        start, end = _local_day_bounds(start_date, end_date)
+        queryset = FaceRecognitionLog.objects.filter(timestamp__gte=start, timestamp__lt=end)
+    return queryset.order_by('id').values_list(*COLUMNS[table])
+
+
+def _to_columns(table, rows):
+    """Turn row tuples into one numpy array per column (plus derived columns)"""
+    import numpy as np
+
+    columns = {}
+    for index, (name, kind) in enumerate(COLUMNS[table].items()):
+        values = [row[index] for row in rows]
+        if kind == 'int':
+            columns[name] = np.array([-1 if value is None else value for value in values], dtype=np.int64)
+        elif kind == 'float':
+            columns[name] = np.array([np.nan if value is None else value for value in values], dtype=np.float64)
+        elif kind == 'bool':
+            columns[name] = np.array(values, dtype=bool)
+        elif kind == 'str':
+            columns[name] = np.array(['' if value is None else value for value in values], dtype=str)
+        elif kind == 'date':
+            columns[name] = np.array(
+                [np.datetime64('NaT') if value is None else value for value in values],
+                dtype='datetime64[D]'
+            )
+        else:
+            # Stored as naive UTC; numpy has no time zone support
+            columns[name] = np.array(
+                [
+                    np.datetime64('NaT') if value is None
+                    else value.astimezone(dt_timezone.utc).replace(tzinfo=None)
+                    for value in values
+                ],
+                dtype='datetime64[us]'
+            )
+
+    # Local values that the readers need but cannot derive from UTC cheaply
+    names = list(COLUMNS[table])
+    if table == ATTENDANCE_TABLE:
+        check_in = names.index('check_in_time')
+        local_check_ins = [timezone.localtime(row[check_in]) if row[check_in] else None for row in rows]
+        columns['check_in_seconds'] = np.array(
+            [
+                -1 if value is None else value.hour * 3600 + value.minute * 60 + value.second
+                for value in local_check_ins
+            ],
+            dtype=np.int32
+        )
+    else:
+        timestamp = names.index('timestamp')
+        columns['date'] = np.array(
+            [timezone.localdate(row[timestamp]) for row in rows], dtype='datetime64[D]'
+        )
+    return columns
+
+
+def _summarize(table, columns):
+    """Totals kept on the manifest row so stats don't need to open the file"""
+    import numpy as np
+
+    statuses, counts = np.unique(columns['status'], return_counts=True)
+    summary = {'status_counts': {str(status): int(count) for status, count in zip(statuses, counts)}}
+    if table == LOG_TABLE:
+        timed = columns['processing_time'][~np.isnan(columns['processing_time'])]
+        summary['processing_time_total'] = float(timed.sum())
+        summary['processing_time_count'] = int(timed.size)
+    return summary
+
+
+def _write_file(relative_path, columns):
+    import numpy as np
+
+    absolute_path = os.path.join(archive_root(), relative_path)
+    os.makedirs(os.path.dirname(absolute_path), exist_ok=True)
+    buffer = io.BytesIO()
+    np.savez_compressed(buffer, **columns)
+    temp_path = f'{absolute_path}.tmp'
+    with open(temp_path, 'wb') as handle:
+        handle.write(buffer.getvalue())
+        handle.flush()
+        os.fsync(handle.fileno())
+    os.replace(temp_path, absolute_path)
+    return absolute_path
+
+
+def _delete_rows(table, ids, batch_size):
+    model = MODELS[table]
+    db = router.db_for_write(model)
+    connection = connections[db]
+    qn = connection.ops.quote_name
+    # Plain DELETEs: per-row signals would otherwise subtract the rows from the
+    # monthly summaries, which keep covering archived months
+    with connection.cursor() as cursor:
+        for offset in range(0, len(ids), batch_size):
+            batch = ids[offset:offset + batch_size]
+            cursor.execute(
+                f"DELETE FROM {qn(table)} WHERE {qn(model._meta.pk.column)} IN "
+                f"({', '.join(['%s'] * len(batch))})",
+                batch
+            )
+
+
+def archive_partition(table, start_date, end_date, batch_size=5000, dry_run=False):
+    """
+    Move one table's rows dated [start_date, end_date] into a compressed
+    .npz file and delete them from the table.
+
+    Returns:
+        int: rows archived (0 if there were none or the range is already archived)
+    """
+    if ArchivedPartition.objects.filter(table=table, start_date=start_date).exists():
+        return 0
+
+    rows = list(_hot_rows(table, start_date, end_date).iterator(chunk_size=batch_size))
+    if not rows or dry_run:
+        return len(rows)
+
+    columns = _to_columns(table, rows)
+    relative_path = os.path.join(table, f'{start_date:%Y}', f'{start_date:%Y-%m-%d}_{end_date:%Y-%m-%d}.npz')
+    absolute_path = _write_file(relative_path, columns)
+
+    try:
+        with transaction.atomic():
+            ArchivedPartition.objects.create(
+                table=table,
+                start_date=start_date,
+                end_date=end_date,
+                path=relative_path.replace(os.sep, '/'),
+                row_count=len(rows),
+                summary=_summarize(table, columns),
+            )
+            _delete_rows(table, [int(row_id) for row_id in columns['id']], batch_size)
+    except Exception:
+        os.remove(absolute_path)
+        raise
+    return len(rows)
+
+
+def archive_range(table, start_date, end_date, batch_size=5000, dry_run=False):
+    """
+    Archive [start_date, end_date] as one partition per calendar month
+    Returns:
+        list: (start_date, end_date, rows) for each partition
+    """
+    partitions = []
+    month = month_start(start_date)
+    while month <= end_date:
+        part_start = max(start_date, month)
+        part_end = min(end_date, next_month(month) - timedelta(days=1))
+        rows = archive_partition(table, part_start, part_end, batch_size, dry_run)
+        partitions.append((part_start, part_end, rows))
+        month = next_month(month)
+    return partitions
+
+
+@lru_cache(maxsize=32)
+def _read_file(path):
+    # Partition files never change once written, so they can be cached by path
+    import numpy as np
+
+    with np.load(os.path.join(archive_root(), path)) as data:
+        return {name: data[name] for name in data.files}
+
+
+_manifest = None
+_manifest_loaded_at = 0.0
+_manifest_lock = threading.Lock()
+
+
+def _partitions():
+    """
+    All archive partitions, cached: reports check the manifest on every call
+    and it only changes when a year is archived. Signals invalidate this
+    process; the TTL picks up partitions written by other processes.
+    """
+    global _manifest, _manifest_loaded_at
+    ttl = getattr(settings, 'ARCHIVE_MANIFEST_CACHE_TTL', 300)
+    with _manifest_lock:
+        if _manifest is None or monotonic() - _manifest_loaded_at > ttl:
+            _manifest = list(ArchivedPartition.objects.order_by('table', 'start_date'))
+            _manifest_loaded_at = monotonic()
+        return _manifest
+
+
+def invalidate_manifest():
+    global _manifest
+    with _manifest_lock:
+        _manifest = None
+
+
+def partitions_for(table, start_date, end_date):
+    return [
+        partition for partition in _partitions()
+        if partition.table == table and partition.start_date <= end_date and partition.end_date >= start_date
+    ]
+
+
+def load_archived(table, start_date, end_date, partitions=None):
+    """
+    Archived rows of a table dated [start_date, end_date] as a dict of
+    column arrays, or None if nothing in the range is archived
+    """
+    import numpy as np
+
+    if partitions is None:
+        partitions = partitions_for(table, start_date, end_date)
+    parts = [_read_file(partition.path) for partition in partitions]
+    if not parts:
+        return None
+
+    columns = {name: np.concatenate([part[name] for part in parts]) for name in parts[0]}
+    dates = columns['date']
+    mask = (dates >= np.datetime64(start_date)) & (dates <= np.datetime64(end_date))
+    return {name: values[mask] for name, values in columns.items()}
+
+
+def archived_status_counts(start_date, end_date):
+    """
+    Per-user present/absent/late counts from archived attendance in the range
+    Returns:
+        dict: user_id -> {'present_days': n, 'absent_days': n, 'late_days': n}
+    """
+    import numpy as np
+
+    columns = load_archived(ATTENDANCE_TABLE, start_date, end_date)
+    if columns is None:
+        return {}
+
+    counts = defaultdict(lambda: dict.fromkeys(STATUS_FIELDS.values(), 0))
+    for status, field in STATUS_FIELDS.items():
+        user_ids, totals = np.unique(columns['user_id'][columns['status'] == status], return_counts=True)
+        for user_id, total in zip(user_ids.tolist(), totals.tolist()):
+            counts[user_id][field] = total
+    return dict(counts)
+
+
+def archived_totals(user_id, start_date, end_date):
+    """
+    The same totals as summaries.record_totals() over one user's archived
+    attendance, or None if nothing in the range is archived
+    """
+    partitions = partitions_for(ATTENDANCE_TABLE, start_date, end_date)
+    if not partitions:
+        return None
+    columns = load_archived(ATTENDANCE_TABLE, start_date, end_date, partitions)
+    return _totals(columns, columns['user_id'] == user_id)
+
+
+def archived_month_totals(month, user_ids=None):
+    """
+    Per-user totals of the archived part of one month, for summaries of
+    months archived only in part
+    Returns:
+        dict: user_id -> totals as in archived_totals()
+    """
+    import numpy as np
+
+    columns = load_archived(ATTENDANCE_TABLE, month, next_month(month) - timedelta(days=1))
+    if columns is None:
+        return {}
+    return {
+        user_id: _totals(columns, columns['user_id'] == user_id)
+        for user_id in np.unique(columns['user_id']).tolist()
+        if user_ids is None or user_id in user_ids
+    }
+
+
+def _totals(columns, mine):
+    import numpy as np
+
+    status = columns['status'][mine]
+    check_in = columns['check_in_time'][mine]
+    check_out = columns['check_out_time'][mine]
+    seconds = columns['check_in_seconds'][mine]
+
+    worked = (check_out > check_in) & ~np.isnat(check_in) & ~np.isnat(check_out)
+    worked_us = (check_out[worked] - check_in[worked]).astype('timedelta64[us]').astype(np.int64).sum()
+    return {
+        'present_days': int((status == 'present').sum()),
+        'absent_days': int((status == 'absent').sum()),
+        'late_days': int((status == 'late').sum()),
+        'worked_time': timedelta(microseconds=int(worked_us)),
+        'check_in_count': int((seconds >= 0).sum()),
+        'check_in_seconds': int(seconds[seconds >= 0].sum()),
+    }
+
+
+def archived_arrival_counts(start_date, end_date, bucket_minutes, user_ids=None):
+    """
+    Check-ins in archived attendance per (ISO weekday, time bucket), where
+    bucket is the minute of the day divided by bucket_minutes
+    Returns:
+        dict: (weekday, bucket) -> count
+    """
+    import numpy as np
+
+    partitions = partitions_for(ATTENDANCE_TABLE, start_date, end_date)
+    if not partitions:
+        return {}
+    columns = load_archived(ATTENDANCE_TABLE, start_date, end_date, partitions)
+    mask = columns['check_in_seconds'] >= 0
+    if user_ids is not None:
+        mask &= np.isin(columns['user_id'], np.fromiter(user_ids, dtype=np.int64))
+
+    # 1970-01-01 was a Thursday (ISO weekday 4)
+    weekdays = (columns['date'][mask].astype(np.int64) + 3) % 7 + 1
+    buckets = columns['check_in_seconds'][mask] // 60 // bucket_minutes
+    keys, counts = np.unique(np.stack([weekdays, buckets]), axis=1, return_counts=True)
+    return {(int(weekday), int(bucket)): int(count) for (weekday, bucket), count in zip(keys.T, counts)}
+
+
+def archived_log_summary():
+    """Status counts and processing time totals of all archived recognition logs"""
+    status_counts = defaultdict(int)
+    processing_total = 0.0
+    processing_count = 0
+    for partition in _partitions():
+        if partition.table != LOG_TABLE:
+            continue
+        summary = partition.summary
+        for status, count in summary.get('status_counts', {}).items():
+            status_counts[status] += count
+        processing_total += summary.get('processing_time_total', 0.0)
+        processing_count += summary.get('processing_time_count', 0)
+    return dict(status_counts), processing_total, processing_count
+
+
+def _archived_days_by_month():
+    """Month -> number of its days with archived attendance"""
+    days = defaultdict(int)
+    for partition in _partitions():
+        if partition.table != ATTENDANCE_TABLE:
+            continue
+        month = month_start(partition.start_date)
+        while month <= partition.end_date:
+            start = max(month, partition.start_date)
+            end = min(next_month(month) - timedelta(days=1), partition.end_date)
+            days[month] += (end - start).days + 1
+            month = next_month(month)
+    return days
+
+
+def archived_months():
+    """First days of months whose attendance is archived in full"""
+    return {
+        month for month, days in _archived_days_by_month().items()
+        if days >= (next_month(month) - month).days
+    }
+
+
+def partly_archived_months():
+    """First days of months with some, but not all, of their days archived"""
+    return set(_archived_days_by_month()) - archived_months()
+
+
+class ArchivedDateError(ValueError):
+    """An attendance write falls on an archived day"""
+
+
+def ensure_not_archived(dates):
+    """
+    Refuse attendance writes dated inside an archived partition. Partition
+    files are never rewritten, so such a row would stay out of the archive,
+    could duplicate an archived one and would be dropped by summary
+    rebuilds. Days after a partition that ends mid-month stay writable.
+    """
+    ranges = [
+        (partition.start_date, partition.end_date)
+        for partition in _partitions() if partition.table == ATTENDANCE_TABLE
+    ]
+    if not ranges:
+        return
+    for day in dates:
+        if isinstance(day, datetime):
+            day = timezone.localdate(day)
+        if any(start <= day <= end for start, end in ranges):
+            raise ArchivedDateError(f'Attendance for {day} is archived and can no longer be changed')
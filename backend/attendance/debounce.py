@@ -0,0 +1,161 @@
+import threading
+import time
+from collections import OrderedDict
+from django.conf import settings
+from django.utils import timezone
+from .services import submit_check
+
+
+class CheckDebouncer:
+    """
+    Per-user cooldown on attendance writes.
+
+    A check that lands within `window` seconds of the user's last one on
+    the same day is not written; the last result is returned instead, so a
+    student lingering in front of the camera neither rewrites the row nor
+    gets a spurious check-out. Cooldowns live in this process, or in a
+    Django cache (e.g. Redis) shared by all workers when one is given.
+
+    The cooldown is claimed before writing, in one atomic step (a lock
+    here, cache.add() in a shared cache), so of two simultaneous scans
+    only one is written.
+    """
+
+    # How long a suppressed scan waits for the result of a write in flight
+    wait = 1.0
+
+    def __init__(self, window, cache=None, max_entries=10000):
+        self.window = window
+        self.cache = cache
+        self.max_entries = max_entries
+        self.stats = {'written': 0, 'suppressed': 0}
+
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # user_id -> (expires_at, day, record, action), oldest first
+
+    def check(self, user, **kwargs):
+        """
+        submit_check() unless the user is cooling down
+        Returns:
+            tuple: (AttendanceRecord, action, suppressed); record and action
+            are None if a suppressed scan's concurrent write did not finish
+            within `wait` seconds
+        """
+        day = timezone.localdate(kwargs.get('when') or timezone.now())
+        cached = self._claim(user.pk, day)
+        if cached is not None:
+            # Another scan holds the cooldown; its write may still be running
+            deadline = time.monotonic() + self.wait
+            while cached[1] is None and time.monotonic() < deadline:
+                time.sleep(0.05)
+                cached = self._get(user.pk, day) or cached
+            with self._lock:
+                self.stats['suppressed'] += 1
+            return cached[1], cached[2], True
+
+        try:
+            record, action = submit_check(user, **kwargs)
+        except Exception:
+            self._release(user.pk, day)
+            raise
+        self._set(user.pk, day, (day, record, action))
+        with self._lock:
+            self.stats['written'] += 1
+        return record, action, False
+
+    def _claim(self, user_id, day):
+        """
+        Start the user's cooldown for day unless one is running. Returns
+        None if claimed, else the running cooldown's (day, record, action),
+        with record and action None while its write is in flight.
+        """
+        claim = (day, None, None)
+        if self.cache is not None:
+            if self.cache.add(self._key(user_id, day), claim, timeout=self.window):
+                return None
+            return self.cache.get(self._key(user_id, day)) or claim
+        with self._lock:
+            entry = self._current(user_id, day)
+            if entry is not None:
+                return entry
+            self._store(user_id, claim)
+            return None
+
+    def _get(self, user_id, day):
+        if self.cache is not None:
+            return self.cache.get(self._key(user_id, day))
+        with self._lock:
+            return self._current(user_id, day)
+
+    def _set(self, user_id, day, value):
+        if self.cache is not None:
+            self.cache.set(self._key(user_id, day), value, timeout=self.window)
+            return
+        with self._lock:
+            self._store(user_id, value)
+
+    def _release(self, user_id, day):
+        """Drop a claim whose write failed, so the next scan is written"""
+        if self.cache is not None:
+            self.cache.delete(self._key(user_id, day))
+            return
+        with self._lock:
+            if self._current(user_id, day) is not None:
+                del self._entries[user_id]
+
+    def _current(self, user_id, day):
+        # Caller holds self._lock. Every entry has the same lifetime, so
+        # expired ones are at the front.
+        now = time.monotonic()
+        while self._entries and next(iter(self._entries.values()))[0] <= now:
+            self._entries.popitem(last=False)
+        entry = self._entries.get(user_id)
+        if entry is None or entry[1] != day:
+            return None
+        return entry[1:]
+
+    def _store(self, user_id, value):
+        # Caller holds self._lock
+        self._entries.pop(user_id, None)
+        self._entries[user_id] = (time.monotonic() + self.window, *value)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    @staticmethod
+    def _key(user_id, day):
+        return f'attendance-check-debounce:{user_id}:{day.isoformat()}'
+
+
+_debouncer = None
+_debouncer_lock = threading.Lock()
+
+
+def get_debouncer():
+    """Return the process-wide check debouncer, or None when ATTENDANCE_CHECK_DEBOUNCE_SECONDS is 0"""
+    global _debouncer
+    window = getattr(settings, 'ATTENDANCE_CHECK_DEBOUNCE_SECONDS', 0)
+    if not window:
+        return None
+    if _debouncer is None:
+        with _debouncer_lock:
+            if _debouncer is None:
+                alias = getattr(settings, 'ATTENDANCE_CHECK_DEBOUNCE_CACHE', None)
+                if alias:
+                    from django.core.cache import caches
+                    cache = caches[alias]
+                else:
+                    cache = None
+                _debouncer = CheckDebouncer(window, cache)
+    return _debouncer
+
+
+def debounced_check(user, **kwargs):
+    """
+    submit_check() behind the cooldown when debouncing is on
+    Returns:
+        tuple: (AttendanceRecord, action, suppressed)
+    """
+    debouncer = get_debouncer()
+    if debouncer is None:
+        return (*submit_check(user, **kwargs), False)
+    return debouncer.check(user, **kwargs)
@@ -0,0 +1,129 @@
+from datetime import datetime, time, timedelta
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from .models import AttendanceRecord, CheckEvent, ProjectorState
+from .services import apply_scans, merge_scans
+from .status_rules import start_time_for
+
+PROJECTOR = 'check_events'
+
+
+def _scan(event):
+    return {
+        'user_id': event.user_id,
+        'timestamp': event.timestamp,
+        'location': event.location,
+        'confidence_score': event.confidence_score,
+        'marked_by_face_recognition': event.source == 'face_recognition',
+    }
+
+
+def _lock_projector():
+    """
+    Lock the projector's state row until the end of the transaction; other
+    projectors (and rebuilds) block here until this batch commits
+    """
+    ProjectorState.objects.get_or_create(name=PROJECTOR)
+    return ProjectorState.objects.select_for_update().get(name=PROJECTOR)
+
+
+def _day_bounds(start_date, end_date):
+    """Aware [start, end) datetimes covering the local days start_date..end_date"""
+    start = timezone.make_aware(datetime.combine(start_date, time.min))
+    end = timezone.make_aware(datetime.combine(end_date + timedelta(days=1), time.min))
+    return start, end
+
+
+def log_check(user, location='', marked_by_face_recognition=False, confidence_score=None, when=None):
+    """
+    Same contract as services.record_check(), but the scan is only appended
+    to check_events; the returned record is unsaved until the projector
+    folds the event in. Every scan is logged, repeats included.
+    """
+    when = when or timezone.now()
+    day = timezone.localdate(when)
+    scan = {
+        'user_id': user.pk,
+        'timestamp': when,
+        'location': location,
+        'confidence_score': confidence_score,
+        'marked_by_face_recognition': marked_by_face_recognition,
+    }
+
+    start_time = start_time_for(user.pk)
+    record = AttendanceRecord.objects.filter(user_id=user.pk, date=day).first()
+    if record is None:
+        record = AttendanceRecord(user_id=user.pk, date=day, notes='')
+    merge_scans(record, unprojected_scans(day, [user.pk]), start_time)
+    action = merge_scans(record, [scan], start_time)[0]
+
+    CheckEvent.objects.create(
+        user_id=user.pk,
+        timestamp=when,
+        source='face_recognition' if marked_by_face_recognition else 'manual',
+        confidence_score=confidence_score,
+        location=location,
+    )
+    return record, action
+
+
+def unprojected_scans(day, user_ids=None):
+    """Scans of day still waiting for the projector, in arrival order"""
+    start, end = _day_bounds(day, day)
+    events = CheckEvent.objects.filter(projected=False, timestamp__gte=start, timestamp__lt=end)
+    if user_ids is not None:
+        events = events.filter(user_id__in=user_ids)
+    return [_scan(event) for event in events.order_by('id')]
+
+
+def project_events(batch_size=None):
+    """
+    Fold unprojected events into attendance_records, one transaction and
+    one apply_scans() call per batch. Each batch holds the projector lock,
+    so concurrent projectors take turns instead of applying events twice.
+    Returns:
+        int: events projected
+    """
+    batch_size = batch_size or getattr(settings, 'ATTENDANCE_PROJECTOR_BATCH_SIZE', 1000)
+    projected = 0
+    while True:
+        with transaction.atomic():
+            state = _lock_projector()
+            events = list(CheckEvent.objects.filter(projected=False).order_by('id')[:batch_size])
+            if not events:
+                break
+            apply_scans([_scan(event) for event in events])
+            CheckEvent.objects.filter(id__in=[event.id for event in events]).update(projected=True)
+            state.last_event_id = max(state.last_event_id, events[-1].id)
+            state.save(update_fields=['last_event_id', 'updated_at'])
+        projected += len(events)
+        if len(events) < batch_size:
+            break
+    return projected
+
+
+def rebuild_projection(start_date, end_date, chunk_days=7):
+    """
+    Recompute the check-in/out (and so the status) of every record of
+    [start_date, end_date] that has events from its full event history,
+    e.g. after a rule change. Records without events are left alone.
+    Returns:
+        int: events folded
+    """
+    folded = 0
+    chunk_start = start_date
+    while chunk_start <= end_date:
+        chunk_end = min(chunk_start + timedelta(days=chunk_days - 1), end_date)
+        start, end = _day_bounds(chunk_start, chunk_end)
+        with transaction.atomic():
+            _lock_projector()
+            events = list(CheckEvent.objects.filter(timestamp__gte=start, timestamp__lt=end).order_by('id'))
+            if events:
+                apply_scans([_scan(event) for event in events], replace=True)
+                CheckEvent.objects.filter(
+                    id__in=[event.id for event in events if not event.projected]
+                ).update(projected=True)
+        folded += len(events)
+        chunk_start = chunk_end + timedelta(days=1)
+    return folded
@@ -0,0 +1,61 @@
+import csv
+from datetime import date, datetime
+from django.core.serializers.json import DjangoJSONEncoder
+
+# (column name in the export, values_list lookup)
+EXPORT_COLUMNS = [
+    ('id', 'id'),
+    ('user_id', 'user_id'),
+    ('username', 'user__username'),
+    ('date', 'date'),
+    ('check_in_time', 'check_in_time'),
+    ('check_out_time', 'check_out_time'),
+    ('status', 'status'),
+    ('marked_by_face_recognition', 'marked_by_face_recognition'),
+    ('confidence_score', 'confidence_score'),
+    ('location', 'location'),
+]
+EXPORT_CHUNK_SIZE = 2000
+
+CONTENT_TYPES = {
+    'csv': 'text/csv',
+    'ndjson': 'application/x-ndjson',
+}
+
+
+class Echo:
+    """File-like object whose write() hands the formatted line straight back"""
+
+    def write(self, value):
+        return value
+
+
+def _export_rows(queryset):
+    # values_list tuples through a chunked (server-side on PostgreSQL) cursor:
+    # no model instances, no serializers, constant memory
+    return queryset.values_list(*[lookup for _, lookup in EXPORT_COLUMNS]).iterator(
+        chunk_size=EXPORT_CHUNK_SIZE
+    )
+
+
+def iter_csv(queryset):
+    writer = csv.writer(Echo())
+    yield writer.writerow([name for name, _ in EXPORT_COLUMNS])
+    for row in _export_rows(queryset):
+        yield writer.writerow([
+            value.isoformat() if isinstance(value, (date, datetime)) else value
+            for value in row
+        ])
+
+
+def iter_ndjson(queryset):
+    names = [name for name, _ in EXPORT_COLUMNS]
+    encoder = DjangoJSONEncoder()
+    for row in _export_rows(queryset):
+        yield encoder.encode(dict(zip(names, row))) + '\n'
+
+
+EXPORT_FORMATS = {
+    'csv': iter_csv,
+    'ndjson': iter_ndjson,
+}
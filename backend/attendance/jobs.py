@@ -0,0 +1,189 @@
+import hashlib
+import json
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import IntegrityError, close_old_connections, transaction
+from django.db.models import Count, Max
+from django.utils import timezone
+from students.models import Class, Section, Student
+from students.reports import build_class_report, build_section_report
+from .archive import ATTENDANCE_TABLE
+from .models import AttendanceRecord, ArchivedPartition, Holiday, ReportJob
+from .reports import build_attendance_report
+
+logger = logging.getLogger(__name__)
+
+User = get_user_model()
+
+REPORT_DIR = 'reports'
+ACTIVE_STATUSES = ('pending', 'running')
+
+
+def params_hash(kind, params):
+    payload = json.dumps({'kind': kind, 'params': params}, sort_keys=True, separators=(',', ':'))
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def _period(params):
+    return date.fromisoformat(params['start_date']), date.fromisoformat(params['end_date'])
+
+
+def data_version(kind, params):
+    """
+    Fingerprint of the data a report reads: attendance rows, holidays and
+    archive partitions of its range, plus the users (or class/section
+    roster) it covers. A cached result is reused only while it matches.
+    """
+    start_date, end_date = _period(params)
+    records = AttendanceRecord.objects.filter(date__range=[start_date, end_date]).aggregate(
+        count=Count('id'), updated=Max('updated_at')
+    )
+    holidays = list(
+        Holiday.objects.filter(date__range=[start_date, end_date]).order_by('date').values_list('date', 'is_active')
+    )
+    partitions = list(
+        ArchivedPartition.objects.filter(
+            table=ATTENDANCE_TABLE, start_date__lte=end_date, end_date__gte=start_date
+        ).order_by('id').values_list('id', flat=True)
+    )
+    if kind == 'attendance':
+        people = User.objects.aggregate(count=Count('id'), updated=Max('updated_at'))
+    else:
+        people = Student.objects.aggregate(count=Count('id'), updated=Max('updated_at'))
+
+    parts = [records['count'], records['updated'], holidays, partitions, people['count'], people['updated']]
+    return hashlib.sha256(json.dumps(parts, cls=DjangoJSONEncoder).encode()).hexdigest()
+
+
+def build_report(kind, params):
+    start_date, end_date = _period(params)
+    if kind == 'attendance':
+        return build_attendance_report(
+            start_date, end_date, user_type=params.get('user_type'), department=params.get('department')
+        )
+    if kind == 'class':
+        return build_class_report(Class.objects.get(id=params['class_id']), start_date, end_date)
+    if kind == 'section':
+        section = Section.objects.select_related('class_obj__department').get(id=params['section_id'])
+        return build_section_report(section, start_date, end_date)
+    raise ValueError(f"Unknown report kind: {kind}")
+
+
+def result_file(job):
+    return os.path.join(settings.MEDIA_ROOT, job.result_path)
+
+
+def _reusable_job(key, version):
+    """The queued, running or finished job for this report and data version, if it is still usable"""
+    job = ReportJob.objects.filter(params_hash=key, data_version=version).exclude(status='failed').first()
+    if job is None:
+        return None
+
+    timeout = timedelta(seconds=getattr(settings, 'REPORT_JOB_TIMEOUT', 900))
+    if job.status in ACTIVE_STATUSES and job.created_at < timezone.now() - timeout:
+        error = 'Timed out (the worker was probably restarted)'
+    elif job.status == 'completed' and not os.path.exists(result_file(job)):
+        error = 'Result file is missing'
+    else:
+        return job
+
+    # Retire it so the dedupe constraint lets a new job in
+    ReportJob.objects.filter(pk=job.pk).update(status='failed', error=error, finished_at=timezone.now())
+    return None
+
+
+def submit_report(kind, params, user=None):
+    """
+    Queue a report unless an identical one over unchanged data is already
+    queued, running or finished.
+    Returns:
+        tuple: (ReportJob, created)
+    """
+    key = params_hash(kind, params)
+    version = data_version(kind, params)
+    for _ in range(2):
+        job = _reusable_job(key, version)
+        if job is not None:
+            return job, False
+        try:
+            with transaction.atomic():
+                job = ReportJob.objects.create(
+                    kind=kind, params=params, params_hash=key, data_version=version, requested_by=user
+                )
+        except IntegrityError:
+            continue  # an identical request won the race; reuse its job
+        transaction.on_commit(lambda: dispatch(job.pk))
+        return job, True
+    raise RuntimeError('Could not create or reuse a report job')
+
+
+def run_report_job(job_id):
+    """Build a queued report and store the result file (runs on a pool thread or a Celery worker)"""
+    close_old_connections()
+    try:
+        # Only one worker can move a job out of pending
+        claimed = ReportJob.objects.filter(pk=job_id, status='pending').update(
+            status='running', progress=10, started_at=timezone.now()
+        )
+        if not claimed:
+            return
+        job = ReportJob.objects.get(pk=job_id)
+
+        try:
+            result = build_report(job.kind, job.params)
+            ReportJob.objects.filter(pk=job_id).update(progress=80)
+            relative_path = _write_result(job, result)
+        except Exception as e:
+            logger.exception("Report job %s failed", job_id)
+            ReportJob.objects.filter(pk=job_id).update(
+                status='failed', error=str(e), finished_at=timezone.now()
+            )
+            return
+
+        ReportJob.objects.filter(pk=job_id).update(
+            status='completed', progress=100, result_path=relative_path, finished_at=timezone.now()
+        )
+    finally:
+        close_old_connections()
+
+
+def _write_result(job, result):
+    relative_path = os.path.join(REPORT_DIR, f'{job.kind}_{job.pk}.json')
+    absolute_path = os.path.join(settings.MEDIA_ROOT, relative_path)
+    os.makedirs(os.path.dirname(absolute_path), exist_ok=True)
+    temp_path = f'{absolute_path}.tmp'
+    with open(temp_path, 'w', encoding='utf-8') as handle:
+        json.dump(result, handle, cls=DjangoJSONEncoder)
+    os.replace(temp_path, absolute_path)
+    return relative_path.replace(os.sep, '/')
+
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=getattr(settings, 'REPORT_JOB_WORKERS', 2),
+                    thread_name_prefix='report-job'
+                )
+    return _executor
+
+
+def dispatch(job_id):
+    """Hand a job to Celery when REPORT_JOBS_BACKEND is 'celery', else to the in-process pool"""
+    if getattr(settings, 'REPORT_JOBS_BACKEND', 'thread') == 'celery':
+        from .tasks import run_report_job_task
+        run_report_job_task.delay(str(job_id))
+    else:
+        _get_executor().submit(run_report_job, job_id)
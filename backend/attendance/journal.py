@@ -0,0 +1,346 @@
+import atexit
+import glob
+import json
+import logging
+import os
+import threading
+import uuid
+from datetime import datetime
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.utils import timezone
+from .models import AttendanceRecord
+from .services import apply_scans, merge_scans, ALREADY_CHECKED_OUT
+from .status_rules import start_time_for
+
+try:
+    import fcntl
+except ImportError:  # Windows: journals of dead workers are replayed by replay_checkin_journals
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+
+def _try_lock(handle):
+    """Take an exclusive lock on an open file without waiting; False if someone holds it"""
+    if fcntl is None:
+        return False
+    try:
+        fcntl.flock(handle.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        return False
+    return True
+
+
+def _encode(scan):
+    return json.dumps({
+        'user_id': scan['user_id'],
+        'timestamp': scan['timestamp'].isoformat(),
+        'location': scan.get('location', ''),
+        'confidence_score': scan.get('confidence_score'),
+        'marked_by_face_recognition': scan.get('marked_by_face_recognition', False),
+    }, separators=(',', ':'))
+
+
+def _read_journal(path):
+    scans = []
+    with open(path, encoding='utf-8') as handle:
+        for line in handle:
+            try:
+                scan = json.loads(line)
+                scan['timestamp'] = datetime.fromisoformat(scan['timestamp'])
+            except (ValueError, KeyError):
+                # A torn last line from a crash mid-append was never acknowledged
+                logger.warning("Skipping unreadable line in check-in journal %s", path)
+                continue
+            scans.append(scan)
+    return scans
+
+
+class CheckInJournal:
+    """
+    Write-behind check-ins for one process.
+
+    record_check() appends the scan to a local journal file, fsyncs it and
+    answers from the day's database row merged with the scans still pending.
+    A background thread group-commits the pending scans every
+    flush_interval seconds with one apply_scans() call, i.e. a handful of
+    bulk statements instead of a transaction (and post_save signals) per
+    check-in.
+
+    Journal segments are deleted only after their scans are committed.
+    Replaying a scan that was already committed changes nothing, so the
+    files of a worker that died are simply replayed (see replay_journals).
+
+    A failed group commit is retried with backoff. After max_retries
+    failures in a row the scans are committed one at a time and those that
+    still fail are moved to a dead-letter file (<prefix>.dead, replayed by
+    replay_dead_letters), so one bad scan cannot hold back the rest.
+
+    Read-your-writes holds only within this process: its own check-ins and
+    day_records() see the pending scans, but other workers see a scan only
+    once it is committed, usually within flush_interval. Reads that must
+    see every worker's check-ins have to tolerate that lag.
+    """
+
+    def __init__(self, directory, flush_interval=0.25, max_retries=10):
+        self.directory = str(directory)
+        self.flush_interval = flush_interval
+        self.max_retries = max_retries
+        os.makedirs(self.directory, exist_ok=True)
+        self.stats = {'appended': 0, 'flushed': 0, 'batches': 0, 'failed': 0, 'dead_lettered': 0}
+        self._failures = 0  # group commits failed in a row
+
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._pending = []
+        self._inflight = []
+        self._segments = []
+        self._sequence = 0
+
+        self.prefix, self._owner = self._claim_prefix()
+        self._handle = open(f'{self.prefix}.journal', 'a', encoding='utf-8')
+
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='checkin-journal', daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def record_check(self, user, location='', marked_by_face_recognition=False, confidence_score=None, when=None):
+        """
+        Same contract as services.record_check(), but the returned record is
+        unsaved until the next group commit
+        """
+        when = when or timezone.now()
+        day = timezone.localdate(when)
+        scan = {
+            'user_id': user.pk,
+            'timestamp': when,
+            'location': location,
+            'confidence_score': confidence_score,
+            'marked_by_face_recognition': marked_by_face_recognition,
+        }
+
+        start_time = start_time_for(user.pk)
+        # Serialise check-ins of this process so two scans cannot both be the check-in
+        with self._lock:
+            record = AttendanceRecord.objects.filter(user_id=user.pk, date=day).first()
+            if record is None:
+                record = AttendanceRecord(user_id=user.pk, date=day, notes='')
+            merge_scans(record, self._scans_for(day, user.pk), start_time)
+            action = merge_scans(record, [scan], start_time)[0]
+            if action != ALREADY_CHECKED_OUT:
+                self._append(scan)
+        return record, action
+
+    def pending_scans(self, day):
+        """Scans for day that are not committed yet, in arrival order"""
+        with self._lock:
+            return self._scans_for(day)
+
+    def flush(self):
+        """Commit pending scans now. Returns the number of scans committed."""
+        with self._flush_lock:
+            with self._lock:
+                if not self._pending:
+                    return 0
+                batch, self._pending = self._pending, []
+                self._inflight = batch
+                self._segments.append(self._rotate())
+                segments = list(self._segments)
+
+            try:
+                close_old_connections()
+                with transaction.atomic():
+                    apply_scans(batch)
+            except Exception:
+                self.stats['failed'] += 1
+                self._failures += 1
+                if self._failures < self.max_retries:
+                    logger.exception("Group commit of %d check-ins failed; will retry", len(batch))
+                    with self._lock:
+                        self._pending = batch + self._pending
+                        self._inflight = []
+                    return 0
+                logger.exception(
+                    "Group commit of %d check-ins failed %d times; committing them one at a time",
+                    len(batch), self._failures
+                )
+                batch = self._commit_each(batch)
+            self._failures = 0
+
+            with self._lock:
+                self._inflight = []
+                self._segments = [path for path in self._segments if path not in segments]
+            for path in segments:
+                os.remove(path)
+            self.stats['flushed'] += len(batch)
+            self.stats['batches'] += 1
+            return len(batch)
+
+    def close(self):
+        self._stop.set()
+        self.flush()
+
+    def _commit_each(self, batch):
+        """Commit scans one by one, dead-lettering those that fail; returns the committed ones"""
+        committed = []
+        dead = []
+        for scan in batch:
+            try:
+                with transaction.atomic():
+                    apply_scans([scan])
+            except Exception:
+                dead.append(scan)
+            else:
+                committed.append(scan)
+        if dead:
+            # Durable before the journal segments holding them are deleted
+            path = f'{self.prefix}.dead'
+            with open(path, 'a', encoding='utf-8') as handle:
+                handle.writelines(_encode(scan) + '\n' for scan in dead)
+                handle.flush()
+                os.fsync(handle.fileno())
+            self.stats['dead_lettered'] += len(dead)
+            logger.error(
+                "Moved %d check-ins that keep failing to %s: %s",
+                len(dead), path, '; '.join(_encode(scan) for scan in dead)
+            )
+        return committed
+
+    def _scans_for(self, day, user_id=None):
+        # Caller holds self._lock; in-flight scans stay visible until committed
+        return [
+            scan for scan in self._inflight + self._pending
+            if (user_id is None or scan['user_id'] == user_id)
+            and timezone.localdate(scan['timestamp']) == day
+        ]
+
+    def _append(self, scan):
+        # Durable before the check-in is acknowledged
+        self._handle.write(_encode(scan) + '\n')
+        self._handle.flush()
+        os.fsync(self._handle.fileno())
+        self._pending.append(scan)
+        self.stats['appended'] += 1
+
+    def _claim_prefix(self, attempts=5):
+        """
+        Pick a fresh file prefix and lock its lock file, which is held for the
+        life of the process: a lock file nobody holds marks a dead worker, whose
+        journal replay_journals() commits and deletes. Without file locks
+        (Windows) journals are only replayed with --all, so nothing is held.
+        """
+        for _ in range(attempts):
+            prefix = os.path.join(self.directory, f'{os.getpid()}-{uuid.uuid4().hex[:8]}')
+            owner = open(f'{prefix}.lock', 'w')
+            if _try_lock(owner) or fcntl is None:
+                return prefix, owner
+            owner.close()
+        raise OSError(f'Could not lock a check-in journal in {self.directory}')
+
+    def _rotate(self):
+        """Close the journal as a numbered segment and start a new one (caller holds self._lock)"""
+        self._handle.close()
+        self._sequence += 1
+        segment = f'{self.prefix}.{self._sequence:06d}.segment'
+        os.replace(f'{self.prefix}.journal', segment)
+        self._handle = open(f'{self.prefix}.journal', 'a', encoding='utf-8')
+        return segment
+
+    def _run(self):
+        # Back off while group commits keep failing (up to 256x the interval)
+        while not self._stop.wait(self.flush_interval * 2 ** min(self._failures, 8)):
+            self.flush()
+
+
+def replay_journals(directory, include_live=False):
+    """
+    Commit the scans left in journals of processes that are gone and delete
+    the files. A journal counts as live while its owner holds the lock file;
+    include_live replays those too (only safe with all workers stopped).
+    Returns:
+        int: scans replayed
+    """
+    replayed = 0
+    for lock_path in sorted(glob.glob(os.path.join(str(directory), '*.lock'))):
+        if _journal is not None and lock_path == f'{_journal.prefix}.lock':
+            continue
+        with open(lock_path, 'a') as handle:
+            if not _try_lock(handle) and not include_live:
+                continue
+            prefix = lock_path[:-len('.lock')]
+            paths = sorted(glob.glob(f'{prefix}.*.segment'))
+            if os.path.exists(f'{prefix}.journal'):
+                paths.append(f'{prefix}.journal')
+
+            scans = [scan for path in paths for scan in _read_journal(path)]
+            if scans:
+                with transaction.atomic():
+                    apply_scans(scans)
+            for path in paths:
+                os.remove(path)
+            replayed += len(scans)
+        os.remove(lock_path)
+    return replayed
+
+
+def replay_dead_letters(directory):
+    """
+    Retry the check-ins journals gave up on, once the cause is fixed.
+    Each dead-letter file is committed in one transaction and deleted; a
+    file that still fails is kept and the error raised.
+    Returns:
+        int: scans replayed
+    """
+    replayed = 0
+    for path in sorted(glob.glob(os.path.join(str(directory), '*.dead'))):
+        # Taken out of the way first: its worker may be dead-lettering more
+        claimed = f'{path}.replaying'
+        os.replace(path, claimed)
+        scans = _read_journal(claimed)
+        try:
+            with transaction.atomic():
+                apply_scans(scans)
+        except Exception:
+            with open(path, 'a', encoding='utf-8') as handle:
+                handle.writelines(_encode(scan) + '\n' for scan in scans)
+            os.remove(claimed)
+            raise
+        os.remove(claimed)
+        replayed += len(scans)
+    return replayed
+
+
+def journal_dir():
+    return getattr(settings, 'ATTENDANCE_JOURNAL_DIR', os.path.join(settings.BASE_DIR, 'journal'))
+
+
+_journal = None
+_journal_lock = threading.Lock()
+
+
+def get_journal():
+    """Return the process-wide check-in journal, or None when write-behind is off"""
+    global _journal
+    if not getattr(settings, 'ATTENDANCE_WRITE_BEHIND', False):
+        return None
+    if _journal is None:
+        with _journal_lock:
+            if _journal is None:
+                directory = journal_dir()
+                os.makedirs(directory, exist_ok=True)
+                replay_journals(directory)
+                _journal = CheckInJournal(
+                    directory,
+                    flush_interval=getattr(settings, 'ATTENDANCE_JOURNAL_FLUSH_INTERVAL', 0.25),
+                    max_retries=getattr(settings, 'ATTENDANCE_JOURNAL_MAX_RETRIES', 10),
+                )
+    return _journal
+
+
+def pending_scans(day):
+    """Uncommitted scans of this process for day (empty when write-behind is off or unused)"""
+    if _journal is None:
+        return []
+    return _journal.pending_scans(day)
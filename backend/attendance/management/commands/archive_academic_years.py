@@ -0,0 +1,53 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from attendance.archive import ATTENDANCE_TABLE, LOG_TABLE, archive_range
+from students.models import AcademicYear
+
+
+class Command(BaseCommand):
+    help = (
+        'Move attendance records and recognition logs of closed academic years '
+        'into compressed monthly archive files and delete them from the tables'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--year',
+            nargs='+',
+            dest='years',
+            help='Academic year names to archive (default: every closed year)'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=5000,
+            help='Rows per DELETE batch (default: 5000)'
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Only report how many rows would be archived'
+        )
+
+    def handle(self, *args, **options):
+        today = timezone.localdate()
+        years = AcademicYear.objects.filter(end_date__lt=today, is_active=False)
+        if options['years']:
+            years = years.filter(name__in=options['years'])
+            missing = set(options['years']) - set(years.values_list('name', flat=True))
+            if missing:
+                raise CommandError(
+                    f"Not found or not closed yet: {', '.join(sorted(missing))}"
+                )
+
+        verb = 'Would archive' if options['dry_run'] else 'Archived'
+        for year in years.order_by('start_date'):
+            for table in (ATTENDANCE_TABLE, LOG_TABLE):
+                partitions = archive_range(
+                    table, year.start_date, year.end_date,
+                    options['batch_size'], options['dry_run']
+                )
+                rows = sum(count for _, _, count in partitions)
+                self.stdout.write(f'{year.name} {table}: {verb.lower()} {rows} rows')
+
+        self.stdout.write(self.style.SUCCESS(f'{verb} closed academic years'))
@@ -0,0 +1,171 @@
+import random
+import time
+from datetime import date, datetime, time as dt_time, timedelta
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.utils import timezone
+from attendance.archive import ATTENDANCE_TABLE, partitions_for
+from attendance.models import AttendanceRecord, Holiday
+from attendance.reports import build_attendance_report
+from attendance.working_days import invalidate_calendars, working_days_between
+
+User = get_user_model()
+
+# The grouped per-user aggregation (working days come from the warm calendar,
+# archive partitions from the warm manifest)
+MAX_REPORT_QUERIES = 1
+
+
+class _Rollback(Exception):
+    pass
+
+
+class _QueryCounter:
+    """connection.execute_wrapper that counts statements (no query log limit)"""
+
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+class Command(BaseCommand):
+    help = (
+        'Benchmark attendance_report on seeded data inside a rolled-back transaction '
+        'and fail if its query count grows with the number of users'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--users',
+            type=int,
+            nargs='+',
+            default=[1000, 10000],
+            help='User counts to benchmark (default: 1000 10000)',
+        )
+        parser.add_argument(
+            '--days',
+            type=int,
+            default=20,
+            help='Days of attendance to seed per user (default: 20)',
+        )
+        parser.add_argument(
+            '--compare',
+            action='store_true',
+            help='Also run the old per-user implementation and check the results match',
+        )
+
+    def handle(self, *args, **options):
+        for user_count in options['users']:
+            try:
+                with transaction.atomic():
+                    self._benchmark(user_count, options['days'], options['compare'])
+                    raise _Rollback
+            except _Rollback:
+                pass
+            finally:
+                # The cached calendars saw the rolled-back benchmark holiday
+                invalidate_calendars()
+
+    def _benchmark(self, user_count, days, compare):
+        start_date = date(2000, 1, 3)
+        end_date = start_date + timedelta(days=days - 1)
+        self._seed(user_count, start_date, days)
+        working_days_between(start_date, end_date)
+        partitions_for(ATTENDANCE_TABLE, start_date, end_date)
+
+        queries = _QueryCounter()
+        started = time.perf_counter()
+        with connection.execute_wrapper(queries):
+            report = build_attendance_report(start_date, end_date, user_type='student')
+        elapsed = time.perf_counter() - started
+
+        if queries.count > MAX_REPORT_QUERIES:
+            raise CommandError(
+                f'attendance_report ran {queries.count} queries for {user_count} users '
+                f'(expected at most {MAX_REPORT_QUERIES})'
+            )
+        if report['summary']['total_users'] != user_count:
+            raise CommandError(f"Report covered {report['summary']['total_users']} of {user_count} users")
+
+        self.stdout.write(
+            f'{user_count:>7} users x {days} days: {elapsed * 1000:8.1f} ms, {queries.count} queries'
+        )
+
+        if compare:
+            legacy_queries = _QueryCounter()
+            started = time.perf_counter()
+            with connection.execute_wrapper(legacy_queries):
+                legacy = _legacy_report(start_date, end_date, 'student')
+            legacy_elapsed = time.perf_counter() - started
+            by_id = sorted(legacy, key=lambda item: item['user_id'])
+            if by_id != report['report']:
+                raise CommandError('Grouped report does not match the per-user implementation')
+            self.stdout.write(
+                f'{"":>7} per-user loop:  {legacy_elapsed * 1000:8.1f} ms, '
+                f'{legacy_queries.count} queries (results match)'
+            )
+
+    def _seed(self, user_count, start_date, days):
+        prefix = f'bench{user_count}_'
+        User.objects.bulk_create(
+            [
+                User(
+                    username=f'{prefix}{i}', email=f'{prefix}{i}@example.com', password='!',
+                    user_type='student', department=random.choice(['CS', 'EE', 'ME'])
+                )
+                for i in range(user_count)
+            ],
+            batch_size=1000
+        )
+        user_ids = list(User.objects.filter(username__startswith=prefix).values_list('id', flat=True))
+        Holiday.objects.create(name='Benchmark holiday', date=start_date + timedelta(days=1))
+
+        records = []
+        for day in range(days):
+            record_date = start_date + timedelta(days=day)
+            for user_id in user_ids:
+                status = random.choices(['present', 'late', 'absent'], weights=[80, 10, 10])[0]
+                check_in = None
+                if status != 'absent':
+                    check_in = timezone.make_aware(datetime.combine(record_date, dt_time(8, random.randint(0, 59))))
+                records.append(AttendanceRecord(
+                    user_id=user_id, date=record_date, status=status, check_in_time=check_in
+                ))
+                if len(records) >= 5000:
+                    AttendanceRecord.objects.bulk_create(records)
+                    records = []
+        AttendanceRecord.objects.bulk_create(records)
+
+
+def _legacy_report(start_date, end_date, user_type):
+    """The previous implementation: three counts per user"""
+    report_data = []
+    for user in User.objects.filter(is_active=True, user_type=user_type):
+        records = AttendanceRecord.objects.filter(user=user, date__range=[start_date, end_date])
+        present_days = records.filter(status='present').count()
+        absent_days = records.filter(status='absent').count()
+        late_days = records.filter(status='late').count()
+        working_days = working_days_between(start_date, end_date)
+        attendance_percentage = (
+            (present_days + late_days) / working_days * 100 if working_days > 0 else 0
+        )
+        report_data.append({
+            'user_id': user.id,
+            'username': user.username,
+            'full_name': f"{user.first_name} {user.last_name}".strip(),
+            'email': user.email,
+            'user_type': user.user_type,
+            'department': user.department,
+            'employee_id': user.employee_id,
+            'student_id': user.student_id,
+            'present_days': present_days,
+            'absent_days': absent_days,
+            'late_days': late_days,
+            'working_days': working_days,
+            'attendance_percentage': round(attendance_percentage, 2)
+        })
+    return report_data
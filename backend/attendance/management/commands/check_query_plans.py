@@ -0,0 +1,161 @@
+import json
+import random
+from datetime import date, timedelta
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from attendance.models import AttendanceRecord
+from face_recognition_app.models import FaceRecognitionLog
+
+User = get_user_model()
+
+# Tables big enough that a full scan on a hot path is a regression
+LARGE_TABLES = [AttendanceRecord._meta.db_table, FaceRecognitionLog._meta.db_table]
+
+
+class _Rollback(Exception):
+    pass
+
+
+def hot_queries(user_id, start_date, end_date):
+    """The request-path queries whose plans must stay index-backed"""
+    return [
+        ('dashboard: present today', AttendanceRecord.objects.filter(
+            date=end_date, status__in=['present', 'late']
+        ).values('id')),
+        ('report: absences in range', AttendanceRecord.objects.filter(
+            date__range=[start_date, end_date], status='absent'
+        ).values('user_id')),
+        ('stats: one user in range', AttendanceRecord.objects.filter(
+            user_id=user_id, date__range=[start_date, end_date]
+        ).values('status', 'check_in_time', 'check_out_time')),
+        ('records: first page', AttendanceRecord.objects.order_by('-date', '-id')[:21]),
+        ('records: keyset page', AttendanceRecord.objects.filter(
+            date__lte=end_date - timedelta(days=10)
+        ).order_by('-date', '-id')[:21]),
+        ('logs: first page', FaceRecognitionLog.objects.order_by('-timestamp', '-id')[:21]),
+        ('logs: status count', FaceRecognitionLog.objects.filter(status='failed').values('id')),
+        ('logs: one user', FaceRecognitionLog.objects.filter(user_id=user_id).order_by('-timestamp')[:21]),
+    ]
+
+
+def sequential_scans(queryset):
+    """Names of large tables the database would read in full for this query"""
+    if connection.vendor == 'postgresql':
+        plan = json.loads(queryset.explain(format='json'))
+        nodes = [plan[0]['Plan']]
+        scanned = []
+        while nodes:
+            node = nodes.pop()
+            if node.get('Node Type') == 'Seq Scan' and node.get('Relation Name') in LARGE_TABLES:
+                scanned.append(node['Relation Name'])
+            nodes.extend(node.get('Plans', []))
+        return scanned
+
+    if connection.vendor == 'sqlite':
+        # EXPLAIN QUERY PLAN rows read "SCAN <table>" for a full table scan and
+        # "SCAN <table> USING [COVERING] INDEX ..." for an index walk
+        scanned = []
+        for line in queryset.explain().splitlines():
+            words = line.split()
+            if 'SCAN' in words:
+                table = words[words.index('SCAN') + 1]
+                if table in LARGE_TABLES and 'USING' not in words:
+                    scanned.append(table)
+        return scanned
+
+    raise CommandError(f'Query plan checks are not implemented for {connection.vendor}')
+
+
+class Command(BaseCommand):
+    help = (
+        'Seed attendance tables inside a rolled-back transaction, EXPLAIN the hot '
+        'queries and fail if any of them falls back to a sequential scan'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--users',
+            type=int,
+            default=2000,
+            help='Users to seed (default: 2000)',
+        )
+        parser.add_argument(
+            '--days',
+            type=int,
+            default=30,
+            help='Days of attendance per user (default: 30)',
+        )
+        parser.add_argument(
+            '--verbose-plans',
+            action='store_true',
+            help='Print the full plan of every query',
+        )
+
+    def handle(self, *args, **options):
+        try:
+            with transaction.atomic():
+                failures = self._check(options['users'], options['days'], options['verbose_plans'])
+                raise _Rollback
+        except _Rollback:
+            pass
+
+        if failures:
+            raise CommandError(
+                'Sequential scans on large tables: ' +
+                '; '.join(f'{name} ({", ".join(tables)})' for name, tables in failures)
+            )
+        self.stdout.write(self.style.SUCCESS('All hot queries use indexes'))
+
+    def _check(self, user_count, days, verbose):
+        start_date = date(2000, 1, 3)
+        end_date = start_date + timedelta(days=days - 1)
+        user_ids = self._seed(user_count, start_date, days)
+
+        # Give the planner real statistics for the seeded tables
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+
+        failures = []
+        for name, queryset in hot_queries(user_ids[0], start_date, end_date):
+            scanned = sequential_scans(queryset)
+            flag = self.style.ERROR('SEQ SCAN') if scanned else 'ok'
+            self.stdout.write(f'{name:<30} {flag}')
+            if verbose:
+                self.stdout.write(queryset.explain())
+            if scanned:
+                failures.append((name, scanned))
+        return failures
+
+    def _seed(self, user_count, start_date, days):
+        prefix = 'plancheck_'
+        User.objects.bulk_create(
+            [
+                User(
+                    username=f'{prefix}{i}', email=f'{prefix}{i}@example.com', password='!',
+                    user_type='student'
+                )
+                for i in range(user_count)
+            ],
+            batch_size=1000
+        )
+        user_ids = list(User.objects.filter(username__startswith=prefix).values_list('id', flat=True))
+
+        records = []
+        logs = []
+        for day in range(days):
+            record_date = start_date + timedelta(days=day)
+            for user_id in user_ids:
+                status = random.choices(['present', 'late', 'absent'], weights=[80, 10, 10])[0]
+                records.append(AttendanceRecord(user_id=user_id, date=record_date, status=status))
+                logs.append(FaceRecognitionLog(
+                    user_id=user_id,
+                    status=random.choices(['success', 'failed', 'no_face'], weights=[90, 5, 5])[0]
+                ))
+                if len(records) >= 5000:
+                    AttendanceRecord.objects.bulk_create(records)
+                    FaceRecognitionLog.objects.bulk_create(logs)
+                    records, logs = [], []
+        AttendanceRecord.objects.bulk_create(records)
+        FaceRecognitionLog.objects.bulk_create(logs)
+        return user_ids
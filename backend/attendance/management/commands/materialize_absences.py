@@ -0,0 +1,71 @@
+from datetime import datetime, timedelta
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from attendance.archive import ArchivedDateError, ensure_not_archived
+from attendance.services import materialize_absences
+from attendance.working_days import working_dates
+
+
+class Command(BaseCommand):
+    help = (
+        'Record students without attendance as absent for each working day '
+        '(run nightly after the day ends; safe to re-run)'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--date',
+            help='Day to materialise (YYYY-MM-DD, default: yesterday)'
+        )
+        parser.add_argument(
+            '--start-date',
+            help='Backfill from this day (YYYY-MM-DD)'
+        )
+        parser.add_argument(
+            '--end-date',
+            help='Backfill up to this day (YYYY-MM-DD, default: yesterday)'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=5000,
+            help='Rows per bulk insert (default: 5000)'
+        )
+
+    def handle(self, *args, **options):
+        today = timezone.localdate()
+        # Run after midnight: the day that just ended is complete
+        yesterday = today - timedelta(days=1)
+        if options['date'] and (options['start_date'] or options['end_date']):
+            raise CommandError('Use either --date or --start-date/--end-date')
+
+        if options['start_date'] or options['end_date']:
+            start_date = self._parse_date(options['start_date']) if options['start_date'] else yesterday
+            end_date = self._parse_date(options['end_date']) if options['end_date'] else yesterday
+        else:
+            start_date = end_date = self._parse_date(options['date']) if options['date'] else yesterday
+
+        if start_date > end_date:
+            raise CommandError('--start-date must not be after --end-date')
+        if end_date > today:
+            raise CommandError('Cannot mark absences for future days')
+        try:
+            ensure_not_archived(working_dates(start_date, end_date))
+        except ArchivedDateError as e:
+            raise CommandError(str(e))
+
+        total = 0
+        for day in working_dates(start_date, end_date):
+            inserted = materialize_absences(day, options['batch_size'])
+            total += inserted
+            self.stdout.write(f'{day}: {inserted} absent records')
+
+        self.stdout.write(
+            self.style.SUCCESS(f'Recorded {total} absences between {start_date} and {end_date}')
+        )
+
+    def _parse_date(self, value):
+        try:
+            return datetime.strptime(value, '%Y-%m-%d').date()
+        except ValueError:
+            raise CommandError(f'Invalid date "{value}", expected YYYY-MM-DD')
@@ -0,0 +1,64 @@
+import logging
+import time
+from datetime import datetime
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import close_old_connections
+from attendance.events import project_events, rebuild_projection
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = (
+        'Fold logged check events into attendance records (ATTENDANCE_CHECK_EVENTS), '
+        'once or continuously with --follow; --rebuild re-derives a date range from '
+        'the full event history'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--follow', action='store_true',
+            help='Keep projecting new events every ATTENDANCE_PROJECTOR_INTERVAL seconds'
+        )
+        parser.add_argument('--batch-size', type=int, help='Events per transaction')
+        parser.add_argument(
+            '--rebuild', action='store_true',
+            help='Rebuild the records of --start-date to --end-date from their events'
+        )
+        parser.add_argument('--start-date', help='First day to rebuild (YYYY-MM-DD)')
+        parser.add_argument('--end-date', help='Last day to rebuild (YYYY-MM-DD)')
+
+    def handle(self, *args, **options):
+        if options['rebuild']:
+            if not options['start_date'] or not options['end_date']:
+                raise CommandError('--rebuild needs --start-date and --end-date')
+            start_date = self._parse_date(options['start_date'])
+            end_date = self._parse_date(options['end_date'])
+            if start_date > end_date:
+                raise CommandError('--start-date must not be after --end-date')
+            folded = rebuild_projection(start_date, end_date)
+            self.stdout.write(self.style.SUCCESS(
+                f'Rebuilt attendance for {start_date} to {end_date} from {folded} events'
+            ))
+            return
+
+        if not options['follow']:
+            projected = project_events(options['batch_size'])
+            self.stdout.write(self.style.SUCCESS(f'Projected {projected} check events'))
+            return
+
+        interval = getattr(settings, 'ATTENDANCE_PROJECTOR_INTERVAL', 1.0)
+        while True:
+            try:
+                close_old_connections()
+                project_events(options['batch_size'])
+            except Exception:
+                logger.exception("Projecting check events failed; retrying")
+            time.sleep(interval)
+
+    def _parse_date(self, value):
+        try:
+            return datetime.strptime(value, '%Y-%m-%d').date()
+        except ValueError:
+            raise CommandError(f'Invalid date "{value}", expected YYYY-MM-DD')
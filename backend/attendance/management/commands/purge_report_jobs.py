@@ -0,0 +1,30 @@
+import os
+from datetime import timedelta
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from attendance.jobs import result_file
+from attendance.models import ReportJob
+
+
+class Command(BaseCommand):
+    help = 'Delete finished report jobs and their result files after a retention period'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days',
+            type=int,
+            default=7,
+            help='Keep jobs finished in the last N days (default: 7)',
+        )
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(days=options['days'])
+        jobs = ReportJob.objects.filter(status__in=['completed', 'failed'], finished_at__lt=cutoff)
+
+        removed = 0
+        for job in jobs.iterator():
+            if job.result_path and os.path.exists(result_file(job)):
+                os.remove(result_file(job))
+                removed += 1
+        deleted, _ = jobs.delete()
+        self.stdout.write(self.style.SUCCESS(f'Deleted {deleted} report jobs and {removed} result files'))
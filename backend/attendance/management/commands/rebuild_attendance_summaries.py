@@ -0,0 +1,43 @@
+from datetime import datetime
+from django.core.management.base import BaseCommand, CommandError
+from attendance.summaries import rebuild_summaries
+
+
+class Command(BaseCommand):
+    help = 'Rebuild attendance monthly summaries from attendance records'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--start-month',
+            help='First month to rebuild (YYYY-MM, default: earliest)'
+        )
+        parser.add_argument(
+            '--end-month',
+            help='Last month to rebuild (YYYY-MM, default: latest)'
+        )
+        parser.add_argument(
+            '--user',
+            type=int,
+            nargs='+',
+            dest='user_ids',
+            help='Only rebuild summaries for these user IDs'
+        )
+
+    def handle(self, *args, **options):
+        start_month = self._parse_month(options['start_month'])
+        end_month = self._parse_month(options['end_month'])
+        if start_month and end_month and start_month > end_month:
+            raise CommandError('--start-month must not be after --end-month')
+
+        written = rebuild_summaries(start_month, end_month, options['user_ids'])
+        self.stdout.write(
+            self.style.SUCCESS(f'Rebuilt {written} monthly summaries')
+        )
+
+    def _parse_month(self, value):
+        if not value:
+            return None
+        try:
+            return datetime.strptime(value, '%Y-%m').date()
+        except ValueError:
+            raise CommandError(f'Invalid month "{value}", expected YYYY-MM')
@@ -0,0 +1,45 @@
+from datetime import datetime
+from django.core.management.base import BaseCommand, CommandError
+from attendance.status_rules import recompute_statuses
+
+
+class Command(BaseCommand):
+    help = (
+        'Reclassify present/late attendance records of a date range against the '
+        'section schedules and ATTENDANCE_LATE_GRACE_MINUTES, in chunked bulk updates'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--start-date', required=True, help='First day to reclassify (YYYY-MM-DD)')
+        parser.add_argument('--end-date', required=True, help='Last day to reclassify (YYYY-MM-DD)')
+        parser.add_argument(
+            '--chunk-days', type=int, default=31,
+            help='Days updated per statement and transaction (default: 31)'
+        )
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help='Only count the records that would change'
+        )
+
+    def handle(self, *args, **options):
+        start_date = self._parse_date(options['start_date'])
+        end_date = self._parse_date(options['end_date'])
+        if start_date > end_date:
+            raise CommandError('--start-date must not be after --end-date')
+        if options['chunk_days'] < 1:
+            raise CommandError('--chunk-days must be at least 1')
+
+        changed = recompute_statuses(
+            start_date, end_date, chunk_days=options['chunk_days'], dry_run=options['dry_run']
+        )
+        verb = 'Would change' if options['dry_run'] else 'Changed'
+        self.stdout.write(self.style.SUCCESS(
+            f"{verb} {changed['late']} records to late and {changed['present']} to present "
+            f'for {start_date} to {end_date}'
+        ))
+
+    def _parse_date(self, value):
+        try:
+            return datetime.strptime(value, '%Y-%m-%d').date()
+        except ValueError:
+            raise CommandError(f'Invalid date "{value}", expected YYYY-MM-DD')
@@ -0,0 +1,49 @@
+from datetime import datetime, timedelta
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from attendance.analytics import refresh_analytics
+from students.models import AcademicYear
+
+
+class Command(BaseCommand):
+    help = (
+        'Recompute attendance rates, absence streaks, late trends and at-risk '
+        'flags for all active students (run nightly after materialize_absences)'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--start-date',
+            help='First day to analyse (YYYY-MM-DD, default: start of the active academic year)'
+        )
+        parser.add_argument(
+            '--end-date',
+            help='Last day to analyse (YYYY-MM-DD, default: yesterday)'
+        )
+
+    def handle(self, *args, **options):
+        end_date = (
+            self._parse_date(options['end_date']) if options['end_date']
+            else timezone.localdate() - timedelta(days=1)
+        )
+        if options['start_date']:
+            start_date = self._parse_date(options['start_date'])
+        else:
+            year = AcademicYear.objects.filter(is_active=True).first()
+            if year is None:
+                raise CommandError('No active academic year; pass --start-date')
+            start_date = year.start_date
+
+        if start_date > end_date:
+            raise CommandError('--start-date must not be after --end-date')
+
+        analysed = refresh_analytics(start_date, end_date)
+        self.stdout.write(self.style.SUCCESS(
+            f'Analysed {analysed} students for {start_date} to {end_date}'
+        ))
+
+    def _parse_date(self, value):
+        try:
+            return datetime.strptime(value, '%Y-%m-%d').date()
+        except ValueError:
+            raise CommandError(f'Invalid date "{value}", expected YYYY-MM-DD')
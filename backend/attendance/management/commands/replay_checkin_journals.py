@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand
+from attendance.journal import journal_dir, replay_dead_letters, replay_journals
+
+
+class Command(BaseCommand):
+    help = (
+        'Commit check-ins left in the write-behind journals of workers that '
+        'stopped before their last group commit (safe to re-run)'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--all',
+            action='store_true',
+            help='Also replay journals that look live; only with every worker stopped '
+                 '(required on platforms without file locks)',
+        )
+        parser.add_argument(
+            '--dead-letters',
+            action='store_true',
+            help='Retry the check-ins group commits gave up on (*.dead) instead',
+        )
+
+    def handle(self, *args, **options):
+        if options['dead_letters']:
+            replayed = replay_dead_letters(journal_dir())
+            self.stdout.write(self.style.SUCCESS(f'Replayed {replayed} dead-lettered check-ins'))
+            return
+        replayed = replay_journals(journal_dir(), include_live=options['all'])
+        self.stdout.write(self.style.SUCCESS(f'Replayed {replayed} check-ins'))
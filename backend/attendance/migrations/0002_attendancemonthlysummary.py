@@ -0,0 +1,37 @@
+# Generated by Django 4.2.7 on 2026-10-19 07:50
+
+import datetime
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('attendance', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AttendanceMonthlySummary',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('month', models.DateField()),
+                ('present_days', models.IntegerField(default=0)),
+                ('absent_days', models.IntegerField(default=0)),
+                ('late_days', models.IntegerField(default=0)),
+                ('worked_time', models.DurationField(default=datetime.timedelta)),
+                ('check_in_count', models.IntegerField(default=0)),
+                ('check_in_seconds', models.BigIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='attendance_summaries', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'db_table': 'attendance_monthly_summaries',
+                'ordering': ['-month'],
+                'unique_together': {('user', 'month')},
+            },
+        ),
+    ]
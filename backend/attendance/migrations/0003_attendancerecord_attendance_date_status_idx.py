@@ -0,0 +1,17 @@
+# Generated by Django 4.2.7 on 2026-10-19 07:58
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('attendance', '0002_attendancemonthlysummary'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='attendancerecord',
+            index=models.Index(fields=['date', 'status'], name='attendance_date_status_idx'),
+        ),
+    ]
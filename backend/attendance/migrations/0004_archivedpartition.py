@@ -0,0 +1,31 @@
+# Generated by Django 4.2.7 on 2026-10-19 07:59
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('attendance', '0003_attendancerecord_attendance_date_status_idx'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedPartition',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('table', models.CharField(choices=[('attendance_records', 'Attendance records'), ('face_recognition_logs', 'Face recognition logs')], max_length=50)),
+                ('start_date', models.DateField()),
+                ('end_date', models.DateField()),
+                ('path', models.CharField(max_length=500)),
+                ('row_count', models.IntegerField(default=0)),
+                ('summary', models.JSONField(blank=True, default=dict)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'db_table': 'archived_partitions',
+                'ordering': ['table', 'start_date'],
+                'unique_together': {('table', 'start_date')},
+            },
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 4.2.7 on 2026-10-19 08:02
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('attendance', '0004_archivedpartition'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='KioskSyncEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('idempotency_key', models.CharField(max_length=100, unique=True)),
+                ('kiosk_id', models.CharField(blank=True, max_length=100)),
+                ('timestamp', models.DateTimeField()),
+                ('action', models.CharField(max_length=20)),
+                ('received_at', models.DateTimeField(auto_now_add=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='kiosk_sync_events', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'db_table': 'kiosk_sync_events',
+                'ordering': ['-received_at'],
+            },
+        ),
+    ]
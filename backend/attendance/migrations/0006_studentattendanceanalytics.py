@@ -0,0 +1,41 @@
+# Generated by Django 4.2.7 on 2026-10-19 08:08
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('attendance', '0005_kiosksyncevent'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StudentAttendanceAnalytics',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('start_date', models.DateField()),
+                ('end_date', models.DateField()),
+                ('working_days', models.IntegerField()),
+                ('attendance_rate', models.FloatField()),
+                ('recent_rate', models.FloatField()),
+                ('rate_change', models.FloatField()),
+                ('late_rate', models.FloatField()),
+                ('late_trend', models.FloatField()),
+                ('longest_absence_streak', models.IntegerField()),
+                ('current_absence_streak', models.IntegerField()),
+                ('at_risk', models.BooleanField(default=False)),
+                ('risk_reasons', models.JSONField(default=list)),
+                ('computed_at', models.DateTimeField()),
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='attendance_analytics', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'db_table': 'attendance_analytics',
+                'ordering': ['attendance_rate'],
+                'indexes': [models.Index(fields=['at_risk', 'attendance_rate'], name='analytics_risk_idx')],
+            },
+        ),
+    ]
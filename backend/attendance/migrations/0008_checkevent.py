@@ -0,0 +1,34 @@
+# Generated by Django 4.2.7 on 2026-10-19 08:16
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('attendance', '0007_reportjob'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CheckEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('timestamp', models.DateTimeField()),
+                ('source', models.CharField(choices=[('face_recognition', 'Face recognition'), ('manual', 'Manual')], default='manual', max_length=20)),
+                ('confidence_score', models.FloatField(blank=True, null=True)),
+                ('location', models.CharField(blank=True, max_length=200)),
+                ('projected', models.BooleanField(default=False)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='check_events', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'db_table': 'check_events',
+                'ordering': ['-timestamp'],
+                'indexes': [models.Index(fields=['user', 'timestamp'], name='check_event_user_time_idx'), models.Index(condition=models.Q(('projected', False)), fields=['id'], name='check_event_backlog_idx')],
+            },
+        ),
+    ]
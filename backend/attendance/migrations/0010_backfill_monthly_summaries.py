@@ -0,0 +1,64 @@
+from datetime import timedelta
+
+from django.db import migrations
+from django.db.models import Count, DurationField, ExpressionWrapper, F, Q, Sum
+from django.db.models.functions import ExtractHour, ExtractMinute, ExtractSecond, TruncMonth
+
+
+def backfill_summaries(apps, schema_editor):
+    """
+    Create the monthly summaries of records that predate them (0002 did not
+    backfill). Existing summaries, including those of archived months, are
+    kept as they are.
+    """
+    AttendanceRecord = apps.get_model('attendance', 'AttendanceRecord')
+    AttendanceMonthlySummary = apps.get_model('attendance', 'AttendanceMonthlySummary')
+
+    existing = set(AttendanceMonthlySummary.objects.values_list('user_id', 'month'))
+    has_check_in = Q(check_in_time__isnull=False)
+    worked = Q(check_in_time__isnull=False, check_out_time__gt=F('check_in_time'))
+    rows = AttendanceRecord.objects.annotate(month=TruncMonth('date')).values('user_id', 'month').annotate(
+        present=Count('id', filter=Q(status='present')),
+        absent=Count('id', filter=Q(status='absent')),
+        late=Count('id', filter=Q(status='late')),
+        worked=Sum(
+            ExpressionWrapper(F('check_out_time') - F('check_in_time'), output_field=DurationField()),
+            filter=worked
+        ),
+        check_ins=Count('id', filter=has_check_in),
+        check_in_total=Sum(
+            ExtractHour('check_in_time') * 3600 + ExtractMinute('check_in_time') * 60
+            + ExtractSecond('check_in_time'),
+            filter=has_check_in
+        ),
+    ).order_by('user_id', 'month')
+
+    batch = []
+    for row in rows.iterator(chunk_size=2000):
+        if (row['user_id'], row['month']) in existing:
+            continue
+        batch.append(AttendanceMonthlySummary(
+            user_id=row['user_id'],
+            month=row['month'],
+            present_days=row['present'],
+            absent_days=row['absent'],
+            late_days=row['late'],
+            worked_time=row['worked'] or timedelta(),
+            check_in_count=row['check_ins'],
+            check_in_seconds=row['check_in_total'] or 0,
+        ))
+        if len(batch) >= 2000:
+            AttendanceMonthlySummary.objects.bulk_create(batch)
+            batch = []
+    AttendanceMonthlySummary.objects.bulk_create(batch)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('attendance', '0009_projectorstate'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_summaries, migrations.RunPython.noop),
+    ]
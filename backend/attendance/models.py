@@ -1,6 +1,8 @@
+import uuid
 from django.db import models
 from django.contrib.auth import get_user_model
 from django.utils import timezone
+from datetime import timedelta
 
 User = get_user_model()
 
@@ -25,13 +27,23 @@ class AttendanceRecord(models.Model):
     updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
-        unique_together = ['user', 'date']
+        unique_together = ['user', 'date']  # also serves per-user date ranges
         ordering = ['-date', '-check_in_time']
         db_table = 'attendance_records'
+        indexes = [
+            models.Index(fields=['date', 'status'], name='attendance_date_status_idx'),
+        ]
 
     def __str__(self):
         return f"{self.user.username} - {self.date} ({self.status})"
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember the stored state so summaries can apply the delta on save
+        instance._loaded_values = dict(zip(field_names, values))
+        return instance
+
     @property
     def duration(self):
         """Calculate duration between check-in and check-out"""
@@ -40,17 +52,200 @@ class AttendanceRecord(models.Model):
         return None
 
     def save(self, *args, **kwargs):
-        # Auto-determine status based on check-in time
+        from .archive import ensure_not_archived
+        ensure_not_archived([self.date])
+        # Auto-determine status based on check-in time and the user's schedule
         if self.check_in_time and not self.status:
-            # Define standard work hours (you can adjust these)
-            standard_start_time = timezone.now().replace(hour=9, minute=0, second=0, microsecond=0)
-            if self.check_in_time <= standard_start_time:
-                self.status = 'present'
-            else:
-                self.status = 'late'
+            from .status_rules import check_in_status, start_time_for
+            self.status = check_in_status(self.check_in_time, start_time_for(self.user_id))
         super().save(*args, **kwargs)
 
 
+class AttendanceMonthlySummary(models.Model):
+    """Per-user monthly attendance totals, kept in step with AttendanceRecord"""
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='attendance_summaries')
+    month = models.DateField()  # first day of the month
+    present_days = models.IntegerField(default=0)
+    absent_days = models.IntegerField(default=0)
+    late_days = models.IntegerField(default=0)
+    worked_time = models.DurationField(default=timedelta)  # sum of check_out - check_in
+    check_in_count = models.IntegerField(default=0)
+    check_in_seconds = models.BigIntegerField(default=0)  # sum of local seconds since midnight
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ['user', 'month']
+        ordering = ['-month']
+        db_table = 'attendance_monthly_summaries'
+
+    def __str__(self):
+        return f"{self.user.username} - {self.month:%Y-%m}"
+
+
+class StudentAttendanceAnalytics(models.Model):
+    """Cached per-student trend metrics, recomputed in bulk by refresh_attendance_analytics"""
+    user = models.OneToOneField(User, on_delete=models.CASCADE, related_name='attendance_analytics')
+    start_date = models.DateField()
+    end_date = models.DateField()
+    working_days = models.IntegerField()  # working days since admission within the range
+    attendance_rate = models.FloatField()  # present or late / working days
+    recent_rate = models.FloatField()  # the same over the last rolling window
+    rate_change = models.FloatField()  # recent_rate minus the window before it
+    late_rate = models.FloatField()
+    late_trend = models.FloatField()  # least-squares change of the late share per window
+    longest_absence_streak = models.IntegerField()
+    current_absence_streak = models.IntegerField()
+    at_risk = models.BooleanField(default=False)
+    risk_reasons = models.JSONField(default=list)
+    computed_at = models.DateTimeField()
+
+    class Meta:
+        ordering = ['attendance_rate']
+        db_table = 'attendance_analytics'
+        indexes = [
+            models.Index(fields=['at_risk', 'attendance_rate'], name='analytics_risk_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.user.username} - {self.attendance_rate:.0%}"
+
+
+class ReportJob(models.Model):
+    """A report built in the background; finished results are shared by identical requests"""
+    KIND_CHOICES = (
+        ('attendance', 'Attendance report'),
+        ('class', 'Class report'),
+        ('section', 'Section report'),
+    )
+    STATUS_CHOICES = (
+        ('pending', 'Pending'),
+        ('running', 'Running'),
+        ('completed', 'Completed'),
+        ('failed', 'Failed'),
+    )
+    
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    params = models.JSONField(default=dict)
+    params_hash = models.CharField(max_length=64)
+    data_version = models.CharField(max_length=64)  # fingerprint of the data the report reads
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending')
+    progress = models.IntegerField(default=0)  # percent
+    result_path = models.CharField(max_length=500, blank=True)  # relative to MEDIA_ROOT
+    error = models.TextField(blank=True)
+    requested_by = models.ForeignKey(
+        User, on_delete=models.SET_NULL, null=True, blank=True, related_name='report_jobs'
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        db_table = 'report_jobs'
+        constraints = [
+            # One live or finished job per report and data version; failed ones can be retried
+            models.UniqueConstraint(
+                fields=['params_hash', 'data_version'],
+                condition=~models.Q(status='failed'),
+                name='report_job_dedupe',
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.kind} report {self.id} ({self.status})"
+
+
+class KioskSyncEvent(models.Model):
+    """A kiosk scan applied through bulk sync, kept to make replays idempotent"""
+    idempotency_key = models.CharField(max_length=100, unique=True)
+    kiosk_id = models.CharField(max_length=100, blank=True)
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='kiosk_sync_events')
+    timestamp = models.DateTimeField()
+    action = models.CharField(max_length=20)  # check_in, check_out or already_checked_out
+    received_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['-received_at']
+        db_table = 'kiosk_sync_events'
+
+    def __str__(self):
+        return f"{self.idempotency_key} - {self.user.username} ({self.action})"
+
+
+class CheckEvent(models.Model):
+    """
+    One check-in/out scan, appended and never updated except for the
+    projected flag. The projector (attendance.events) folds unprojected
+    events into AttendanceRecord in batches.
+    """
+    SOURCE_CHOICES = (
+        ('face_recognition', 'Face recognition'),
+        ('manual', 'Manual'),
+    )
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='check_events')
+    timestamp = models.DateTimeField()
+    source = models.CharField(max_length=20, choices=SOURCE_CHOICES, default='manual')
+    confidence_score = models.FloatField(null=True, blank=True)
+    location = models.CharField(max_length=200, blank=True)
+    projected = models.BooleanField(default=False)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['-timestamp']
+        db_table = 'check_events'
+        indexes = [
+            models.Index(fields=['user', 'timestamp'], name='check_event_user_time_idx'),
+            # Small while the projector keeps up: only the backlog is indexed
+            models.Index(fields=['id'], condition=models.Q(projected=False), name='check_event_backlog_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.user.username} - {self.timestamp} ({self.source})"
+
+
+class ProjectorState(models.Model):
+    """
+    The check event projector's progress. Its row is locked (SELECT ... FOR
+    UPDATE) around every batch, so a second projector waits instead of
+    folding the same events again.
+    """
+    name = models.CharField(max_length=50, unique=True)
+    last_event_id = models.BigIntegerField(default=0)  # highest event folded in
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'projector_state'
+
+    def __str__(self):
+        return f"{self.name} at event {self.last_event_id}"
+
+
+class ArchivedPartition(models.Model):
+    """One compressed columnar file of rows moved out of a hot table"""
+    TABLE_CHOICES = (
+        ('attendance_records', 'Attendance records'),
+        ('face_recognition_logs', 'Face recognition logs'),
+    )
+
+    table = models.CharField(max_length=50, choices=TABLE_CHOICES)
+    start_date = models.DateField()
+    end_date = models.DateField()
+    path = models.CharField(max_length=500)  # relative to ATTENDANCE_ARCHIVE_ROOT
+    row_count = models.IntegerField(default=0)
+    summary = models.JSONField(default=dict, blank=True)  # precomputed totals for stats
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        unique_together = ['table', 'start_date']
+        ordering = ['table', 'start_date']
+        db_table = 'archived_partitions'
+
+    def __str__(self):
+        return f"{self.table} {self.start_date} - {self.end_date} ({self.row_count} rows)"
+
+
 class AttendanceSession(models.Model):
     """Model to track active attendance sessions"""
     name = models.CharField(max_length=200)
@@ -0,0 +1,172 @@
+from collections import Counter
+from django.contrib.auth import get_user_model
+from django.db.models import Count, FilteredRelation, Q, IntegerField
+from django.db.models.functions import Cast, ExtractHour, ExtractIsoWeekDay, ExtractMinute, Floor
+from .archive import archived_arrival_counts, archived_status_counts
+from .models import AttendanceRecord
+from .working_days import working_days_between
+
+User = get_user_model()
+
+WEEKDAYS = ['monday', 'tuesday', 'wednesday', 'thursday', 'friday', 'saturday', 'sunday']
+
+
+def build_attendance_report(start_date, end_date, user_type=None, department=None):
+    """
+    Per-user present/absent/late counts for a date range.
+
+    All users are aggregated in one grouped query (users LEFT JOIN their
+    attendance_records in the range, conditional COUNTs) and holidays are
+    counted once, so the number of queries does not grow with the number of
+    users. The date range is part of the join condition, so records outside
+    it are never joined. Working
+    days come from the cached calendar; archived ranges are counted from
+    the archive files.
+    """
+    users_queryset = User.objects.filter(is_active=True)
+    
+    if user_type:
+        users_queryset = users_queryset.filter(user_type=user_type)
+    
+    if department:
+        users_queryset = users_queryset.filter(department=department)
+    
+    # Calculate working days (excluding weekends and holidays)
+    working_days = working_days_between(start_date, end_date)
+    
+    rows = users_queryset.annotate(
+        period_records=FilteredRelation(
+            'attendance_records',
+            condition=Q(attendance_records__date__range=[start_date, end_date])
+        )
+    ).annotate(
+        present_days=Count('period_records', filter=Q(period_records__status='present')),
+        absent_days=Count('period_records', filter=Q(period_records__status='absent')),
+        late_days=Count('period_records', filter=Q(period_records__status='late')),
+    ).values(
+        'id', 'username', 'first_name', 'last_name', 'email', 'user_type',
+        'department', 'employee_id', 'student_id',
+        'present_days', 'absent_days', 'late_days'
+    ).order_by('id')
+    
+    archived = archived_status_counts(start_date, end_date)
+    report_data = []
+    
+    for row in rows:
+        if row['id'] in archived:
+            for name, count in archived[row['id']].items():
+                row[name] += count
+        
+        attendance_percentage = (
+            (row['present_days'] + row['late_days']) / working_days * 100 
+            if working_days > 0 else 0
+        )
+        
+        report_data.append({
+            'user_id': row['id'],
+            'username': row['username'],
+            'full_name': f"{row['first_name']} {row['last_name']}".strip(),
+            'email': row['email'],
+            'user_type': row['user_type'],
+            'department': row['department'],
+            'employee_id': row['employee_id'],
+            'student_id': row['student_id'],
+            'present_days': row['present_days'],
+            'absent_days': row['absent_days'],
+            'late_days': row['late_days'],
+            'working_days': working_days,
+            'attendance_percentage': round(attendance_percentage, 2)
+        })
+    
+    return {
+        'period': {
+            'start_date': start_date,
+            'end_date': end_date
+        },
+        'filters': {
+            'user_type': user_type,
+            'department': department
+        },
+        'report': report_data,
+        'summary': {
+            'total_users': len(report_data),
+            'average_attendance': round(
+                sum(item['attendance_percentage'] for item in report_data) / len(report_data)
+                if report_data else 0, 2
+            )
+        }
+    }
+
+
+def build_arrival_distribution(start_date, end_date, bucket_minutes=15, user_type=None,
+                               department=None, class_id=None, section_id=None):
+    """
+    Check-in time histogram and weekday x time heatmap for a date range.
+
+    Check-ins are bucketed by the database (local minute of the day divided
+    by bucket_minutes) and counted per (ISO weekday, bucket) in one grouped
+    query; the histogram is the heatmap summed over weekdays.
+    """
+    users = None
+    if user_type or department or class_id or section_id:
+        users = User.objects.filter(is_active=True)
+        if user_type:
+            users = users.filter(user_type=user_type)
+        if department:
+            users = users.filter(department=department)
+        if class_id:
+            users = users.filter(student_profile__class_obj_id=class_id)
+        if section_id:
+            users = users.filter(student_profile__section_id=section_id)
+
+    records = AttendanceRecord.objects.filter(
+        date__range=[start_date, end_date],
+        check_in_time__isnull=False
+    )
+    if users is not None:
+        records = records.filter(user__in=users)
+
+    minute_of_day = ExtractHour('check_in_time') * 60 + ExtractMinute('check_in_time')
+    rows = records.annotate(
+        weekday=ExtractIsoWeekDay('date'),
+        bucket=Cast(Floor(minute_of_day / bucket_minutes), IntegerField()),
+    ).values('weekday', 'bucket').annotate(count=Count('id')).order_by()
+
+    counts = Counter({(row['weekday'], row['bucket']): row['count'] for row in rows})
+    archived = archived_arrival_counts(
+        start_date, end_date, bucket_minutes,
+        user_ids=None if users is None else users.values_list('id', flat=True)
+    )
+    counts.update(archived)
+
+    buckets = sorted({bucket for _, bucket in counts})
+    if buckets:
+        buckets = list(range(buckets[0], buckets[-1] + 1))
+    labels = [
+        f'{bucket * bucket_minutes // 60:02d}:{bucket * bucket_minutes % 60:02d}' for bucket in buckets
+    ]
+
+    return {
+        'period': {
+            'start_date': start_date,
+            'end_date': end_date
+        },
+        'filters': {
+            'user_type': user_type,
+            'department': department,
+            'class_id': class_id,
+            'section_id': section_id
+        },
+        'bucket_minutes': bucket_minutes,
+        'total_check_ins': sum(counts.values()),
+        'histogram': [
+            {'start': label, 'count': sum(counts[(weekday, bucket)] for weekday in range(1, 8))}
+            for bucket, label in zip(buckets, labels)
+        ],
+        'heatmap': {
+            'weekdays': WEEKDAYS,
+            'buckets': labels,
+            'counts': [[counts[(weekday, bucket)] for bucket in buckets] for weekday in range(1, 8)]
+        }
+    }
+
@@ -1,6 +1,12 @@
+from datetime import timedelta
 from rest_framework import serializers
+from django.conf import settings
 from django.contrib.auth import get_user_model
-from .models import AttendanceRecord, AttendanceSession, Holiday
+from django.utils import timezone
+from django.urls import reverse
+from .archive import ArchivedDateError, ensure_not_archived
+from .models import AttendanceRecord, AttendanceSession, Holiday, StudentAttendanceAnalytics, ReportJob
+from .services import parse_status
 from users.serializers import UserProfileSerializer
 
 User = get_user_model()
@@ -38,6 +44,14 @@ class AttendanceRecordSerializer(serializers.ModelSerializer):
                 "Check-out time must be after check-in time"
             )
         
+        dates = {attrs.get('date')}
+        if self.instance is not None:
+            dates.add(self.instance.date)
+        try:
+            ensure_not_archived(day for day in dates if day)
+        except ArchivedDateError as e:
+            raise serializers.ValidationError(str(e))
+        
         return attrs
 
 
@@ -162,4 +176,144 @@ class CheckInSerializer(serializers.Serializer):
     """Serializer for face recognition check-in"""
     image = serializers.ImageField()
     location = serializers.CharField(max_length=200, required=False)
-    session_id = serializers.IntegerField(required=False)
\ No newline at end of file
+    session_id = serializers.IntegerField(required=False)
+
+
+class BulkSectionAttendanceSerializer(serializers.Serializer):
+    """Serializer for marking a whole section's roll call at once"""
+    section_id = serializers.IntegerField()
+    date = serializers.DateField()
+    statuses = serializers.DictField(child=serializers.CharField(), allow_empty=True)
+    default_status = serializers.CharField(required=False, allow_blank=True)
+
+    def validate_statuses(self, value):
+        parsed = {}
+        invalid = []
+        for roll_number, code in value.items():
+            parsed[roll_number] = parse_status(code)
+            if parsed[roll_number] is None:
+                invalid.append(roll_number)
+        if invalid:
+            raise serializers.ValidationError(
+                f"Invalid status for roll numbers: {', '.join(invalid)}"
+            )
+        return parsed
+
+    def validate_date(self, value):
+        try:
+            ensure_not_archived([value])
+        except ArchivedDateError as e:
+            raise serializers.ValidationError(str(e))
+        return value
+
+    def validate_default_status(self, value):
+        if not value:
+            return None
+        status = parse_status(value)
+        if status is None:
+            raise serializers.ValidationError("Must be P, A, L or a status name")
+        return status
+
+
+class KioskEventSerializer(serializers.Serializer):
+    """One scan buffered by a kiosk while it was offline"""
+    key = serializers.CharField(max_length=100)
+    user_id = serializers.IntegerField()
+    timestamp = serializers.DateTimeField()
+    location = serializers.CharField(max_length=200, required=False, allow_blank=True, default='')
+    confidence_score = serializers.FloatField(required=False, allow_null=True, default=None)
+    marked_by_face_recognition = serializers.BooleanField(required=False, default=True)
+
+    def validate_timestamp(self, value):
+        # Allow for a kiosk clock running slightly ahead
+        if value > timezone.now() + timedelta(minutes=5):
+            raise serializers.ValidationError("Timestamp is in the future")
+        try:
+            ensure_not_archived([value])
+        except ArchivedDateError as e:
+            raise serializers.ValidationError(str(e))
+        return value
+
+
+class KioskSyncSerializer(serializers.Serializer):
+    """Serializer for a kiosk's offline sync batch"""
+    kiosk_id = serializers.CharField(max_length=100, required=False, allow_blank=True, default='')
+    events = KioskEventSerializer(many=True, allow_empty=False)
+
+    def validate_events(self, value):
+        limit = getattr(settings, 'KIOSK_SYNC_MAX_EVENTS', 1000)
+        if len(value) > limit:
+            raise serializers.ValidationError(f"At most {limit} events per sync")
+        return value
+
+
+class StudentAttendanceAnalyticsSerializer(serializers.ModelSerializer):
+    username = serializers.CharField(source='user.username', read_only=True)
+    full_name = serializers.CharField(source='user.get_full_name', read_only=True)
+    student_id = serializers.CharField(source='user.student_profile.student_id', read_only=True)
+    class_id = serializers.IntegerField(source='user.student_profile.class_obj_id', read_only=True)
+    section_id = serializers.IntegerField(source='user.student_profile.section_id', read_only=True)
+    roll_number = serializers.CharField(source='user.student_profile.roll_number', read_only=True)
+    
+    class Meta:
+        model = StudentAttendanceAnalytics
+        fields = [
+            'id', 'user', 'username', 'full_name', 'student_id', 'class_id', 'section_id',
+            'roll_number', 'start_date', 'end_date', 'working_days', 'attendance_rate',
+            'recent_rate', 'rate_change', 'late_rate', 'late_trend', 'longest_absence_streak',
+            'current_absence_streak', 'at_risk', 'risk_reasons', 'computed_at'
+        ]
+        read_only_fields = fields
+
+
+class ReportJobRequestSerializer(serializers.Serializer):
+    """Parameters of a background report; validated_data['params'] is their canonical form"""
+    kind = serializers.ChoiceField(choices=ReportJob.KIND_CHOICES)
+    start_date = serializers.DateField(required=False)
+    end_date = serializers.DateField(required=False)
+    user_type = serializers.CharField(required=False, allow_blank=True)
+    department = serializers.CharField(required=False, allow_blank=True)
+    class_id = serializers.IntegerField(required=False)
+    section_id = serializers.IntegerField(required=False)
+
+    def validate(self, attrs):
+        kind = attrs['kind']
+        today = timezone.now().date()
+        if kind == 'attendance':
+            # Same defaults as attendance_report: the current month
+            start_date = attrs.get('start_date') or today.replace(day=1)
+            end_date = attrs.get('end_date') or today
+            params = {'user_type': attrs.get('user_type') or None, 'department': attrs.get('department') or None}
+        else:
+            # Same defaults as attendance_by_class / attendance_by_section: one day
+            start_date = attrs.get('start_date') or today
+            end_date = attrs.get('end_date') or start_date
+            field = f'{kind}_id'
+            if not attrs.get(field):
+                raise serializers.ValidationError({field: f"Required for {kind} reports"})
+            params = {field: attrs[field]}
+
+        if start_date > end_date:
+            raise serializers.ValidationError("start_date must not be after end_date")
+        params.update(start_date=start_date.isoformat(), end_date=end_date.isoformat())
+        return {'kind': kind, 'params': params}
+
+
+class ReportJobSerializer(serializers.ModelSerializer):
+    download_url = serializers.SerializerMethodField()
+    
+    class Meta:
+        model = ReportJob
+        fields = [
+            'id', 'kind', 'params', 'status', 'progress', 'error', 'download_url',
+            'created_at', 'started_at', 'finished_at'
+        ]
+        read_only_fields = fields
+    
+    def get_download_url(self, obj):
+        if obj.status != 'completed':
+            return None
+        url = reverse('report-job-download', args=[obj.pk])
+        request = self.context.get('request')
+        return request.build_absolute_uri(url) if request else url
+
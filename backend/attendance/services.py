@@ -0,0 +1,461 @@
+from collections import Counter, defaultdict
+from django.conf import settings
+from django.db import connections, router, transaction, IntegrityError
+from django.db.models import Exists, OuterRef
+from django.db.models.signals import post_save
+from django.utils import timezone
+from .archive import ensure_not_archived
+from .models import AttendanceRecord
+from .status_rules import RULED_STATUSES, check_in_status, start_time_for, start_times
+from .summaries import refresh_summaries
+
+CHECK_IN = 'check_in'
+CHECK_OUT = 'check_out'
+ALREADY_CHECKED_OUT = 'already_checked_out'
+
+# Compact status codes accepted by bulk roll call
+STATUS_CODES = {
+    'P': 'present',
+    'A': 'absent',
+    'L': 'late',
+}
+
+# Backends whose INSERT ... ON CONFLICT ... RETURNING we can rely on
+UPSERT_VENDORS = ('postgresql', 'sqlite')
+
+
+def record_check(user, location='', marked_by_face_recognition=False, confidence_score=None, when=None):
+    """
+    Check a user in or out for the day in a single atomic statement
+    (INSERT ... ON CONFLICT on PostgreSQL and SQLite, a row lock elsewhere).
+
+    The first scan of the day inserts the record (check-in), the second sets
+    check_out_time (check-out), later scans leave the row unchanged. Concurrent
+    scans for the same user are serialised by the (user, date) unique key.
+
+    Returns:
+        tuple: (AttendanceRecord, action) where action is CHECK_IN, CHECK_OUT
+        or ALREADY_CHECKED_OUT
+    """
+    when = when or timezone.now()
+    ensure_not_archived([when])
+    values = {
+        'user_id': user.pk,
+        'date': timezone.localdate(when),
+        'check_in_time': when,
+        'status': check_in_status(when, start_time_for(user.pk)),
+        'marked_by_face_recognition': marked_by_face_recognition,
+        'confidence_score': confidence_score,
+        'location': location,
+        'notes': '',
+        'created_at': when,
+        'updated_at': when,
+    }
+
+    db = router.db_for_write(AttendanceRecord)
+    upsert = connections[db].vendor in UPSERT_VENDORS
+    if upsert:
+        record = _upsert(db, values)
+        created = record.created_at == when
+    else:
+        record, created = _locked_check(db, values)
+
+    if record.check_in_time == when:
+        action = CHECK_IN
+    elif record.check_out_time == when:
+        action = CHECK_OUT
+    else:
+        return record, ALREADY_CHECKED_OUT
+
+    if upsert and not created:
+        # The RETURNING row carries the new values; summaries need the old ones
+        if action == CHECK_OUT:
+            record._loaded_values['check_out_time'] = None
+        else:
+            record._loaded_values = None
+
+    # The upsert bypasses Model.save(), so notify receivers explicitly
+    post_save.send(
+        sender=AttendanceRecord, instance=record, created=created,
+        update_fields=None, raw=False, using=db
+    )
+    return record, action
+
+
+def fold_scans(check_in, check_out, timestamps):
+    """
+    Merge scans into a day's (check_in, check_out) in time order: the
+    earliest scan is the check-in, the next one the check-out and later ones
+    are ignored, whatever order the scans arrived in
+    """
+    times = sorted({value for value in (check_in, check_out, *timestamps) if value is not None})
+    return (times[0] if times else None, times[1] if len(times) > 1 else None)
+
+
+def merge_scans(record, scans, start_time=None):
+    """
+    Fold scans into an (unsaved) record: the check-in scan also sets the
+    location, confidence and face recognition flag, and turns an absence
+    into 'present' or 'late' (see status_rules; start_time is the user's
+    scheduled start, None for the default).
+    Returns:
+        list: CHECK_IN, CHECK_OUT or ALREADY_CHECKED_OUT for each scan
+    """
+    old_in, old_out = record.check_in_time, record.check_out_time
+    check_in, check_out = fold_scans(old_in, old_out, [scan['timestamp'] for scan in scans])
+
+    actions = []
+    for scan in scans:
+        timestamp = scan['timestamp']
+        if timestamp == check_in and timestamp != old_in:
+            actions.append(CHECK_IN)
+            if old_in is None or record.status in RULED_STATUSES:
+                record.status = check_in_status(timestamp, start_time)
+            record.marked_by_face_recognition = scan.get('marked_by_face_recognition', False)
+            record.confidence_score = scan.get('confidence_score')
+            record.location = scan.get('location', '')
+        elif timestamp == check_out and timestamp != old_out:
+            actions.append(CHECK_OUT)
+        else:
+            actions.append(ALREADY_CHECKED_OUT)
+    record.check_in_time = check_in
+    record.check_out_time = check_out
+    return actions
+
+
+def apply_scans(scans, replace=False):
+    """
+    Apply many timestamped scans with bulk writes. Run it inside a
+    transaction; existing rows for the affected days are locked.
+
+    Args:
+        scans: dicts with user_id, timestamp and optionally location,
+            confidence_score and marked_by_face_recognition
+        replace: drop the check-in/out already on the affected rows and
+            fold only these scans (rebuilding a day from its full history)
+    Returns:
+        list: CHECK_IN, CHECK_OUT or ALREADY_CHECKED_OUT for each scan
+    """
+    by_day = defaultdict(list)
+    for index, scan in enumerate(scans):
+        by_day[(scan['user_id'], timezone.localdate(scan['timestamp']))].append(index)
+    if not by_day:
+        return []
+    ensure_not_archived({day for _, day in by_day})
+
+    existing = {
+        (record.user_id, record.date): record
+        for record in AttendanceRecord.objects.select_for_update().filter(
+            user_id__in={user_id for user_id, _ in by_day},
+            date__in={day for _, day in by_day}
+        )
+    }
+
+    schedule = start_times({user_id for user_id, _ in by_day})
+    now = timezone.now()
+    actions = [None] * len(scans)
+    to_create = []
+    to_update = []
+    for (user_id, day), indexes in by_day.items():
+        record = existing.get((user_id, day))
+        if record is None:
+            record = AttendanceRecord(user_id=user_id, date=day, notes='', created_at=now)
+            to_create.append(record)
+        old_values = (record.check_in_time, record.check_out_time, record.status)
+        if replace:
+            record.check_in_time = record.check_out_time = None
+
+        merged = merge_scans(record, [scans[i] for i in indexes], schedule.get(user_id))
+        for index, action in zip(indexes, merged):
+            actions[index] = action
+
+        if record.pk is not None:
+            if (record.check_in_time, record.check_out_time, record.status) == old_values:
+                continue
+            to_update.append(record)
+        record.updated_at = now
+
+    # Bulk writes skip Model.save() and its signals; summaries are refreshed below
+    AttendanceRecord.objects.bulk_create(to_create, batch_size=500)
+    AttendanceRecord.objects.bulk_update(
+        to_update,
+        ['check_in_time', 'check_out_time', 'status', 'marked_by_face_recognition',
+         'confidence_score', 'location', 'updated_at'],
+        batch_size=500
+    )
+    refresh_summaries({(record.user_id, record.date) for record in to_create + to_update})
+    return actions
+
+
+def submit_check(user, **kwargs):
+    """
+    Check a user in or out: record_check(), the check event log when
+    ATTENDANCE_CHECK_EVENTS is on (see attendance.events), or the
+    write-behind journal when ATTENDANCE_WRITE_BEHIND is on (see
+    attendance.journal)
+    """
+    if getattr(settings, 'ATTENDANCE_CHECK_EVENTS', False):
+        from .events import log_check
+        return log_check(user, **kwargs)
+    if getattr(settings, 'ATTENDANCE_WRITE_BEHIND', False):
+        from .journal import get_journal
+        return get_journal().record_check(user, **kwargs)
+    return record_check(user, **kwargs)
+
+
+def pending_scans(day, user_ids=None):
+    """
+    Scans of day not in attendance_records yet: this process's write-behind
+    journal and, with ATTENDANCE_CHECK_EVENTS on, unprojected check events
+    """
+    from .journal import pending_scans as journal_scans
+
+    scans = [scan for scan in journal_scans(day) if user_ids is None or scan['user_id'] in user_ids]
+    if getattr(settings, 'ATTENDANCE_CHECK_EVENTS', False):
+        from .events import unprojected_scans
+        scans += unprojected_scans(day, user_ids)
+    return scans
+
+
+def day_records(day, user_ids=None):
+    """
+    Attendance of one day as user_id -> AttendanceRecord, including scans
+    still pending in the write-behind journal or the check event log (those
+    records are unsaved). Reads of today's status go through here.
+    """
+    queryset = AttendanceRecord.objects.filter(date=day)
+    if user_ids is not None:
+        user_ids = set(user_ids)
+        queryset = queryset.filter(user_id__in=user_ids)
+    records = {record.user_id: record for record in queryset}
+
+    by_user = defaultdict(list)
+    for scan in pending_scans(day, user_ids):
+        by_user[scan['user_id']].append(scan)
+    schedule = start_times(by_user) if by_user else {}
+    for user_id, scans in by_user.items():
+        record = records.get(user_id)
+        if record is None:
+            record = records[user_id] = AttendanceRecord(user_id=user_id, date=day, notes='')
+        merge_scans(record, scans, schedule.get(user_id))
+    return records
+
+
+def present_user_ids(day):
+    """Users marked present or late on day (including pending write-behind or logged check-ins)"""
+    user_ids = set(
+        AttendanceRecord.objects.filter(
+            date=day, status__in=['present', 'late']
+        ).values_list('user_id', flat=True)
+    )
+    user_ids.update(scan['user_id'] for scan in pending_scans(day))
+    return user_ids
+
+
+def _upsert(db, values):
+    connection = connections[db]
+    qn = connection.ops.quote_name
+    opts = AttendanceRecord._meta
+    table = qn(opts.db_table)
+    columns = [opts.get_field(name).column for name in values]
+    returning = ', '.join(qn(field.column) for field in opts.concrete_fields)
+
+    def existing(name):
+        return f'{table}.{qn(opts.get_field(name).column)}'
+
+    def excluded(name):
+        return f'EXCLUDED.{qn(opts.get_field(name).column)}'
+
+    # An existing row without a check-in (e.g. a materialised absence) is
+    # checked in; otherwise the first repeat scan becomes the check-out.
+    no_check_in = f"{existing('check_in_time')} IS NULL"
+    no_check_out = f"{existing('check_out_time')} IS NULL"
+    check_in_columns = ['check_in_time', 'status', 'marked_by_face_recognition', 'confidence_score', 'location']
+    assignments = [
+        f"{qn(opts.get_field(name).column)} = CASE WHEN {no_check_in} "
+        f"THEN {excluded(name)} ELSE {existing(name)} END"
+        for name in check_in_columns
+    ]
+    assignments.append(
+        f"{qn(opts.get_field('check_out_time').column)} = CASE "
+        f"WHEN {no_check_in} THEN {existing('check_out_time')} "
+        f"WHEN {no_check_out} THEN {excluded('check_in_time')} "
+        f"ELSE {existing('check_out_time')} END"
+    )
+    assignments.append(
+        f"{qn(opts.get_field('updated_at').column)} = CASE "
+        f"WHEN {no_check_in} OR {no_check_out} THEN {excluded('updated_at')} "
+        f"ELSE {existing('updated_at')} END"
+    )
+
+    sql = (
+        f"INSERT INTO {table} ({', '.join(qn(column) for column in columns)}) "
+        f"VALUES ({', '.join(['%s'] * len(columns))}) "
+        f"ON CONFLICT ({qn(opts.get_field('user').column)}, {qn(opts.get_field('date').column)}) "
+        f"DO UPDATE SET {', '.join(assignments)} "
+        f"RETURNING {returning}"
+    )
+    # raw() applies the model's field converters to the RETURNING row
+    return list(AttendanceRecord.objects.using(db).raw(sql, list(values.values())))[0]
+
+
+def _locked_check(db, values):
+    """Fallback for backends without ON CONFLICT: the same rules under a row lock"""
+    manager = AttendanceRecord.objects.using(db)
+    for attempt in range(2):
+        try:
+            with transaction.atomic(using=db):
+                record = manager.select_for_update().filter(
+                    user_id=values['user_id'], date=values['date']
+                ).first()
+                if record is None:
+                    # bulk_create skips Model.save() and its signal; record_check sends it
+                    return manager.bulk_create([AttendanceRecord(**values)])[0], True
+
+                if record.check_in_time is None:
+                    changes = {
+                        name: values[name] for name in (
+                            'check_in_time', 'status', 'marked_by_face_recognition',
+                            'confidence_score', 'location', 'updated_at'
+                        )
+                    }
+                elif record.check_out_time is None:
+                    changes = {'check_out_time': values['check_in_time'], 'updated_at': values['updated_at']}
+                else:
+                    return record, False
+
+                manager.filter(pk=record.pk).update(**changes)
+                for name, value in changes.items():
+                    setattr(record, name, value)
+                return record, False
+        except IntegrityError:
+            # Lost the insert race to a concurrent scan; the row exists now
+            if attempt:
+                raise
+
+
+def parse_status(value):
+    """Map a status code ('P') or name ('present') to a status, or None if invalid"""
+    value = str(value).strip()
+    if value.upper() in STATUS_CODES:
+        return STATUS_CODES[value.upper()]
+    if value.lower() in STATUS_CODES.values():
+        return value.lower()
+    return None
+
+
+def mark_section(section, date, statuses, default_status=None):
+    """
+    Record roll call for a whole section in one transaction.
+
+    statuses maps roll numbers to status codes or names. Students left out
+    get default_status only if they have no record for the day yet (so a
+    face recognition check-in is never overwritten by the default); with
+    default_status None they are left untouched. Existing rows of listed
+    students keep their check-in/out times and only change status.
+
+    Returns:
+        tuple: (Counter of status -> students marked, list of unknown roll numbers)
+    """
+    from students.models import Student
+
+    ensure_not_archived([date])
+    roster = dict(
+        Student.objects.filter(section=section, is_active=True).values_list('roll_number', 'user_id')
+    )
+    unknown = sorted(set(statuses) - set(roster))
+    if unknown:
+        return Counter(), unknown
+
+    marks = {roster[roll_number]: status for roll_number, status in statuses.items()}
+    now = timezone.now()
+    with transaction.atomic():
+        AttendanceRecord.objects.bulk_create(
+            [
+                AttendanceRecord(user_id=user_id, date=date, status=status, created_at=now, updated_at=now)
+                for user_id, status in marks.items()
+            ],
+            update_conflicts=True,
+            unique_fields=['user', 'date'],
+            update_fields=['status', 'updated_at'],
+            batch_size=500
+        )
+
+        defaults = {}
+        if default_status:
+            recorded = set(
+                AttendanceRecord.objects.filter(
+                    date=date, user_id__in=roster.values()
+                ).values_list('user_id', flat=True)
+            )
+            defaults = {user_id: default_status for user_id in roster.values() if user_id not in recorded}
+            # ignore_conflicts: a check-in racing the roll call wins over the default
+            AttendanceRecord.objects.bulk_create(
+                [
+                    AttendanceRecord(user_id=user_id, date=date, status=status, created_at=now, updated_at=now)
+                    for user_id, status in defaults.items()
+                ],
+                ignore_conflicts=True,
+                batch_size=500
+            )
+        # bulk_create skips the per-record signals that maintain summaries
+        refresh_summaries({(user_id, date) for user_id in {**marks, **defaults}})
+
+    return Counter(marks.values()) + Counter(defaults.values()), []
+
+
+def materialize_absences(date, batch_size=5000):
+    """
+    Insert an 'absent' record for every active student without a record on date.
+
+    Missing students are found with one anti-join (NOT EXISTS) and inserted
+    with bulk_create in batches. Existing rows are never touched, so running
+    it twice for the same day inserts nothing the second time. The monthly
+    summaries of the students marked absent are refreshed per batch.
+
+    Returns:
+        int: number of absent rows inserted (rows dropped because a
+        check-in raced the job are not counted)
+    """
+    from students.models import Student
+
+    ensure_not_archived([date])
+    missing = Student.objects.filter(
+        is_active=True,
+        user__is_active=True,
+        admission_date__lte=date
+    ).exclude(
+        Exists(AttendanceRecord.objects.filter(user_id=OuterRef('user_id'), date=date))
+    ).values_list('user_id', flat=True)
+
+    def insert(batch):
+        # ignore_conflicts keeps it safe against check-ins racing the job, but
+        # does not report what it dropped: compare the batch's bare absences
+        # around it (a racing check-in that won has a check-in time)
+        existing = AttendanceRecord.objects.filter(
+            date=date,
+            user_id__in=[record.user_id for record in batch],
+            status='absent',
+            check_in_time__isnull=True
+        ).values_list('user_id', flat=True)
+        before = set(existing)
+        AttendanceRecord.objects.bulk_create(batch, ignore_conflicts=True)
+        inserted = set(existing.all()) - before  # all(): query again, not the cached rows
+        # bulk_create skips the per-record signals that maintain summaries
+        refresh_summaries({(user_id, date) for user_id in inserted})
+        return len(inserted)
+
+    now = timezone.now()
+    inserted = 0
+    batch = []
+    with transaction.atomic():
+        for user_id in missing.iterator(chunk_size=batch_size):
+            batch.append(AttendanceRecord(
+                user_id=user_id, date=date, status='absent', created_at=now, updated_at=now
+            ))
+            if len(batch) >= batch_size:
+                inserted += insert(batch)
+                batch = []
+        if batch:
+            inserted += insert(batch)
+    return inserted
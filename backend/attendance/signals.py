@@ -0,0 +1,34 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from .models import AttendanceRecord, ArchivedPartition, Holiday
+from .summaries import record_saved, record_deleted
+from .working_days import invalidate_calendars
+
+
+@receiver(post_save, sender=AttendanceRecord)
+def update_monthly_summary(sender, instance, created, raw=False, **kwargs):
+    """Apply the change in a record to its user's monthly summary"""
+    if raw:
+        return
+    record_saved(instance, created)
+
+
+@receiver(post_delete, sender=AttendanceRecord)
+def update_monthly_summary_on_delete(sender, instance, **kwargs):
+    """Remove a deleted record from its user's monthly summary"""
+    record_deleted(instance)
+
+
+@receiver(post_save, sender=Holiday)
+@receiver(post_delete, sender=Holiday)
+def refresh_working_day_calendars(sender, instance, **kwargs):
+    """Holidays changed: rebuild the working-day calendars on next use"""
+    invalidate_calendars()
+
+
+@receiver(post_save, sender=ArchivedPartition)
+@receiver(post_delete, sender=ArchivedPartition)
+def refresh_archive_manifest(sender, instance, **kwargs):
+    """A partition was archived or dropped: reload the manifest on next use"""
+    from .archive import invalidate_manifest
+    invalidate_manifest()
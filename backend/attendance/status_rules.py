@@ -0,0 +1,106 @@
+from collections import Counter
+from datetime import datetime, time, timedelta
+from django.conf import settings
+from django.db import transaction
+from django.db.models import IntegerField, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce, ExtractHour, ExtractMinute, ExtractSecond
+from django.db.models.lookups import GreaterThan, LessThanOrEqual
+from django.utils import timezone
+from .models import AttendanceRecord
+from .summaries import check_in_seconds_expression, rebuild_summaries
+
+# Statuses the rules derive from the check-in time; absences and rows
+# without a check-in are left alone
+RULED_STATUSES = ('present', 'late')
+
+
+def default_start_time():
+    """Start of the day for users without a scheduled section"""
+    return time.fromisoformat(getattr(settings, 'ATTENDANCE_DEFAULT_START_TIME', '09:00'))
+
+
+def grace_period():
+    return timedelta(minutes=getattr(settings, 'ATTENDANCE_LATE_GRACE_MINUTES', 5))
+
+
+def start_times(user_ids):
+    """user_id -> schedule_start_time of the student's section, for students whose section has one"""
+    from students.models import Student
+
+    return dict(
+        Student.objects.filter(
+            user_id__in=user_ids, section__schedule_start_time__isnull=False
+        ).values_list('user_id', 'section__schedule_start_time')
+    )
+
+
+def start_time_for(user_id):
+    return start_times([user_id]).get(user_id)
+
+
+def check_in_status(check_in_time, start_time=None):
+    """
+    'late' when the local check-in time is after the start of the day
+    (start_time, or the default start) plus the grace period, else 'present'.
+    The check-in is compared with its own date, at whole-second precision.
+    """
+    local = timezone.localtime(check_in_time).replace(microsecond=0, tzinfo=None)
+    cutoff = datetime.combine(local.date(), start_time or default_start_time()) + grace_period()
+    return 'late' if local > cutoff else 'present'
+
+
+def _cutoff_seconds_expression():
+    """Local cutoff of each row's user in seconds since midnight, computed by the database"""
+    from students.models import Student
+
+    default = default_start_time()
+    default_seconds = default.hour * 3600 + default.minute * 60 + default.second
+    section_start = Student.objects.filter(
+        user_id=OuterRef('user_id'), section__schedule_start_time__isnull=False
+    ).annotate(
+        seconds=(
+            ExtractHour('section__schedule_start_time') * 3600
+            + ExtractMinute('section__schedule_start_time') * 60
+            + ExtractSecond('section__schedule_start_time')
+        )
+    ).values('seconds')[:1]
+    return Coalesce(
+        Subquery(section_start, output_field=IntegerField()), Value(default_seconds)
+    ) + Value(int(grace_period().total_seconds()))
+
+
+def recompute_statuses(start_date, end_date, chunk_days=31, dry_run=False):
+    """
+    Reclassify present/late records of [start_date, end_date] against the
+    current rules with two set-based UPDATEs per chunk of days (one per
+    direction, touching only rows whose status changes), then rebuild the
+    monthly summaries of the range. Archived months are not touched.
+    Returns:
+        Counter: 'late' and 'present' -> records changed to that status
+    """
+    changed = Counter()
+    chunk_start = start_date
+    while chunk_start <= end_date:
+        chunk_end = min(chunk_start + timedelta(days=chunk_days - 1), end_date)
+        records = AttendanceRecord.objects.filter(
+            date__range=[chunk_start, chunk_end], check_in_time__isnull=False
+        )
+        is_late = GreaterThan(check_in_seconds_expression(), _cutoff_seconds_expression())
+        is_on_time = LessThanOrEqual(check_in_seconds_expression(), _cutoff_seconds_expression())
+        to_late = records.filter(is_late, status='present')
+        to_present = records.filter(is_on_time, status='late')
+
+        if dry_run:
+            changed['late'] += to_late.count()
+            changed['present'] += to_present.count()
+        else:
+            now = timezone.now()
+            with transaction.atomic():
+                changed['late'] += to_late.update(status='late', updated_at=now)
+                changed['present'] += to_present.update(status='present', updated_at=now)
+        chunk_start = chunk_end + timedelta(days=1)
+
+    # update() skips the post_save receivers that keep summaries in step
+    if not dry_run and sum(changed.values()):
+        rebuild_summaries(start_date, end_date)
+    return changed
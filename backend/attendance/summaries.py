@@ -0,0 +1,348 @@
+import threading
+from collections import defaultdict
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from django.db import IntegrityError, transaction
+from django.db.models import Count, DurationField, ExpressionWrapper, F, Q, Sum
+from django.db.models.functions import ExtractHour, ExtractMinute, ExtractSecond, TruncMonth
+from django.utils import timezone
+from .models import AttendanceRecord, AttendanceMonthlySummary
+
+COUNTER_FIELDS = ['present_days', 'absent_days', 'late_days', 'check_in_count', 'check_in_seconds']
+STATUS_FIELDS = {
+    'present': 'present_days',
+    'absent': 'absent_days',
+    'late': 'late_days',
+}
+
+_state = threading.local()
+
+
+def month_start(day):
+    return day.replace(day=1)
+
+
+def next_month(day):
+    return (day.replace(day=28) + timedelta(days=4)).replace(day=1)
+
+
+def worked_time_expression():
+    """check_out_time - check_in_time as a database-side duration"""
+    return ExpressionWrapper(F('check_out_time') - F('check_in_time'), output_field=DurationField())
+
+
+def check_in_seconds_expression():
+    """Seconds since local midnight of check_in_time, computed by the database"""
+    return (
+        ExtractHour('check_in_time') * 3600
+        + ExtractMinute('check_in_time') * 60
+        + ExtractSecond('check_in_time')
+    )
+
+
+def contribution(user_id, record_date, status, check_in_time, check_out_time):
+    """
+    What one attendance record adds to its user's monthly summary
+    Returns:
+        tuple: ((user_id, month), dict of field -> amount)
+    """
+    amounts = dict.fromkeys(COUNTER_FIELDS, 0)
+    amounts['worked_time'] = timedelta()
+    if status in STATUS_FIELDS:
+        amounts[STATUS_FIELDS[status]] = 1
+    if check_in_time:
+        local = timezone.localtime(check_in_time)
+        amounts['check_in_count'] = 1
+        amounts['check_in_seconds'] = local.hour * 3600 + local.minute * 60 + local.second
+        if check_out_time and check_out_time > check_in_time:
+            amounts['worked_time'] = check_out_time - check_in_time
+    return (user_id, month_start(record_date)), amounts
+
+
+def instance_contribution(record):
+    return contribution(
+        record.user_id, record.date, record.status, record.check_in_time, record.check_out_time
+    )
+
+
+def loaded_contribution(record):
+    """Contribution of the row as it was loaded from the database, or None if unknown"""
+    loaded = getattr(record, '_loaded_values', None)
+    fields = ('user_id', 'date', 'status', 'check_in_time', 'check_out_time')
+    if not loaded or any(name not in loaded for name in fields):
+        return None
+    return contribution(*(loaded[name] for name in fields))
+
+
+def apply_delta(key, amounts, sign=1):
+    """Add (or subtract, with sign=-1) a contribution to a summary row"""
+    user_id, month = key
+    changes = {
+        name: F(name) + sign * amount
+        for name, amount in amounts.items() if amount
+    }
+    if not changes:
+        return
+
+    updated = AttendanceMonthlySummary.objects.filter(user_id=user_id, month=month).update(**changes)
+    if updated:
+        return
+
+    negative = any(
+        amount < (timedelta() if isinstance(amount, timedelta) else 0) for amount in amounts.values()
+    )
+    if sign < 0 or negative:
+        # Nothing to subtract from: the summary predates tracking, recompute it
+        refresh_summaries([key])
+        return
+
+    try:
+        with transaction.atomic():
+            AttendanceMonthlySummary.objects.create(user_id=user_id, month=month, **amounts)
+    except IntegrityError:
+        # Created concurrently; fold our amounts into it instead
+        AttendanceMonthlySummary.objects.filter(user_id=user_id, month=month).update(**changes)
+
+
+def record_saved(record, created):
+    if summaries_suspended():
+        return
+
+    new_key, new_amounts = instance_contribution(record)
+    old = None if created else loaded_contribution(record)
+
+    if not created and old is None:
+        # Previous state unknown (e.g. row changed by a raw statement): recompute
+        refresh_summaries([new_key])
+    elif old is None:
+        apply_delta(new_key, new_amounts)
+    else:
+        old_key, old_amounts = old
+        if old_key == new_key:
+            delta = {name: new_amounts[name] - old_amounts[name] for name in new_amounts}
+            apply_delta(new_key, delta)
+        else:
+            apply_delta(old_key, old_amounts, sign=-1)
+            apply_delta(new_key, new_amounts)
+
+    record._loaded_values = {
+        'user_id': record.user_id,
+        'date': record.date,
+        'status': record.status,
+        'check_in_time': record.check_in_time,
+        'check_out_time': record.check_out_time,
+    }
+
+
+def record_deleted(record):
+    if summaries_suspended():
+        return
+    old = loaded_contribution(record) or instance_contribution(record)
+    apply_delta(*old, sign=-1)
+
+
+def refresh_summaries(keys):
+    """
+    Recompute the given (user_id, month) summaries from attendance_records,
+    with one grouped query per month. Fully archived months are skipped and
+    partly archived ones add their archived days, as in rebuild_summaries().
+    """
+    from .archive import archived_months, partly_archived_months
+
+    frozen = archived_months()
+    partial = partly_archived_months()
+    users_by_month = defaultdict(set)
+    for user_id, month in keys:
+        if month_start(month) not in frozen:
+            users_by_month[month_start(month)].add(user_id)
+
+    for month, user_ids in users_by_month.items():
+        rows = _aggregate(
+            AttendanceRecord.objects.filter(
+                user_id__in=user_ids, date__gte=month, date__lt=next_month(month)
+            ),
+            group_by_month=False
+        )
+        found = {row['user_id']: _summary_values(row) for row in rows}
+        if month in partial:
+            _add_archived(found, month, user_ids)
+        with transaction.atomic():
+            AttendanceMonthlySummary.objects.filter(user_id__in=user_ids, month=month).delete()
+            AttendanceMonthlySummary.objects.bulk_create([
+                AttendanceMonthlySummary(user_id=user_id, month=month, **values)
+                for user_id, values in found.items()
+            ])
+
+
+def rebuild_summaries(start_month=None, end_month=None, user_ids=None):
+    """
+    Rebuild summaries for a month range (all months by default) in bulk.
+    Fully archived months are left as they are: their rows are no longer in
+    attendance_records. Months archived in part add their archived days.
+    Returns:
+        int: number of summary rows written
+    """
+    from .archive import archived_months, partly_archived_months
+
+    frozen = archived_months()
+    partial = {
+        month for month in partly_archived_months()
+        if (not start_month or month >= month_start(start_month))
+        and (not end_month or month <= month_start(end_month))
+    }
+    partial_values = {month: {} for month in partial}
+    records = AttendanceRecord.objects.all()
+    summaries = AttendanceMonthlySummary.objects.exclude(month__in=frozen)
+    if start_month:
+        records = records.filter(date__gte=month_start(start_month))
+        summaries = summaries.filter(month__gte=month_start(start_month))
+    if end_month:
+        records = records.filter(date__lt=next_month(end_month))
+        summaries = summaries.filter(month__lte=month_start(end_month))
+    if user_ids is not None:
+        records = records.filter(user_id__in=user_ids)
+        summaries = summaries.filter(user_id__in=user_ids)
+
+    written = 0
+    with transaction.atomic():
+        summaries.delete()
+        batch = []
+        for row in _aggregate(records, group_by_month=True).iterator(chunk_size=2000):
+            month = month_start(row['month'])
+            if month in frozen:
+                continue
+            if month in partial:
+                partial_values[month][row['user_id']] = _summary_values(row)
+                continue
+            batch.append(AttendanceMonthlySummary(
+                user_id=row['user_id'], month=month, **_summary_values(row)
+            ))
+            if len(batch) >= 2000:
+                AttendanceMonthlySummary.objects.bulk_create(batch)
+                written += len(batch)
+                batch = []
+        for month, found in partial_values.items():
+            _add_archived(found, month, user_ids)
+            batch.extend(
+                AttendanceMonthlySummary(user_id=user_id, month=month, **values)
+                for user_id, values in found.items()
+            )
+        AttendanceMonthlySummary.objects.bulk_create(batch, batch_size=2000)
+        written += len(batch)
+    return written
+
+
+def _add_archived(found, month, user_ids=None):
+    """Add the archived days of a partly archived month to summary values by user"""
+    from .archive import archived_month_totals
+
+    for user_id, totals in archived_month_totals(month, user_ids).items():
+        values = found.setdefault(user_id, _with_defaults(dict.fromkeys(totals)))
+        for name in values:
+            values[name] += totals[name]
+
+
+def _aggregate(records, group_by_month):
+    group_by = ['user_id']
+    if group_by_month:
+        records = records.annotate(month=TruncMonth('date'))
+        group_by.append('month')
+    return records.values(*group_by).annotate(**_totals_expressions()).order_by(*group_by)
+
+
+def _totals_expressions():
+    has_check_in = Q(check_in_time__isnull=False)
+    worked = Q(check_in_time__isnull=False, check_out_time__gt=F('check_in_time'))
+    return {
+        'present': Count('id', filter=Q(status='present')),
+        'absent': Count('id', filter=Q(status='absent')),
+        'late': Count('id', filter=Q(status='late')),
+        'worked': Sum(worked_time_expression(), filter=worked),
+        'check_ins': Count('id', filter=has_check_in),
+        'check_in_total': Sum(check_in_seconds_expression(), filter=has_check_in),
+    }
+
+
+def _summary_values(row):
+    return {
+        'present_days': row['present'],
+        'absent_days': row['absent'],
+        'late_days': row['late'],
+        'worked_time': row['worked'] or timedelta(),
+        'check_in_count': row['check_ins'],
+        'check_in_seconds': row['check_in_total'] or 0,
+    }
+
+
+@contextmanager
+def suspend_summaries():
+    """Skip incremental updates, e.g. around a bulk job that refreshes afterwards"""
+    previous = getattr(_state, 'suspended', False)
+    _state.suspended = True
+    try:
+        yield
+    finally:
+        _state.suspended = previous
+
+
+def summaries_suspended():
+    return getattr(_state, 'suspended', False)
+
+
+def monthly_totals(user_id, start_month, end_month):
+    """Add up a user's summaries for whole months start_month..end_month"""
+    totals = AttendanceMonthlySummary.objects.filter(
+        user_id=user_id, month__gte=month_start(start_month), month__lte=month_start(end_month)
+    ).aggregate(
+        present_days=Sum('present_days'),
+        absent_days=Sum('absent_days'),
+        late_days=Sum('late_days'),
+        worked_time=Sum('worked_time'),
+        check_in_count=Sum('check_in_count'),
+        check_in_seconds=Sum('check_in_seconds'),
+    )
+    return _with_defaults(totals)
+
+
+def record_totals(user_id, start_date, end_date):
+    """
+    The same totals as monthly_totals() for any date range, aggregated
+    from attendance_records in a single query (plus archived rows, if the
+    range reaches into archived months)
+    """
+    from .archive import archived_totals
+
+    totals = _with_defaults(_summary_values(
+        AttendanceRecord.objects.filter(
+            user_id=user_id, date__range=[start_date, end_date]
+        ).aggregate(**_totals_expressions())
+    ))
+    archived = archived_totals(user_id, start_date, end_date)
+    if archived:
+        totals = {name: value + archived[name] for name, value in totals.items()}
+    return totals
+
+
+def _with_defaults(totals):
+    return {
+        name: value if value is not None else (timedelta() if name == 'worked_time' else 0)
+        for name, value in totals.items()
+    }
+
+
+def average_check_in(check_in_seconds, check_in_count):
+    """Mean local check-in time of day, or None without check-ins"""
+    if not check_in_count:
+        return None
+    return (datetime.min + timedelta(seconds=round(check_in_seconds / check_in_count))).time()
+
+
+def is_whole_months(start_date, end_date, today=None):
+    """
+    True when [start_date, end_date] covers complete calendar months, or runs
+    from a month start up to today (the usual "this month so far" range)
+    """
+    today = today or timezone.localdate()
+    if start_date.day != 1 or end_date < start_date:
+        return False
+    return next_month(end_date) - timedelta(days=1) == end_date or end_date == today
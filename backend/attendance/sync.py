@@ -0,0 +1,78 @@
+from django.db import transaction, IntegrityError
+from django.contrib.auth import get_user_model
+from .models import KioskSyncEvent
+from .services import apply_scans
+
+User = get_user_model()
+
+DUPLICATE = 'duplicate'
+UNKNOWN_USER = 'unknown_user'
+
+
+def sync_kiosk_events(events, kiosk_id=''):
+    """
+    Apply a batch of scans buffered by an offline kiosk.
+
+    Each event carries an idempotency key; keys already applied (in an
+    earlier sync or earlier in the same batch) are reported as duplicates
+    and skipped, so a kiosk can safely resend a batch after a lost response.
+    Scans are applied in timestamp order within one transaction.
+
+    Args:
+        events: dicts with key, user_id, timestamp and optionally location,
+            confidence_score and marked_by_face_recognition
+    Returns:
+        list: {'key', 'action'} for each event, in request order
+    """
+    # A concurrent sync of the same keys (or a live check-in creating the
+    # same day's record) makes the bulk insert fail; the retry sees its rows
+    for attempt in range(2):
+        try:
+            with transaction.atomic():
+                return _apply(events, kiosk_id)
+        except IntegrityError:
+            if attempt:
+                raise
+
+
+def _apply(events, kiosk_id):
+    keys = {event['key'] for event in events}
+    applied = set(
+        KioskSyncEvent.objects.filter(idempotency_key__in=keys).values_list('idempotency_key', flat=True)
+    )
+    known_users = set(
+        User.objects.filter(
+            id__in={event['user_id'] for event in events}, is_active=True
+        ).values_list('id', flat=True)
+    )
+
+    results = [None] * len(events)
+    pending = []
+    for index, event in enumerate(events):
+        if event['key'] in applied:
+            results[index] = DUPLICATE
+        elif event['user_id'] not in known_users:
+            results[index] = UNKNOWN_USER
+        else:
+            applied.add(event['key'])
+            pending.append(index)
+
+    pending.sort(key=lambda index: events[index]['timestamp'])
+    actions = apply_scans([events[index] for index in pending])
+    for index, action in zip(pending, actions):
+        results[index] = action
+
+    KioskSyncEvent.objects.bulk_create(
+        [
+            KioskSyncEvent(
+                idempotency_key=events[index]['key'],
+                kiosk_id=kiosk_id,
+                user_id=events[index]['user_id'],
+                timestamp=events[index]['timestamp'],
+                action=results[index],
+            )
+            for index in pending
+        ],
+        batch_size=500
+    )
+    return [{'key': event['key'], 'action': action} for event, action in zip(events, results)]
@@ -0,0 +1,7 @@
+from attendance_system.celery import app
+from .jobs import run_report_job
+
+
+@app.task(name='attendance.run_report_job', ignore_result=True)
+def run_report_job_task(job_id):
+    run_report_job(job_id)
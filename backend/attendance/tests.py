@@ -0,0 +1,649 @@
+import glob
+import importlib
+import io
+import os
+import tempfile
+import threading
+from datetime import date, datetime, time, timedelta
+from time import sleep
+from unittest import mock, skipUnless
+from django.apps import apps
+from django.contrib.auth import get_user_model
+from django.db import connection, connections, transaction
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.management import call_command
+from django.test import SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+from .archive import ATTENDANCE_TABLE, ArchivedDateError, archive_partition, invalidate_manifest, partitions_for
+from .debounce import CheckDebouncer
+from .events import PROJECTOR, _lock_projector, log_check, project_events
+from .journal import CheckInJournal, _try_lock, fcntl, replay_dead_letters
+from .management.commands.check_query_plans import Command as CheckQueryPlansCommand, hot_queries, sequential_scans
+from .models import AttendanceRecord, AttendanceMonthlySummary, ArchivedPartition, CheckEvent, Holiday, ProjectorState
+from .reports import build_attendance_report
+from .services import (
+    mark_section, materialize_absences, record_check, CHECK_IN, CHECK_OUT, ALREADY_CHECKED_OUT
+)
+from .summaries import average_check_in, month_start, rebuild_summaries, record_totals, refresh_summaries
+from .working_days import invalidate_calendars, working_days_between
+
+User = get_user_model()
+
+
+def create_section(student_count, admission_date=date(2026, 8, 1)):
+    """A section of an active academic year with students rolled 01, 02, ..."""
+    from students.models import AcademicYear, Class, Department, Section, Student
+
+    year = AcademicYear.objects.create(
+        name='2026-2027', start_date=date(2026, 8, 1), end_date=date(2027, 6, 30), is_active=True
+    )
+    department = Department.objects.create(name='Computer Science', code='CS')
+    class_obj = Class.objects.create(name='Class 10', grade_level=10, department=department, academic_year=year)
+    section = Section.objects.create(name='A', class_obj=class_obj)
+    for i in range(student_count):
+        user = User.objects.create(username=f'student{i}', email=f'student{i}@example.com', user_type='student')
+        Student.objects.create(
+            user=user, student_id=f'S{i:04d}', roll_number=f'{i + 1:02d}', class_obj=class_obj,
+            section=section, admission_date=admission_date
+        )
+    return section
+
+
+class RecordCheckConcurrencyTests(TransactionTestCase):
+    """Concurrent scans of one user and day must serialise on the (user, date) key"""
+
+    threads = 8
+
+    def test_concurrent_scans_make_one_check_in_and_one_check_out(self):
+        user = User.objects.create(username='scanner', email='scanner@example.com', user_type='employee')
+        barrier = threading.Barrier(self.threads)
+        actions = []
+        errors = []
+
+        def scan():
+            try:
+                barrier.wait()
+                actions.append(record_check(user)[1])
+            except Exception as e:  # surfaced by the assertion below
+                errors.append(e)
+            finally:
+                connection.close()
+
+        workers = [threading.Thread(target=scan) for _ in range(self.threads)]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+
+        self.assertEqual(errors, [])
+        self.assertEqual(actions.count(CHECK_IN), 1)
+        self.assertEqual(actions.count(CHECK_OUT), 1)
+        self.assertEqual(actions.count(ALREADY_CHECKED_OUT), self.threads - 2)
+
+        record = AttendanceRecord.objects.get(user=user)
+        self.assertEqual(AttendanceRecord.objects.filter(user=user).count(), 1)
+        self.assertIsNotNone(record.check_in_time)
+        self.assertIsNotNone(record.check_out_time)
+
+        summary = AttendanceMonthlySummary.objects.get(user=user, month=month_start(record.date))
+        self.assertEqual(summary.present_days + summary.late_days, 1)
+        self.assertEqual(summary.check_in_count, 1)
+
+        # The incremental updates must agree with a rebuild from the rows
+        incremental = AttendanceMonthlySummary.objects.values(
+            'present_days', 'absent_days', 'late_days', 'worked_time', 'check_in_count', 'check_in_seconds'
+        ).get(pk=summary.pk)
+        rebuild_summaries()
+        rebuilt = AttendanceMonthlySummary.objects.values(*incremental).get(user=user)
+        self.assertEqual(incremental, rebuilt)
+
+
+class AttendanceReportQueryTests(TestCase):
+    """attendance_report must not run more queries as the number of users grows"""
+
+    start_date = date(2026, 9, 7)  # a Monday
+    end_date = date(2026, 9, 11)
+    statuses = ['present', 'late', 'absent', 'present', 'present']
+
+    def setUp(self):
+        invalidate_calendars()
+        invalidate_manifest()
+        Holiday.objects.create(name='Test holiday', date=self.end_date)
+
+    def tearDown(self):
+        invalidate_calendars()
+
+    def _seed(self, user_count):
+        users = User.objects.bulk_create([
+            User(username=f'report{i}', email=f'report{i}@example.com', user_type='student')
+            for i in range(user_count)
+        ])
+        AttendanceRecord.objects.bulk_create([
+            AttendanceRecord(user=user, date=self.start_date + timedelta(days=day), status=status)
+            for user in users
+            for day, status in enumerate(self.statuses)
+        ])
+        # Working days and archive partitions come from warm per-process caches
+        working_days_between(self.start_date, self.end_date)
+        partitions_for(ATTENDANCE_TABLE, self.start_date, self.end_date)
+
+    def _check_report(self, user_count):
+        self._seed(user_count)
+        with self.assertNumQueries(1):
+            report = build_attendance_report(self.start_date, self.end_date, user_type='student')
+
+        self.assertEqual(report['summary']['total_users'], user_count)
+        for row in report['report']:
+            self.assertEqual(
+                (row['present_days'], row['late_days'], row['absent_days'], row['working_days']),
+                (3, 1, 1, 4)
+            )
+
+    def test_query_count_with_few_users(self):
+        self._check_report(5)
+
+    def test_query_count_with_many_users(self):
+        self._check_report(200)
+
+    def test_joins_only_records_in_the_range(self):
+        self._seed(1)
+        AttendanceRecord.objects.create(
+            user=User.objects.get(username='report0'), date=self.start_date - timedelta(days=1), status='absent'
+        )
+        with CaptureQueriesContext(connection) as queries:
+            report = build_attendance_report(self.start_date, self.end_date, user_type='student')
+
+        self.assertEqual(report['report'][0]['absent_days'], 1)
+        self.assertRegex(
+            queries.captured_queries[0]['sql'],
+            r'LEFT OUTER JOIN "attendance_records" \S+ ON \([^)]*"date" BETWEEN'
+        )
+
+
+@override_settings(TIME_ZONE='Asia/Kolkata')
+class AttendanceTotalsTests(TestCase):
+    """Worked time and check-in times are aggregated by the database in the institution's timezone"""
+
+    # (local date, check-in, check-out) in Asia/Kolkata; the first check-in is
+    # the previous UTC day, so a UTC extraction would be hours off
+    days = [
+        (date(2026, 9, 7), time(5, 10), time(13, 40)),
+        (date(2026, 9, 8), time(8, 50), time(17, 5)),
+        (date(2026, 9, 9), time(9, 20), None),
+    ]
+
+    def setUp(self):
+        invalidate_manifest()
+        self.user = User.objects.create(username='totals', email='totals@example.com', user_type='employee')
+        for day, check_in, check_out in self.days:
+            AttendanceRecord.objects.create(
+                user=self.user, date=day, status='present',
+                check_in_time=timezone.make_aware(datetime.combine(day, check_in)),
+                check_out_time=timezone.make_aware(datetime.combine(day, check_out)) if check_out else None,
+            )
+        AttendanceRecord.objects.create(user=self.user, date=date(2026, 9, 10), status='absent')
+        partitions_for(ATTENDANCE_TABLE, date(2026, 9, 1), date(2026, 9, 30))
+
+    def _expected(self):
+        worked = sum(
+            (datetime.combine(day, check_out) - datetime.combine(day, check_in)
+             for day, check_in, check_out in self.days if check_out),
+            timedelta()
+        )
+        seconds = sum(check_in.hour * 3600 + check_in.minute * 60 for _, check_in, _ in self.days)
+        return worked, seconds
+
+    def test_record_totals_in_one_query(self):
+        with self.assertNumQueries(1):
+            totals = record_totals(self.user.id, date(2026, 9, 1), date(2026, 9, 20))
+
+        worked, seconds = self._expected()
+        self.assertEqual(totals['worked_time'], worked)
+        self.assertEqual(totals['check_in_count'], 3)
+        self.assertEqual(totals['check_in_seconds'], seconds)
+        self.assertEqual((totals['present_days'], totals['absent_days'], totals['late_days']), (3, 1, 0))
+
+    def test_monthly_summaries_match_record_totals(self):
+        monthly = AttendanceMonthlySummary.objects.get(user=self.user, month=date(2026, 9, 1))
+        totals = record_totals(self.user.id, date(2026, 9, 1), date(2026, 9, 30))
+        self.assertEqual(monthly.worked_time, totals['worked_time'])
+        self.assertEqual(monthly.check_in_seconds, totals['check_in_seconds'])
+        self.assertEqual(monthly.check_in_count, totals['check_in_count'])
+
+    def test_stats_endpoint(self):
+        client = APIClient()
+        client.force_authenticate(self.user)
+        worked, seconds = self._expected()
+        for end_date in ('2026-09-20', '2026-09-30'):  # record totals, then monthly summaries
+            response = client.get(reverse('attendance-stats'), {'start_date': '2026-09-01', 'end_date': end_date})
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response.data['total_hours_worked'], str(worked))
+            self.assertEqual(response.data['average_check_in_time'], average_check_in(seconds, 3))
+
+    @skipUnless(connection.vendor == 'postgresql', 'PostgreSQL only')
+    def test_postgresql_converts_to_local_time_in_the_query(self):
+        with CaptureQueriesContext(connection) as queries:
+            record_totals(self.user.id, date(2026, 9, 1), date(2026, 9, 20))
+        self.assertIn("AT TIME ZONE 'Asia/Kolkata'", queries[0]['sql'])
+
+
+class RollCallTests(TestCase):
+    day = date(2026, 9, 14)
+
+    def setUp(self):
+        invalidate_manifest()
+        self.section = create_section(3)
+        self.users = list(User.objects.filter(user_type='student').order_by('username'))
+        # Student 01 checked in by face recognition before the roll call
+        self.check_in = timezone.make_aware(datetime.combine(self.day, time(8, 55)))
+        AttendanceRecord.objects.create(
+            user=self.users[0], date=self.day, status='present',
+            check_in_time=self.check_in, marked_by_face_recognition=True
+        )
+
+    def statuses(self):
+        return dict(AttendanceRecord.objects.filter(date=self.day).values_list('user__username', 'status'))
+
+    def test_default_status_skips_students_who_already_checked_in(self):
+        counts, unknown = mark_section(self.section, self.day, {'02': 'late'}, default_status='absent')
+
+        self.assertEqual(unknown, [])
+        self.assertEqual(counts, {'late': 1, 'absent': 1})
+        self.assertEqual(self.statuses(), {'student0': 'present', 'student1': 'late', 'student2': 'absent'})
+        record = AttendanceRecord.objects.get(user=self.users[0], date=self.day)
+        self.assertEqual(record.check_in_time, self.check_in)
+
+    def test_listed_students_are_updated_even_with_a_check_in(self):
+        counts, _ = mark_section(self.section, self.day, {'01': 'absent'}, default_status='present')
+
+        self.assertEqual(counts, {'absent': 1, 'present': 2})
+        self.assertEqual(self.statuses(), {'student0': 'absent', 'student1': 'present', 'student2': 'present'})
+        record = AttendanceRecord.objects.get(user=self.users[0], date=self.day)
+        self.assertEqual(record.check_in_time, self.check_in)
+
+        summary = AttendanceMonthlySummary.objects.get(user=self.users[0], month=month_start(self.day))
+        self.assertEqual((summary.present_days, summary.absent_days), (0, 1))
+
+    def test_unknown_roll_numbers_write_nothing(self):
+        counts, unknown = mark_section(self.section, self.day, {'99': 'present'}, default_status='absent')
+
+        self.assertEqual(unknown, ['99'])
+        self.assertEqual(self.statuses(), {'student0': 'present'})
+
+
+class MaterializeAbsencesTests(TestCase):
+    day = date(2026, 9, 14)
+
+    def setUp(self):
+        create_section(4)
+        self.users = list(User.objects.filter(user_type='student').order_by('username'))
+
+    def test_counts_inserted_rows_and_skips_recorded_students(self):
+        AttendanceRecord.objects.create(user=self.users[0], date=self.day, status='present')
+
+        self.assertEqual(materialize_absences(self.day, batch_size=2), 3)
+        self.assertEqual(materialize_absences(self.day, batch_size=2), 0)
+        self.assertEqual(AttendanceRecord.objects.filter(date=self.day, status='absent').count(), 3)
+        self.assertEqual(
+            sorted(AttendanceMonthlySummary.objects.values_list('present_days', 'absent_days')),
+            [(0, 1), (0, 1), (0, 1), (1, 0)]
+        )
+
+    def test_command_defaults_to_yesterday(self):
+        localdate = timezone.localdate
+
+        def today(value=None, timezone=None):
+            return date(2026, 9, 15) if value is None else localdate(value, timezone)
+
+        with mock.patch('django.utils.timezone.localdate', side_effect=today):
+            call_command('materialize_absences', stdout=io.StringIO())
+
+        self.assertEqual(
+            set(AttendanceRecord.objects.values_list('date', flat=True)), {self.day}
+        )
+        self.assertEqual(AttendanceMonthlySummary.objects.filter(absent_days=1).count(), 4)
+
+    def test_check_in_racing_the_insert_is_not_counted(self):
+        bulk_create = AttendanceRecord.objects.bulk_create
+        check_in = timezone.make_aware(datetime.combine(self.day, time(9, 30)))
+
+        def racing_bulk_create(batch, **kwargs):
+            # Student 0 checks in after the anti-join but before the insert
+            AttendanceRecord.objects.create(
+                user=self.users[0], date=self.day, status='late', check_in_time=check_in
+            )
+            return bulk_create(batch, **kwargs)
+
+        with mock.patch.object(AttendanceRecord.objects, 'bulk_create', side_effect=racing_bulk_create):
+            inserted = materialize_absences(self.day)
+
+        self.assertEqual(inserted, 3)
+        self.assertEqual(AttendanceRecord.objects.get(user=self.users[0], date=self.day).status, 'late')
+
+
+class QueryPlanTests(TestCase):
+    """The check_query_plans assertions, on the configured database backend"""
+
+    start_date = date(2000, 1, 3)
+    days = 10
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user_ids = CheckQueryPlansCommand()._seed(300, cls.start_date, cls.days)
+        # Give the planner real statistics for the seeded tables
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+
+    def test_hot_queries_use_indexes(self):
+        end_date = self.start_date + timedelta(days=self.days - 1)
+        for name, queryset in hot_queries(self.user_ids[0], self.start_date, end_date):
+            with self.subTest(name):
+                self.assertEqual(sequential_scans(queryset), [], queryset.explain())
+
+
+class ArchivedMonthTests(TestCase):
+    """September 2026 is archived: its summaries stay and its attendance is read-only"""
+
+    day = date(2026, 9, 14)
+
+    def setUp(self):
+        invalidate_manifest()
+        # The partition row is rolled back without a post_delete signal
+        self.addCleanup(invalidate_manifest)
+        self.section = create_section(2)
+        self.user = User.objects.get(username='student0')
+        ArchivedPartition.objects.create(
+            table=ATTENDANCE_TABLE, start_date=date(2026, 9, 1), end_date=date(2026, 9, 30),
+            path='attendance_records/2026/2026-09-01_2026-09-30.npz', row_count=40
+        )
+        AttendanceMonthlySummary.objects.create(user=self.user, month=month_start(self.day), present_days=20)
+
+    def test_refresh_keeps_archived_summaries(self):
+        refresh_summaries({(self.user.id, self.day)})
+
+        summary = AttendanceMonthlySummary.objects.get(user=self.user, month=month_start(self.day))
+        self.assertEqual(summary.present_days, 20)
+
+    def test_writes_into_archived_month_are_refused(self):
+        when = timezone.make_aware(datetime.combine(self.day, time(9, 0)))
+        with self.assertRaises(ArchivedDateError):
+            record_check(self.user, when=when)
+        with self.assertRaises(ArchivedDateError):
+            AttendanceRecord.objects.create(user=self.user, date=self.day, status='present')
+        with self.assertRaises(ArchivedDateError):
+            mark_section(self.section, self.day, {'01': 'late'})
+        with self.assertRaises(ArchivedDateError):
+            materialize_absences(self.day)
+
+        self.assertFalse(AttendanceRecord.objects.exists())
+        # The next month is still open
+        self.assertEqual(materialize_absences(date(2026, 10, 1)), 2)
+
+    def test_api_rejects_archived_roll_call(self):
+        client = APIClient()
+        client.force_authenticate(User.objects.create(username='admin', email='admin@example.com', user_type='admin'))
+
+        response = client.post(
+            reverse('attendance-bulk-mark'),
+            {'section_id': self.section.id, 'date': self.day.isoformat(), 'statuses': {'01': 'P'}},
+            format='json'
+        )
+
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('date', response.data)
+        self.assertFalse(AttendanceRecord.objects.exists())
+
+
+class JournalDeadLetterTests(TransactionTestCase):
+    """A scan that keeps failing is dead-lettered after max_retries group commits"""
+
+    def setUp(self):
+        invalidate_manifest()
+        self.addCleanup(invalidate_manifest)
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+        # No background flushes: the test drives them
+        self.journal = CheckInJournal(self.directory, flush_interval=3600, max_retries=2)
+        self.addCleanup(self.journal.close)
+        self.user = User.objects.create(username='scanner', email='scanner@example.com', user_type='employee')
+
+    def test_failing_scan_is_dead_lettered_and_replayable(self):
+        # Writes into September fail once it is archived
+        partition = ArchivedPartition.objects.create(
+            table=ATTENDANCE_TABLE, start_date=date(2026, 9, 1), end_date=date(2026, 9, 30),
+            path='attendance_records/2026/2026-09-01_2026-09-30.npz'
+        )
+        self.journal.record_check(self.user, when=timezone.make_aware(datetime(2026, 9, 30, 9, 0)))
+        self.journal.record_check(self.user, when=timezone.make_aware(datetime(2026, 10, 1, 9, 0)))
+
+        self.assertEqual(self.journal.flush(), 0)
+        self.assertEqual(self.journal.flush(), 1)
+
+        self.assertEqual(self.journal.stats['failed'], 2)
+        self.assertEqual(self.journal.stats['dead_lettered'], 1)
+        self.assertEqual(self.journal.pending_scans(date(2026, 9, 30)), [])
+        self.assertEqual(list(AttendanceRecord.objects.values_list('date', flat=True)), [date(2026, 10, 1)])
+        self.assertEqual(sorted(os.listdir(self.directory)), sorted([
+            os.path.basename(f'{self.journal.prefix}.{suffix}') for suffix in ('dead', 'journal', 'lock')
+        ]))
+
+        partition.delete()
+        self.assertEqual(replay_dead_letters(self.directory), 1)
+        self.assertTrue(AttendanceRecord.objects.filter(user=self.user, date=date(2026, 9, 30)).exists())
+        self.assertFalse(os.path.exists(f'{self.journal.prefix}.dead'))
+
+
+class JournalOwnerLockTests(SimpleTestCase):
+    """A journal only writes under a lock file it holds, so replays leave it alone"""
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+
+    def open_journal(self):
+        journal = CheckInJournal(self.directory, flush_interval=3600)
+        self.addCleanup(journal.close)
+        return journal
+
+    @skipUnless(fcntl, 'needs file locks')
+    def test_holds_its_lock_file(self):
+        journal = self.open_journal()
+        with open(f'{journal.prefix}.lock', 'a') as handle:
+            self.assertFalse(_try_lock(handle))
+
+    @skipUnless(fcntl, 'needs file locks')
+    def test_takes_a_new_prefix_when_the_lock_is_held(self):
+        with mock.patch('attendance.journal._try_lock', side_effect=[False, True]) as try_lock:
+            journal = self.open_journal()
+        taken = try_lock.call_args_list[0].args[0].name
+        self.assertEqual(f'{journal.prefix}.lock', try_lock.call_args_list[1].args[0].name)
+        self.assertNotEqual(taken, f'{journal.prefix}.lock')
+
+    @skipUnless(fcntl, 'needs file locks')
+    def test_refuses_to_write_without_the_lock(self):
+        with mock.patch('attendance.journal._try_lock', return_value=False):
+            with self.assertRaises(OSError):
+                CheckInJournal(self.directory, flush_interval=3600)
+        self.assertEqual(glob.glob(os.path.join(self.directory, '*.journal')), [])
+
+
+class ProjectorLockTests(TransactionTestCase):
+    """Projector batches hold the projector_state row lock"""
+
+    def setUp(self):
+        self.user = User.objects.create(username='scanner', email='scanner@example.com', user_type='employee')
+        start = timezone.make_aware(datetime(2026, 10, 1, 9, 0))
+        for minutes in (0, 480):
+            log_check(self.user, when=start + timedelta(minutes=minutes))
+
+    def test_projects_each_event_once_and_records_progress(self):
+        self.assertEqual(project_events(batch_size=1), 2)
+        self.assertEqual(project_events(), 0)
+
+        record = AttendanceRecord.objects.get(user=self.user)
+        self.assertIsNotNone(record.check_out_time)
+        state = ProjectorState.objects.get(name=PROJECTOR)
+        self.assertEqual(state.last_event_id, CheckEvent.objects.order_by('id').last().id)
+
+    @skipUnless(connection.vendor == 'postgresql', 'row locks need PostgreSQL')
+    def test_second_projector_waits_for_the_lock(self):
+        locked = threading.Event()
+        release = threading.Event()
+
+        def hold_lock():
+            try:
+                with transaction.atomic():
+                    _lock_projector()
+                    locked.set()
+                    release.wait(10)
+            finally:
+                connections.close_all()
+
+        holder = threading.Thread(target=hold_lock)
+        holder.start()
+        locked.wait(10)
+        results = []
+
+        def project():
+            try:
+                results.append(project_events())
+            finally:
+                connections.close_all()
+
+        projector = threading.Thread(target=project)
+        projector.start()
+        projector.join(0.5)
+        self.assertTrue(projector.is_alive())
+        self.assertFalse(CheckEvent.objects.filter(projected=True).exists())
+
+        release.set()
+        holder.join()
+        projector.join(10)
+        self.assertEqual(results, [2])
+
+
+class CheckDebouncerTests(SimpleTestCase):
+    """Simultaneous scans of one user are written once, with a local or shared cooldown"""
+
+    threads = 8
+
+    def scan_concurrently(self, debouncer):
+        user = User(pk=7, username='scanner')
+        barrier = threading.Barrier(self.threads)
+        results = []
+
+        def slow_check(user, **kwargs):
+            sleep(0.2)
+            return 'record', CHECK_IN
+
+        def scan():
+            barrier.wait()
+            results.append(debouncer.check(user, location='Gate'))
+
+        with mock.patch('attendance.debounce.submit_check', side_effect=slow_check) as submit_check:
+            workers = [threading.Thread(target=scan) for _ in range(self.threads)]
+            for worker in workers:
+                worker.start()
+            for worker in workers:
+                worker.join()
+        return submit_check, results
+
+    def assert_written_once(self, debouncer):
+        submit_check, results = self.scan_concurrently(debouncer)
+
+        self.assertEqual(submit_check.call_count, 1)
+        self.assertEqual(debouncer.stats, {'written': 1, 'suppressed': self.threads - 1})
+        self.assertEqual(sorted(suppressed for _, _, suppressed in results), [False] + [True] * (self.threads - 1))
+        # Suppressed scans wait for the write and repeat its result
+        self.assertEqual({(record, action) for record, action, _ in results}, {('record', CHECK_IN)})
+
+    def test_local_cooldown(self):
+        self.assert_written_once(CheckDebouncer(60))
+
+    def test_shared_cache_cooldown(self):
+        self.assert_written_once(CheckDebouncer(60, cache=LocMemCache('attendance-debounce-test', {})))
+
+    def test_failed_write_releases_the_cooldown(self):
+        debouncer = CheckDebouncer(60)
+        user = User(pk=7, username='scanner')
+        with mock.patch('attendance.debounce.submit_check', side_effect=[RuntimeError, ('record', CHECK_IN)]):
+            with self.assertRaises(RuntimeError):
+                debouncer.check(user)
+            self.assertEqual(debouncer.check(user), ('record', CHECK_IN, False))
+
+
+class SummaryBackfillTests(TestCase):
+    """Records from before monthly summaries existed"""
+
+    def setUp(self):
+        invalidate_manifest()
+        self.user = User.objects.create(username='student', email='student@example.com', user_type='student')
+        self.september = AttendanceRecord.objects.create(user=self.user, date=date(2026, 9, 14), status='present')
+        AttendanceRecord.objects.create(user=self.user, date=date(2026, 9, 15), status='late')
+        AttendanceRecord.objects.create(user=self.user, date=date(2026, 10, 1), status='absent')
+        # As if the records predated migration 0002
+        AttendanceMonthlySummary.objects.all().delete()
+
+    def counts(self, month):
+        summary = AttendanceMonthlySummary.objects.get(user=self.user, month=month)
+        return summary.present_days, summary.absent_days, summary.late_days
+
+    def test_status_change_recomputes_a_missing_summary(self):
+        self.september.status = 'absent'
+        self.september.save()
+
+        self.assertEqual(self.counts(date(2026, 9, 1)), (0, 1, 1))
+
+    def test_migration_backfills_missing_summaries_only(self):
+        AttendanceMonthlySummary.objects.create(user=self.user, month=date(2026, 10, 1), absent_days=5)
+        migration = importlib.import_module('attendance.migrations.0010_backfill_monthly_summaries')
+
+        migration.backfill_summaries(apps, None)
+
+        self.assertEqual(self.counts(date(2026, 9, 1)), (1, 0, 1))
+        self.assertEqual(self.counts(date(2026, 10, 1)), (0, 5, 0))
+
+
+class PartlyArchivedMonthTests(TestCase):
+    """A year archived up to 15 September leaves the rest of September open"""
+
+    def setUp(self):
+        invalidate_manifest()
+        self.addCleanup(invalidate_manifest)
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        archive_root = override_settings(ATTENDANCE_ARCHIVE_ROOT=directory.name)
+        archive_root.enable()
+        self.addCleanup(archive_root.disable)
+
+        self.user = User.objects.create(username='student', email='student@example.com', user_type='student')
+        AttendanceRecord.objects.create(user=self.user, date=date(2026, 9, 10), status='present')
+        AttendanceRecord.objects.create(user=self.user, date=date(2026, 9, 11), status='late')
+        archive_partition(ATTENDANCE_TABLE, date(2026, 9, 1), date(2026, 9, 15))
+
+    def counts(self):
+        summary = AttendanceMonthlySummary.objects.get(user=self.user, month=date(2026, 9, 1))
+        return summary.present_days, summary.absent_days, summary.late_days
+
+    def test_days_after_the_partition_stay_writable(self):
+        with self.assertRaises(ArchivedDateError):
+            AttendanceRecord.objects.create(user=self.user, date=date(2026, 9, 15), status='absent')
+
+        record_check(self.user, when=timezone.make_aware(datetime(2026, 9, 16, 8, 30)))
+
+        # Before the 09:00 start: present
+        self.assertEqual(self.counts(), (2, 0, 1))
+
+    def test_refresh_and_rebuild_keep_the_archived_days(self):
+        AttendanceRecord.objects.create(user=self.user, date=date(2026, 9, 21), status='absent')
+
+        refresh_summaries({(self.user.id, date(2026, 9, 1))})
+        self.assertEqual(self.counts(), (1, 1, 1))
+
+        rebuild_summaries(date(2026, 9, 1), date(2026, 9, 1))
+        self.assertEqual(self.counts(), (1, 1, 1))
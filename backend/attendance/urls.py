@@ -4,9 +4,17 @@ from .views import (
     AttendanceRecordDetailView,
     AttendanceSessionListCreateView,
     HolidayListCreateView,
+    AttendanceAnalyticsListView,
     attendance_stats,
     manual_check_in,
-    attendance_report
+    attendance_report,
+    attendance_export,
+    bulk_mark_section,
+    kiosk_sync,
+    arrival_distribution,
+    submit_report_job,
+    report_job_detail,
+    report_job_download
 )
 
 urlpatterns = [
@@ -17,4 +25,12 @@ urlpatterns = [
     path('stats/', attendance_stats, name='attendance-stats'),
     path('check-in/', manual_check_in, name='manual-check-in'),
     path('report/', attendance_report, name='attendance-report'),
+    path('export/', attendance_export, name='attendance-export'),
+    path('bulk-mark/', bulk_mark_section, name='attendance-bulk-mark'),
+    path('sync/', kiosk_sync, name='attendance-kiosk-sync'),
+    path('arrivals/', arrival_distribution, name='attendance-arrivals'),
+    path('analytics/', AttendanceAnalyticsListView.as_view(), name='attendance-analytics'),
+    path('report-jobs/', submit_report_job, name='report-jobs'),
+    path('report-jobs/<uuid:job_id>/', report_job_detail, name='report-job-detail'),
+    path('report-jobs/<uuid:job_id>/download/', report_job_download, name='report-job-download'),
 ]
\ No newline at end of file
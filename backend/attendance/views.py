@@ -2,16 +2,33 @@ from rest_framework import generics, permissions, status
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.response import Response
 from django.contrib.auth import get_user_model
+from django.db.models import Q
+from django.http import FileResponse, StreamingHttpResponse
 from django.utils import timezone
-from django.db.models import Count, Q, Avg
-from datetime import datetime, timedelta
-from .models import AttendanceRecord, AttendanceSession, Holiday
+from collections import Counter
+from datetime import datetime
+from attendance_system.pagination import KeysetPagination
+from .models import AttendanceRecord, AttendanceSession, Holiday, StudentAttendanceAnalytics, ReportJob
+from .exports import EXPORT_FORMATS, CONTENT_TYPES
+from .jobs import submit_report, result_file
+from .reports import build_attendance_report, build_arrival_distribution
+from .services import submit_check, mark_section, CHECK_IN, CHECK_OUT
+from .sync import sync_kiosk_events
+from .summaries import is_whole_months, monthly_totals, record_totals, average_check_in
+from .working_days import working_days_between
 from .serializers import (
     AttendanceRecordSerializer,
     AttendanceSessionSerializer,
     HolidaySerializer,
-    CheckInSerializer
+    CheckInSerializer,
+    BulkSectionAttendanceSerializer,
+    KioskSyncSerializer,
+    StudentAttendanceAnalyticsSerializer,
+    ReportJobRequestSerializer,
+    ReportJobSerializer
 )
+from students.models import Class, Section
+from websocket.notifications import send_group_messages
 
 User = get_user_model()
 
@@ -20,9 +37,11 @@ class AttendanceRecordListCreateView(generics.ListCreateAPIView):
     """List attendance records or create a new record"""
     serializer_class = AttendanceRecordSerializer
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = KeysetPagination
+    keyset_ordering = ('-date', '-id')
     
     def get_queryset(self):
-        queryset = AttendanceRecord.objects.all()
+        queryset = AttendanceRecord.objects.select_related('user')
         
         # Filter by user if not admin
         if self.request.user.user_type != 'admin':
@@ -42,7 +61,7 @@ class AttendanceRecordListCreateView(generics.ListCreateAPIView):
         if user_id and self.request.user.user_type == 'admin':
             queryset = queryset.filter(user_id=user_id)
         
-        return queryset.order_by('-date', '-check_in_time')
+        return queryset.order_by(*self.keyset_ordering)
 
 
 class AttendanceRecordDetailView(generics.RetrieveUpdateDestroyAPIView):
@@ -96,6 +115,34 @@ class HolidayListCreateView(generics.ListCreateAPIView):
         serializer.save()
 
 
+class AttendanceAnalyticsListView(generics.ListAPIView):
+    """Cached per-student attendance analytics, lowest attendance first (admins and teachers)"""
+    serializer_class = StudentAttendanceAnalyticsSerializer
+    permission_classes = [permissions.IsAuthenticated]
+    pagination_class = KeysetPagination
+    keyset_ordering = ('attendance_rate', 'id')
+    
+    def get_queryset(self):
+        if self.request.user.user_type not in ['admin', 'employee']:
+            self.permission_denied(self.request)
+        
+        queryset = StudentAttendanceAnalytics.objects.select_related('user', 'user__student_profile')
+        
+        at_risk = self.request.query_params.get('at_risk')
+        if at_risk is not None:
+            queryset = queryset.filter(at_risk=at_risk.lower() in ('1', 'true', 'yes'))
+        
+        class_id = self.request.query_params.get('class_id')
+        if class_id:
+            queryset = queryset.filter(user__student_profile__class_obj_id=class_id)
+        
+        section_id = self.request.query_params.get('section_id')
+        if section_id:
+            queryset = queryset.filter(user__student_profile__section_id=section_id)
+        
+        return queryset.order_by(*self.keyset_ordering)
+
+
 @api_view(['GET'])
 @permission_classes([permissions.IsAuthenticated])
 def attendance_stats(request):
@@ -127,43 +174,28 @@ def attendance_stats(request):
     else:
         end_date = datetime.strptime(end_date, '%Y-%m-%d').date()
     
-    # Get attendance records for the period
-    records = AttendanceRecord.objects.filter(
-        user=target_user,
-        date__range=[start_date, end_date]
-    )
-    
     total_days = (end_date - start_date).days + 1
-    present_days = records.filter(status='present').count()
-    absent_days = records.filter(status='absent').count()
-    late_days = records.filter(status='late').count()
     
     # Calculate attendance percentage
-    working_days = total_days - Holiday.objects.filter(
-        date__range=[start_date, end_date],
-        is_active=True
-    ).count()
+    working_days = working_days_between(start_date, end_date)
+    
+    if is_whole_months(start_date, end_date):
+        # Whole months are served from the maintained monthly summaries
+        totals = monthly_totals(target_user.id, start_date, end_date)
+    else:
+        totals = record_totals(target_user.id, start_date, end_date)
+    
+    present_days = totals['present_days']
+    absent_days = totals['absent_days']
+    late_days = totals['late_days']
+    avg_check_in = average_check_in(totals['check_in_seconds'], totals['check_in_count'])
+    total_duration = totals['worked_time']
     
     attendance_percentage = (
         (present_days + late_days) / working_days * 100 
         if working_days > 0 else 0
     )
     
-    # Calculate average check-in time
-    check_in_records = records.filter(check_in_time__isnull=False)
-    if check_in_records.exists():
-        avg_check_in = check_in_records.aggregate(
-            avg_time=Avg('check_in_time__time')
-        )['avg_time']
-    else:
-        avg_check_in = None
-    
-    # Calculate total hours worked
-    total_duration = timedelta()
-    for record in records:
-        if record.duration:
-            total_duration += record.duration
-    
     return Response({
         'user_id': target_user.id,
         'username': target_user.username,
@@ -187,33 +219,19 @@ def attendance_stats(request):
 def manual_check_in(request):
     """Manual check-in for users (fallback when face recognition fails)"""
     user = request.user
-    today = timezone.now().date()
     location = request.data.get('location', '')
     
     try:
-        # Check if already checked in today
-        attendance, created = AttendanceRecord.objects.get_or_create(
-            user=user,
-            date=today,
-            defaults={
-                'check_in_time': timezone.now(),
-                'status': 'present',
-                'marked_by_face_recognition': False,
-                'location': location
-            }
-        )
+        attendance, action = submit_check(user, location=location)
         
-        if created:
+        if action == CHECK_IN:
             return Response({
                 'success': True,
                 'message': 'Check-in successful',
                 'action': 'check_in',
                 'time': attendance.check_in_time
             }, status=status.HTTP_201_CREATED)
-        elif not attendance.check_out_time:
-            # Update check-out time
-            attendance.check_out_time = timezone.now()
-            attendance.save()
+        elif action == CHECK_OUT:
             return Response({
                 'success': True,
                 'message': 'Check-out successful',
@@ -233,6 +251,147 @@ def manual_check_in(request):
         }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
+@api_view(['POST'])
+@permission_classes([permissions.IsAuthenticated])
+def bulk_mark_section(request):
+    """Mark attendance for every student of a section in one request"""
+    serializer = BulkSectionAttendanceSerializer(data=request.data)
+    if not serializer.is_valid():
+        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+    data = serializer.validated_data
+    
+    try:
+        section = Section.objects.select_related('class_obj').get(id=data['section_id'], is_active=True)
+    except Section.DoesNotExist:
+        return Response({'error': 'Section not found'}, status=status.HTTP_404_NOT_FOUND)
+    
+    # Check permissions
+    if (request.user.user_type not in ['admin'] and 
+        section.section_teacher_id != request.user.id and
+        section.class_obj.class_teacher_id != request.user.id):
+        return Response(
+            {'error': 'Access denied'}, 
+            status=status.HTTP_403_FORBIDDEN
+        )
+    
+    counts, unknown = mark_section(
+        section, data['date'], data['statuses'], data.get('default_status')
+    )
+    if unknown:
+        return Response(
+            {'error': f"Students not in this section: {', '.join(unknown)}"},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    
+    summary = {
+        'section_id': section.id,
+        'class_id': section.class_obj_id,
+        'date': data['date'].isoformat(),
+        'marked': sum(counts.values()),
+        'counts': {name: counts.get(name, 0) for name, _ in AttendanceRecord.STATUS_CHOICES},
+    }
+    
+    # One aggregated update instead of one per student
+    send_group_messages({
+        f'section_{section.id}': {'type': 'section_update', 'data': {'action': 'roll_call', **summary}},
+        'dashboard_updates': {'type': 'attendance_update', 'data': {'action': 'roll_call', **summary}},
+    })
+    
+    return Response({'success': True, **summary})
+
+
+@api_view(['POST'])
+@permission_classes([permissions.IsAuthenticated])
+def kiosk_sync(request):
+    """Apply scans an offline kiosk buffered, keyed for safe retries (admin only)"""
+    if request.user.user_type != 'admin':
+        return Response({'error': 'Admin access required'}, status=status.HTTP_403_FORBIDDEN)
+    
+    serializer = KioskSyncSerializer(data=request.data)
+    if not serializer.is_valid():
+        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+    data = serializer.validated_data
+    
+    results = sync_kiosk_events(data['events'], data['kiosk_id'])
+    counts = Counter(result['action'] for result in results)
+    applied = counts[CHECK_IN] + counts[CHECK_OUT]
+    
+    if applied:
+        send_group_messages({
+            'dashboard_updates': {
+                'type': 'attendance_update',
+                'data': {
+                    'action': 'kiosk_sync',
+                    'kiosk_id': data['kiosk_id'],
+                    'check_ins': counts[CHECK_IN],
+                    'check_outs': counts[CHECK_OUT],
+                },
+            },
+        })
+    
+    return Response({
+        'success': True,
+        'applied': applied,
+        'counts': dict(counts),
+        'results': results,
+    })
+
+
+@api_view(['GET'])
+@permission_classes([permissions.IsAuthenticated])
+def attendance_export(request):
+    """Stream attendance records for a date range as CSV or NDJSON"""
+    export_format = request.query_params.get('export_format', 'csv')
+    if export_format not in EXPORT_FORMATS:
+        return Response(
+            {'error': f"export_format must be one of: {', '.join(EXPORT_FORMATS)}"},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    
+    start_date = request.query_params.get('start_date')
+    end_date = request.query_params.get('end_date')
+    
+    # Set default date range (current month)
+    if not start_date:
+        start_date = timezone.now().replace(day=1).date()
+    else:
+        start_date = datetime.strptime(start_date, '%Y-%m-%d').date()
+    
+    if not end_date:
+        end_date = timezone.now().date()
+    else:
+        end_date = datetime.strptime(end_date, '%Y-%m-%d').date()
+    
+    queryset = AttendanceRecord.objects.filter(date__range=[start_date, end_date])
+    
+    # Users can only export their own records unless they're admin
+    if request.user.user_type != 'admin':
+        queryset = queryset.filter(user=request.user)
+    else:
+        user_id = request.query_params.get('user_id')
+        user_type = request.query_params.get('user_type')
+        department = request.query_params.get('department')
+        if user_id:
+            queryset = queryset.filter(user_id=user_id)
+        if user_type:
+            queryset = queryset.filter(user__user_type=user_type)
+        if department:
+            queryset = queryset.filter(user__department=department)
+    
+    record_status = request.query_params.get('status')
+    if record_status:
+        queryset = queryset.filter(status=record_status)
+    
+    response = StreamingHttpResponse(
+        EXPORT_FORMATS[export_format](queryset.order_by('date', 'id')),
+        content_type=CONTENT_TYPES[export_format]
+    )
+    response['Content-Disposition'] = (
+        f'attachment; filename="attendance_{start_date}_{end_date}.{export_format}"'
+    )
+    return response
+
+
 @api_view(['GET'])
 @permission_classes([permissions.IsAuthenticated])
 def attendance_report(request):
@@ -259,71 +418,140 @@ def attendance_report(request):
     else:
         end_date = datetime.strptime(end_date, '%Y-%m-%d').date()
     
-    # Build user queryset based on filters
-    users_queryset = User.objects.filter(is_active=True)
+    return Response(
+        build_attendance_report(start_date, end_date, user_type=user_type, department=department)
+    )
+
+
+@api_view(['GET'])
+@permission_classes([permissions.IsAuthenticated])
+def arrival_distribution(request):
+    """Check-in time histogram and weekday x time heatmap (admin only)"""
+    if request.user.user_type != 'admin':
+        return Response(
+            {'error': 'Admin access required'}, 
+            status=status.HTTP_403_FORBIDDEN
+        )
     
-    if user_type:
-        users_queryset = users_queryset.filter(user_type=user_type)
+    try:
+        start_date = request.query_params.get('start_date')
+        end_date = request.query_params.get('end_date')
+        start_date = (
+            datetime.strptime(start_date, '%Y-%m-%d').date() if start_date
+            else timezone.now().replace(day=1).date()
+        )
+        end_date = datetime.strptime(end_date, '%Y-%m-%d').date() if end_date else timezone.now().date()
+        bucket_minutes = int(request.query_params.get('bucket_minutes', 15))
+        class_id = request.query_params.get('class_id')
+        section_id = request.query_params.get('section_id')
+        class_id = int(class_id) if class_id else None
+        section_id = int(section_id) if section_id else None
+    except ValueError:
+        return Response(
+            {'error': 'Invalid parameters. Dates use YYYY-MM-DD; ids and bucket_minutes are integers'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
     
-    if department:
-        users_queryset = users_queryset.filter(department=department)
+    if bucket_minutes < 1 or 1440 % bucket_minutes:
+        return Response(
+            {'error': 'bucket_minutes must divide a day evenly (e.g. 5, 10, 15, 30, 60)'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
     
-    report_data = []
+    return Response(build_arrival_distribution(
+        start_date, end_date, bucket_minutes,
+        user_type=request.query_params.get('user_type'),
+        department=request.query_params.get('department'),
+        class_id=class_id,
+        section_id=section_id
+    ))
+
+
+def _can_access_report(user, kind, params):
+    """Admins see every report; teachers their own class's or section's"""
+    if user.user_type == 'admin':
+        return True
+    if kind == 'class':
+        return Class.objects.filter(id=params['class_id'], class_teacher=user).exists()
+    if kind == 'section':
+        return Section.objects.filter(
+            Q(section_teacher=user) | Q(class_obj__class_teacher=user),
+            id=params['section_id']
+        ).exists()
+    return False
+
+
+@api_view(['POST'])
+@permission_classes([permissions.IsAuthenticated])
+def submit_report_job(request):
+    """Queue an attendance, class or section report; identical requests share one job"""
+    serializer = ReportJobRequestSerializer(data=request.data)
+    if not serializer.is_valid():
+        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+    kind = serializer.validated_data['kind']
+    params = serializer.validated_data['params']
     
-    for user in users_queryset:
-        # Get attendance records for the period
-        records = AttendanceRecord.objects.filter(
-            user=user,
-            date__range=[start_date, end_date]
+    if kind == 'class' and not Class.objects.filter(id=params['class_id'], is_active=True).exists():
+        return Response({'error': 'Class not found'}, status=status.HTTP_404_NOT_FOUND)
+    if kind == 'section' and not Section.objects.filter(id=params['section_id'], is_active=True).exists():
+        return Response({'error': 'Section not found'}, status=status.HTTP_404_NOT_FOUND)
+    if not _can_access_report(request.user, kind, params):
+        return Response(
+            {'error': 'Access denied'}, 
+            status=status.HTTP_403_FORBIDDEN
         )
-        
-        present_days = records.filter(status='present').count()
-        absent_days = records.filter(status='absent').count()
-        late_days = records.filter(status='late').count()
-        
-        # Calculate working days (excluding holidays)
-        total_days = (end_date - start_date).days + 1
-        working_days = total_days - Holiday.objects.filter(
-            date__range=[start_date, end_date],
-            is_active=True
-        ).count()
-        
-        attendance_percentage = (
-            (present_days + late_days) / working_days * 100 
-            if working_days > 0 else 0
+    
+    job, created = submit_report(kind, params, user=request.user)
+    data = ReportJobSerializer(job, context={'request': request}).data
+    data['cached'] = not created
+    return Response(
+        data,
+        status=status.HTTP_200_OK if job.status == 'completed' else status.HTTP_202_ACCEPTED
+    )
+
+
+@api_view(['GET'])
+@permission_classes([permissions.IsAuthenticated])
+def report_job_detail(request, job_id):
+    """Status and progress of a report job"""
+    try:
+        job = ReportJob.objects.get(pk=job_id)
+    except ReportJob.DoesNotExist:
+        return Response({'error': 'Report job not found'}, status=status.HTTP_404_NOT_FOUND)
+    
+    if not _can_access_report(request.user, job.kind, job.params):
+        return Response(
+            {'error': 'Access denied'}, 
+            status=status.HTTP_403_FORBIDDEN
         )
-        
-        report_data.append({
-            'user_id': user.id,
-            'username': user.username,
-            'full_name': f"{user.first_name} {user.last_name}".strip(),
-            'email': user.email,
-            'user_type': user.user_type,
-            'department': user.department,
-            'employee_id': user.employee_id,
-            'student_id': user.student_id,
-            'present_days': present_days,
-            'absent_days': absent_days,
-            'late_days': late_days,
-            'working_days': working_days,
-            'attendance_percentage': round(attendance_percentage, 2)
-        })
     
-    return Response({
-        'period': {
-            'start_date': start_date,
-            'end_date': end_date
-        },
-        'filters': {
-            'user_type': user_type,
-            'department': department
-        },
-        'report': report_data,
-        'summary': {
-            'total_users': len(report_data),
-            'average_attendance': round(
-                sum(item['attendance_percentage'] for item in report_data) / len(report_data)
-                if report_data else 0, 2
-            )
-        }
-    })
\ No newline at end of file
+    return Response(ReportJobSerializer(job, context={'request': request}).data)
+
+
+@api_view(['GET'])
+@permission_classes([permissions.IsAuthenticated])
+def report_job_download(request, job_id):
+    """Download the JSON result of a completed report job"""
+    try:
+        job = ReportJob.objects.get(pk=job_id)
+    except ReportJob.DoesNotExist:
+        return Response({'error': 'Report job not found'}, status=status.HTTP_404_NOT_FOUND)
+    
+    if not _can_access_report(request.user, job.kind, job.params):
+        return Response(
+            {'error': 'Access denied'}, 
+            status=status.HTTP_403_FORBIDDEN
+        )
+    if job.status != 'completed':
+        return Response(
+            {'error': f'Report is not ready (status: {job.status})'},
+            status=status.HTTP_409_CONFLICT
+        )
+    
+    try:
+        handle = open(result_file(job), 'rb')
+    except FileNotFoundError:
+        return Response({'error': 'Report result has expired'}, status=status.HTTP_410_GONE)
+    
+    filename = f"{job.kind}_report_{job.params['start_date']}_{job.params['end_date']}.json"
+    return FileResponse(handle, as_attachment=True, filename=filename, content_type='application/json')
\ No newline at end of file
@@ -0,0 +1,140 @@
+import threading
+import time
+from array import array
+from datetime import date, timedelta
+from django.conf import settings
+from .models import Holiday
+
+
+class WorkingDayCalendar:
+    """
+    Working days of one date span as a prefix-sum array.
+
+    prefix[i] is the number of working days in [start_date, start_date + i),
+    so any sub-range is counted with two lookups.
+    """
+
+    def __init__(self, start_date, end_date, holidays=(), weekend_days=(5, 6)):
+        self.start_date = start_date
+        self.end_date = end_date
+        holidays = set(holidays)
+        weekend_days = set(weekend_days)
+
+        prefix = array('I', [0])
+        day = start_date
+        count = 0
+        while day <= end_date:
+            if day.weekday() not in weekend_days and day not in holidays:
+                count += 1
+            prefix.append(count)
+            day += timedelta(days=1)
+        self.prefix = prefix
+
+    def covers(self, day):
+        return self.start_date <= day <= self.end_date
+
+    def count(self, start_date, end_date):
+        """Working days in [start_date, end_date] clipped to this calendar"""
+        start_date = max(start_date, self.start_date)
+        end_date = min(end_date, self.end_date)
+        if end_date < start_date:
+            return 0
+        first = (start_date - self.start_date).days
+        last = (end_date - self.start_date).days
+        return self.prefix[last + 1] - self.prefix[first]
+
+    def is_working_day(self, day):
+        return self.count(day, day) == 1
+
+
+_calendars = {}
+_academic_years = None
+_loaded_at = 0.0
+_lock = threading.Lock()
+
+
+def _weekend_days():
+    return getattr(settings, 'WEEKEND_DAYS', (5, 6))
+
+
+def _build_calendar(start_date, end_date):
+    holidays = Holiday.objects.filter(
+        date__range=[start_date, end_date],
+        is_active=True
+    ).values_list('date', flat=True)
+    return WorkingDayCalendar(start_date, end_date, holidays, _weekend_days())
+
+
+def _expire_if_stale():
+    # Signals invalidate this process; the TTL picks up changes made by other workers
+    global _academic_years
+    ttl = getattr(settings, 'WORKING_DAYS_CACHE_TTL', 300)
+    if _academic_years is not None and time.monotonic() - _loaded_at > ttl:
+        _calendars.clear()
+        _academic_years = None
+
+
+def _calendar_for(day):
+    """The cached calendar of the academic year containing day (else its calendar year)"""
+    global _academic_years, _loaded_at
+    from students.models import AcademicYear
+
+    with _lock:
+        _expire_if_stale()
+        if _academic_years is None:
+            _academic_years = list(
+                AcademicYear.objects.order_by('start_date').values_list('id', 'start_date', 'end_date')
+            )
+            _loaded_at = time.monotonic()
+
+        key = None
+        for year_id, start_date, end_date in _academic_years:
+            if start_date <= day <= end_date:
+                key = ('academic_year', year_id)
+                break
+        if key is None:
+            key = ('year', day.year)
+            start_date, end_date = date(day.year, 1, 1), date(day.year, 12, 31)
+
+        calendar = _calendars.get(key)
+        if calendar is None:
+            calendar = _calendars[key] = _build_calendar(start_date, end_date)
+        return calendar
+
+
+def working_days_between(start_date, end_date):
+    """Number of working days (weekends and active holidays excluded) in [start_date, end_date]"""
+    total = 0
+    day = start_date
+    while day <= end_date:
+        calendar = _calendar_for(day)
+        segment_end = min(end_date, calendar.end_date)
+        total += calendar.count(day, segment_end)
+        day = segment_end + timedelta(days=1)
+    return total
+
+
+def is_working_day(day):
+    return _calendar_for(day).is_working_day(day)
+
+
+def working_dates(start_date, end_date):
+    """List the working days in [start_date, end_date]"""
+    dates = []
+    day = start_date
+    while day <= end_date:
+        calendar = _calendar_for(day)
+        segment_end = min(end_date, calendar.end_date)
+        while day <= segment_end:
+            if calendar.is_working_day(day):
+                dates.append(day)
+            day += timedelta(days=1)
+    return dates
+
+
+def invalidate_calendars():
+    """Drop all cached calendars so they are rebuilt on next use"""
+    global _academic_years
+    with _lock:
+        _calendars.clear()
+        _academic_years = None
@@ -0,0 +1,9 @@
+import os
+from celery import Celery
+
+# Worker entry point: celery -A attendance_system worker
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'attendance_system.settings')
+
+app = Celery('attendance_system')
+app.config_from_object('django.conf:settings', namespace='CELERY')
+app.autodiscover_tasks()
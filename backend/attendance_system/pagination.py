@@ -0,0 +1,153 @@
+import base64
+import json
+from datetime import date, datetime, time
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.filters import OrderingFilter
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """
+    Cursor pagination on a composite key instead of OFFSET.
+
+    Views set `keyset_ordering` to non-null fields that end in a unique one
+    (e.g. ('-date', '-id')); the cursor holds the key of the last row served
+    and the next page is read with a WHERE on that key, so deep pages cost
+    the same as the first. With an OrderingFilter ?ordering= the chosen
+    ordering plus the primary key is used.
+
+    The total `count` is included unless the client passes ?count=false.
+    """
+    page_size = api_settings.PAGE_SIZE
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    cursor_query_param = 'cursor'
+    count_query_param = 'count'
+    ordering = ('-pk',)
+    invalid_cursor_message = 'Invalid cursor'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        self.page_size = self.get_page_size(request)
+        self.ordering = self.get_ordering(request, queryset, view)
+        self.count = self.get_count(queryset) if self.include_count(request) else None
+
+        values, reverse = self.decode_cursor(request)
+        queryset = queryset.order_by(*self.ordering)
+        if values is not None:
+            queryset = queryset.filter(self.keyset_filter(values, reverse))
+        if reverse:
+            queryset = queryset.reverse()
+
+        rows = list(queryset[:self.page_size + 1])
+        has_more = len(rows) > self.page_size
+        rows = rows[:self.page_size]
+        if reverse:
+            rows.reverse()
+            self.has_next, self.has_previous = True, has_more
+        else:
+            self.has_next, self.has_previous = has_more, values is not None
+
+        self.page = rows
+        return rows
+
+    def get_paginated_response(self, data):
+        response = {}
+        if self.count is not None:
+            response['count'] = self.count
+        response['next'] = self.get_next_link()
+        response['previous'] = self.get_previous_link()
+        response['results'] = data
+        return Response(response)
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return max(1, min(size, self.max_page_size))
+
+    def get_ordering(self, request, queryset, view):
+        filter_backends = getattr(view, 'filter_backends', [])
+        ordering_param = api_settings.ORDERING_PARAM
+        if (request.query_params.get(ordering_param) and
+                any(issubclass(backend, OrderingFilter) for backend in filter_backends)):
+            # OrderingFilter already validated and applied the requested fields
+            ordering = [field for field in queryset.query.order_by if isinstance(field, str)]
+            if ordering:
+                tiebreak = '-pk' if ordering[0].startswith('-') else 'pk'
+                return tuple(ordering) + (tiebreak,)
+        return tuple(getattr(view, 'keyset_ordering', self.ordering))
+
+    def include_count(self, request):
+        value = request.query_params.get(self.count_query_param, 'true')
+        return value.lower() not in ('0', 'false', 'no')
+
+    def get_count(self, queryset):
+        return queryset.order_by().count()
+
+    def keyset_filter(self, values, reverse=False):
+        """WHERE clause selecting rows after (or before, if reverse) the given key"""
+        if len(values) != len(self.ordering):
+            raise NotFound(self.invalid_cursor_message)
+
+        condition = Q()
+        equal = {}
+        for field, value in zip(self.ordering, values):
+            descending = field.startswith('-')
+            name = field.lstrip('-')
+            lookup = 'lt' if descending != reverse else 'gt'
+            condition |= Q(**equal, **{f'{name}__{lookup}': value})
+            equal[name] = value
+
+        # Bound the leading column too, so the database can seek an index on it
+        first = self.ordering[0]
+        leading = 'lte' if first.startswith('-') != reverse else 'gte'
+        return Q(**{f"{first.lstrip('-')}__{leading}": values[0]}) & condition
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self.encode_cursor(self.page[-1], reverse=False)
+
+    def get_previous_link(self):
+        if not self.has_previous or not self.page:
+            return None
+        return self.encode_cursor(self.page[0], reverse=True)
+
+    def encode_cursor(self, row, reverse):
+        values = [self._serialize(self._key_value(row, field.lstrip('-'))) for field in self.ordering]
+        payload = json.dumps({'v': values, 'r': int(reverse)}, separators=(',', ':'))
+        cursor = base64.urlsafe_b64encode(payload.encode()).decode()
+        url = replace_query_param(self.base_url, self.cursor_query_param, cursor)
+        return url if self.count is not None else replace_query_param(url, self.count_query_param, 'false')
+
+    def decode_cursor(self, request):
+        cursor = request.query_params.get(self.cursor_query_param)
+        if not cursor:
+            return None, False
+        try:
+            payload = json.loads(base64.urlsafe_b64decode(cursor.encode()).decode())
+            return list(payload['v']), bool(payload.get('r'))
+        except (TypeError, ValueError, KeyError, UnicodeDecodeError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def _key_value(self, row, field):
+        value = row
+        for part in field.split('__'):
+            value = getattr(value, part)
+        return value
+
+    def _serialize(self, value):
+        # isoformat keeps microseconds, which the key comparison needs
+        if isinstance(value, (date, datetime, time)):
+            return value.isoformat()
+        return value
+
+    def get_schema_operation_parameters(self, view):
+        return []
@@ -98,6 +98,9 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        # A file rather than the shared-cache in-memory database, whose table
+        # locks ignore the busy timeout and fail the concurrent check-in tests
+        'TEST': {'NAME': BASE_DIR / 'test_db.sqlite3'},
     }
 }
 
@@ -196,10 +199,70 @@ CORS_ALLOW_CREDENTIALS = True
 CELERY_BROKER_URL = config('REDIS_URL', default='redis://localhost:6379')
 CELERY_RESULT_BACKEND = config('REDIS_URL', default='redis://localhost:6379')
 
+# Background report jobs: 'thread' runs them in an in-process pool (no Redis
+# needed), 'celery' sends them to the Celery worker
+REPORT_JOBS_BACKEND = config('REPORT_JOBS_BACKEND', default='thread')
+REPORT_JOB_WORKERS = 2  # pool threads per process ('thread' backend)
+REPORT_JOB_TIMEOUT = 900  # seconds before a queued/running job is considered lost
+
 # Face Recognition settings
 FACE_RECOGNITION_TOLERANCE = 0.6
 FACE_RECOGNITION_MODEL = 'hog'  # 'hog' or 'cnn'
 
+# Load models and the face gallery when the app starts (enable on web workers only)
+FACE_RECOGNITION_PRELOAD = config('FACE_RECOGNITION_PRELOAD', default=False, cast=bool)
+
+# Audit thumbnails of recognition attempts (written off the request path)
+FACE_RECOGNITION_AUDIT_ENABLED = config('FACE_RECOGNITION_AUDIT_ENABLED', default=False, cast=bool)
+FACE_RECOGNITION_AUDIT_SAMPLE_RATE = config('FACE_RECOGNITION_AUDIT_SAMPLE_RATE', default=1.0, cast=float)
+FACE_RECOGNITION_AUDIT_QUEUE_SIZE = 256
+FACE_RECOGNITION_AUDIT_DROP_POLICY = 'drop_newest'  # 'drop_newest' or 'drop_oldest'
+FACE_RECOGNITION_AUDIT_THUMBNAIL_SIZE = 160  # max width/height in pixels
+
+# Attendance calendar: weekdays that are never working days (Monday=0 ... Sunday=6)
+WEEKEND_DAYS = (5, 6)
+WORKING_DAYS_CACHE_TTL = 300  # seconds before other workers' holiday edits are picked up
+
+# Compressed archive files of closed academic years (see archive_academic_years)
+ATTENDANCE_ARCHIVE_ROOT = BASE_DIR / 'archive'
+ARCHIVE_MANIFEST_CACHE_TTL = 300  # seconds before other processes' new partitions are picked up
+
+# Largest batch an offline kiosk may upload to /api/attendance/sync/
+KIOSK_SYNC_MAX_EVENTS = 1000
+
+# Write-behind check-ins: acknowledge once appended to a local journal and
+# group-commit to the database (see attendance/journal.py)
+ATTENDANCE_WRITE_BEHIND = config('ATTENDANCE_WRITE_BEHIND', default=False, cast=bool)
+ATTENDANCE_JOURNAL_DIR = BASE_DIR / 'journal'
+ATTENDANCE_JOURNAL_FLUSH_INTERVAL = 0.25  # seconds between group commits
+ATTENDANCE_JOURNAL_MAX_RETRIES = 10  # failed group commits in a row before failing scans are dead-lettered
+
+# Check event log: every scan is appended to check_events and the projector
+# (project_check_events --follow) folds them into attendance records.
+# Takes precedence over ATTENDANCE_WRITE_BEHIND.
+ATTENDANCE_CHECK_EVENTS = config('ATTENDANCE_CHECK_EVENTS', default=False, cast=bool)
+ATTENDANCE_PROJECTOR_BATCH_SIZE = 1000  # events per projector transaction
+ATTENDANCE_PROJECTOR_INTERVAL = 1.0  # seconds between projector passes
+
+# Face recognition scans within this many seconds of a user's last check
+# return the last result without writing (0 disables). Set the cache alias
+# to share cooldowns between workers (needs a shared CACHES backend).
+ATTENDANCE_CHECK_DEBOUNCE_SECONDS = 60
+ATTENDANCE_CHECK_DEBOUNCE_CACHE = None
+
+# Nightly analytics (refresh_attendance_analytics): rolling window in working
+# days and the thresholds that flag a student as at risk
+ATTENDANCE_ANALYTICS_WINDOW = 20
+ATTENDANCE_AT_RISK_RATE = 0.9  # attendance below 90% is chronic absence
+ATTENDANCE_AT_RISK_STREAK = 3  # consecutive absences up to the last day analysed
+ATTENDANCE_AT_RISK_DECLINE = 0.1  # drop of the rolling rate against the previous window
+
+# Check-in status rules: a check-in after the section's schedule_start_time
+# (or the default start for users without one) plus the grace period is late.
+# Run recompute_attendance_status after changing them.
+ATTENDANCE_DEFAULT_START_TIME = '09:00'
+ATTENDANCE_LATE_GRACE_MINUTES = 5
+
 # Custom User Model
 AUTH_USER_MODEL = 'users.User'
 
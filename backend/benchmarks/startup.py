@@ -0,0 +1,100 @@
+"""
+Startup-time benchmark for the Django processes that should not pay for the
+vision stack (report workers, websocket workers, management commands).
+
+Each scenario runs in a fresh interpreter several times; the median wall time
+is reported together with the heavy modules that ended up imported. The script
+exits non-zero if any scenario other than the explicit vision one imports
+cv2, numpy, PIL or face_recognition.
+
+Usage (from backend/):
+    python benchmarks/startup.py [--runs 5] [--json]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+HEAVY_MODULES = ['cv2', 'numpy', 'PIL', 'face_recognition', 'dlib']
+
+SETUP = (
+    "import os, sys, json\n"
+    "os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'attendance_system.settings')\n"
+)
+REPORT = (
+    "print(json.dumps([m for m in %r if m in sys.modules]))\n" % HEAVY_MODULES
+)
+
+SCENARIOS = [
+    ('python (interpreter only)', [sys.executable, '-c', 'pass'], False),
+    ('manage.py check', [sys.executable, 'manage.py', 'check'], False),
+    ('URLconf import', [sys.executable, '-c', SETUP + (
+        "import django\n"
+        "django.setup()\n"
+        "import attendance_system.urls\n"
+    ) + REPORT], True),
+    ('ASGI app import', [sys.executable, '-c', SETUP + (
+        "import attendance_system.asgi\n"
+    ) + REPORT], True),
+    ('vision stack (reference)', [sys.executable, '-c', SETUP + (
+        "import django\n"
+        "django.setup()\n"
+        "from face_recognition_app.services import FaceRecognitionService\n"
+        "import cv2, numpy, PIL.Image\n"
+    ) + REPORT], False),
+]
+
+
+def run_scenario(command, runs):
+    timings = []
+    heavy = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        result = subprocess.run(command, cwd=BACKEND_DIR, capture_output=True, text=True)
+        timings.append(time.perf_counter() - start)
+        if result.returncode != 0:
+            raise RuntimeError(result.stderr.strip() or result.stdout.strip())
+        last_line = result.stdout.strip().splitlines()[-1:] or ['[]']
+        try:
+            heavy = json.loads(last_line[0])
+        except ValueError:
+            heavy = []
+    return statistics.median(timings), heavy
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--runs', type=int, default=5, help='Runs per scenario (default: 5)')
+    parser.add_argument('--json', action='store_true', help='Print results as JSON')
+    args = parser.parse_args()
+
+    results = []
+    failed = False
+    for name, command, must_be_light in SCENARIOS:
+        median, heavy = run_scenario(command, args.runs)
+        regression = must_be_light and bool(heavy)
+        failed = failed or regression
+        results.append({
+            'scenario': name,
+            'median_seconds': round(median, 3),
+            'heavy_modules': heavy,
+            'regression': regression,
+        })
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        for result in results:
+            flag = '  <-- imports vision stack' if result['regression'] else ''
+            heavy = ', '.join(result['heavy_modules']) or '-'
+            print(f"{result['scenario']:<28} {result['median_seconds']:>7.3f}s  heavy: {heavy}{flag}")
+
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import FaceEncoding, FaceRecognitionLog
+from .models import FaceEncoding, FaceRecognitionLog, FaceImage
 
 
 @admin.register(FaceEncoding)
@@ -16,4 +16,11 @@ class FaceRecognitionLogAdmin(admin.ModelAdmin):
     list_filter = ['status', 'timestamp']
     search_fields = ['user__username', 'location']
     readonly_fields = ['timestamp']
-    date_hierarchy = 'timestamp'
\ No newline at end of file
+    date_hierarchy = 'timestamp'
+
+
+@admin.register(FaceImage)
+class FaceImageAdmin(admin.ModelAdmin):
+    list_display = ['content_hash', 'image_path', 'created_at']
+    search_fields = ['content_hash']
+    readonly_fields = ['content_hash', 'encoding_data', 'image_path', 'created_at']
\ No newline at end of file
@@ -1,6 +1,15 @@
 from django.apps import AppConfig
+from django.conf import settings
 
 
 class FaceRecognitionAppConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
-    name = 'face_recognition_app'
\ No newline at end of file
+    name = 'face_recognition_app'
+
+    def ready(self):
+        import face_recognition_app.signals
+
+        # Opt-in: only web workers should pay for loading the models at startup
+        if getattr(settings, 'FACE_RECOGNITION_PRELOAD', False):
+            from .warmup import start_warmup
+            start_warmup()
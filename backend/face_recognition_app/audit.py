@@ -0,0 +1,128 @@
+import logging
+import os
+import queue
+import random
+import threading
+from django.conf import settings
+from django.db import close_old_connections
+from django.utils import timezone
+from .models import FaceRecognitionLog
+
+logger = logging.getLogger(__name__)
+
+AUDIT_IMAGE_DIR = 'recognition_audit'
+DROP_NEWEST = 'drop_newest'
+DROP_OLDEST = 'drop_oldest'
+
+
+class AuditImageWriter:
+    """
+    Background writer that saves a JPEG thumbnail of each sampled recognition
+    attempt and back-fills FaceRecognitionLog.image_path.
+
+    submit() never blocks: when the queue is full an item is dropped according
+    to the drop policy, so audit capture cannot slow down recognition.
+    """
+
+    def __init__(self, queue_size=256, sample_rate=1.0, drop_policy=DROP_NEWEST, thumbnail_size=160):
+        if drop_policy not in (DROP_NEWEST, DROP_OLDEST):
+            raise ValueError(f"Unknown audit drop policy: {drop_policy}")
+        self.sample_rate = sample_rate
+        self.drop_policy = drop_policy
+        self.thumbnail_size = thumbnail_size
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.stats = {'submitted': 0, 'sampled_out': 0, 'dropped': 0, 'written': 0, 'failed': 0}
+        self._thread = threading.Thread(target=self._run, name='face-audit-writer', daemon=True)
+        self._thread.start()
+
+    def submit(self, log_id, image_array, face_location=None):
+        """
+        Queue an audit thumbnail for a log entry
+        Args:
+            log_id: FaceRecognitionLog primary key
+            image_array: decoded RGB numpy array of the request image
+            face_location: optional (top, right, bottom, left) to crop to
+        Returns:
+            bool: True if the image was queued
+        """
+        if self.sample_rate < 1.0 and random.random() >= self.sample_rate:
+            self.stats['sampled_out'] += 1
+            return False
+
+        if face_location is not None:
+            top, right, bottom, left = face_location
+            image_array = image_array[max(top, 0):bottom, max(left, 0):right]
+        # Copy so the writer never holds on to the full request frame
+        item = (log_id, timezone.now(), image_array.copy())
+
+        try:
+            self.queue.put_nowait(item)
+        except queue.Full:
+            if self.drop_policy == DROP_NEWEST:
+                self.stats['dropped'] += 1
+                return False
+            try:
+                self.queue.get_nowait()
+                self.stats['dropped'] += 1
+            except queue.Empty:
+                pass
+            try:
+                self.queue.put_nowait(item)
+            except queue.Full:
+                self.stats['dropped'] += 1
+                return False
+
+        self.stats['submitted'] += 1
+        return True
+
+    def _run(self):
+        while True:
+            log_id, captured_at, image_array = self.queue.get()
+            try:
+                close_old_connections()
+                image_path = self._write_thumbnail(log_id, captured_at, image_array)
+                FaceRecognitionLog.objects.filter(pk=log_id).update(image_path=image_path)
+                self.stats['written'] += 1
+            except Exception:
+                self.stats['failed'] += 1
+                logger.exception("Failed to write audit image for recognition log %s", log_id)
+            finally:
+                self.queue.task_done()
+
+    def _write_thumbnail(self, log_id, captured_at, image_array):
+        from PIL import Image
+
+        local_time = timezone.localtime(captured_at)
+        relative_dir = os.path.join(
+            AUDIT_IMAGE_DIR, f'{local_time:%Y}', f'{local_time:%m}', f'{local_time:%d}'
+        )
+        absolute_dir = os.path.join(settings.MEDIA_ROOT, relative_dir)
+        os.makedirs(absolute_dir, exist_ok=True)
+
+        thumbnail = Image.fromarray(image_array)
+        thumbnail.thumbnail((self.thumbnail_size, self.thumbnail_size))
+        filename = f'{log_id}.jpg'
+        thumbnail.convert('RGB').save(os.path.join(absolute_dir, filename), 'JPEG', quality=80)
+
+        return os.path.join(relative_dir, filename).replace(os.sep, '/')
+
+
+_writer = None
+_writer_lock = threading.Lock()
+
+
+def get_audit_writer():
+    """Return the process-wide audit writer, or None when audit capture is off"""
+    global _writer
+    if not getattr(settings, 'FACE_RECOGNITION_AUDIT_ENABLED', False):
+        return None
+    if _writer is None:
+        with _writer_lock:
+            if _writer is None:
+                _writer = AuditImageWriter(
+                    queue_size=getattr(settings, 'FACE_RECOGNITION_AUDIT_QUEUE_SIZE', 256),
+                    sample_rate=getattr(settings, 'FACE_RECOGNITION_AUDIT_SAMPLE_RATE', 1.0),
+                    drop_policy=getattr(settings, 'FACE_RECOGNITION_AUDIT_DROP_POLICY', DROP_NEWEST),
+                    thumbnail_size=getattr(settings, 'FACE_RECOGNITION_AUDIT_THUMBNAIL_SIZE', 160),
+                )
+    return _writer
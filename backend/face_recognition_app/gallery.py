@@ -0,0 +1,93 @@
+import json
+import threading
+from django.conf import settings
+from django.db.models import Count, Max
+from .models import FaceEncoding
+
+
+class FaceGallery:
+    """In-memory matrix of active face encodings for vectorised matching"""
+
+    def __init__(self, user_ids, encodings, tolerance=None):
+        import numpy as np
+
+        self.user_ids = list(user_ids)
+        if self.user_ids:
+            self.encodings = np.asarray(encodings, dtype=np.float64).reshape(len(self.user_ids), -1)
+        else:
+            self.encodings = np.empty((0, 128))
+        self.tolerance = (
+            tolerance if tolerance is not None
+            else getattr(settings, 'FACE_RECOGNITION_TOLERANCE', 0.6)
+        )
+
+    def __len__(self):
+        return len(self.user_ids)
+
+    @classmethod
+    def load(cls, tolerance=None):
+        """Build the gallery from all active FaceEncoding rows in one query"""
+        user_ids = []
+        encodings = []
+        rows = FaceEncoding.objects.filter(is_active=True).values_list('user_id', 'encoding_data')
+        for user_id, encoding_data in rows:
+            user_ids.append(user_id)
+            encodings.append(json.loads(encoding_data))
+        return cls(user_ids, encodings, tolerance)
+
+    def match(self, encoding):
+        """
+        Find the closest registered face
+        Returns:
+            tuple: (user_id or None, distance)
+        """
+        if not self.user_ids:
+            return None, float('inf')
+
+        import numpy as np
+
+        # Same metric as face_recognition.face_distance, for the whole gallery at once
+        distances = np.linalg.norm(self.encodings - np.asarray(encoding), axis=1)
+        best = int(np.argmin(distances))
+        distance = float(distances[best])
+        if distance <= self.tolerance:
+            return self.user_ids[best], distance
+        return None, distance
+
+
+_gallery = None
+_gallery_fingerprint = None
+_gallery_lock = threading.Lock()
+
+
+def _current_fingerprint():
+    """Cheap aggregate that changes whenever an active encoding is added, edited or removed"""
+    summary = FaceEncoding.objects.filter(is_active=True).aggregate(
+        count=Count('id'), last_updated=Max('updated_at')
+    )
+    return summary['count'], summary['last_updated']
+
+
+def get_gallery():
+    """
+    Return the process-wide gallery, reloading it only when the stored
+    encodings have changed (including changes made by other workers)
+    """
+    global _gallery, _gallery_fingerprint
+    fingerprint = _current_fingerprint()
+    if _gallery is not None and fingerprint == _gallery_fingerprint:
+        return _gallery
+
+    with _gallery_lock:
+        if _gallery is None or fingerprint != _gallery_fingerprint:
+            _gallery = FaceGallery.load()
+            _gallery_fingerprint = fingerprint
+        return _gallery
+
+
+def invalidate_gallery():
+    """Drop the cached gallery so the next lookup reloads it"""
+    global _gallery, _gallery_fingerprint
+    with _gallery_lock:
+        _gallery = None
+        _gallery_fingerprint = None
@@ -0,0 +1,65 @@
+import hashlib
+import io
+import os
+import tempfile
+from django.conf import settings
+
+FACE_IMAGE_DIR = 'faces'
+# Formats stored as uploaded; anything else is re-encoded to JPEG
+STORED_FORMATS = {'JPEG': '.jpg', 'PNG': '.png'}
+
+
+def read_upload(image_file):
+    """Read the raw bytes of an uploaded file without consuming it"""
+    image_file.seek(0)
+    data = image_file.read()
+    image_file.seek(0)
+    return data
+
+
+def content_hash(data):
+    """SHA-256 hex digest used as the content address of an image"""
+    return hashlib.sha256(data).hexdigest()
+
+
+def stored_image(data):
+    """
+    The bytes and extension to store an upload under, from the format PIL
+    decodes rather than the client's file name
+    Returns:
+        tuple: (bytes, extension)
+    """
+    from PIL import Image
+
+    with Image.open(io.BytesIO(data)) as image:
+        if image.format in STORED_FORMATS:
+            return data, STORED_FORMATS[image.format]
+        output = io.BytesIO()
+        image.convert('RGB').save(output, format='JPEG', quality=95)
+    return output.getvalue(), '.jpg'
+
+
+def store_image(data, digest, extension='.jpg'):
+    """
+    Write image bytes to MEDIA_ROOT/faces/<aa>/<digest><ext> once
+    Returns:
+        str: path relative to MEDIA_ROOT
+    """
+    relative_path = os.path.join(FACE_IMAGE_DIR, digest[:2], f'{digest}{extension.lower()}')
+    absolute_path = os.path.join(settings.MEDIA_ROOT, relative_path)
+
+    if not os.path.exists(absolute_path):
+        directory = os.path.dirname(absolute_path)
+        os.makedirs(directory, exist_ok=True)
+        # Write to a temp file first so a concurrent upload never sees a partial image
+        fd, temp_path = tempfile.mkstemp(dir=directory)
+        try:
+            with os.fdopen(fd, 'wb') as temp_file:
+                temp_file.write(data)
+            os.replace(temp_path, absolute_path)
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+
+    return relative_path.replace(os.sep, '/')
@@ -0,0 +1,238 @@
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+import django
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+
+from attendance.archive import ArchivedDateError, ensure_not_archived
+from attendance.models import AttendanceRecord
+from attendance.status_rules import check_in_status, start_times
+from attendance.summaries import refresh_summaries
+from face_recognition_app.gallery import FaceGallery
+from face_recognition_app.services import FaceRecognitionService
+
+_worker_service = None
+
+
+def _encode_frame(frame_index, frame):
+    """Worker: detect and encode every face in one RGB frame"""
+    global _worker_service
+    if _worker_service is None:
+        _worker_service = FaceRecognitionService()
+    faces = _worker_service.encode_all_faces(frame)
+    return frame_index, [encoding for _, encoding in faces]
+
+
+class Command(BaseCommand):
+    help = 'Mark attendance from a recorded lecture video'
+
+    def add_arguments(self, parser):
+        parser.add_argument('video', help='Path to a local video file')
+        parser.add_argument(
+            '--sample-rate',
+            type=float,
+            default=1.0,
+            help='Frames per second of video to analyse (default: 1.0)',
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=os.cpu_count() or 1,
+            help='Number of detection/encoding worker processes (default: CPU count)',
+        )
+        parser.add_argument(
+            '--scale',
+            type=float,
+            default=1.0,
+            help='Resize factor applied to frames before detection (default: 1.0)',
+        )
+        parser.add_argument(
+            '--min-sightings',
+            type=int,
+            default=3,
+            help='Sampled frames a person must appear in to be marked present (default: 3)',
+        )
+        parser.add_argument(
+            '--recorded-at',
+            help='Recording start as YYYY-MM-DDTHH:MM (default: file mtime minus video length)',
+        )
+        parser.add_argument(
+            '--location',
+            default='',
+            help='Location stored on the attendance records',
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Report sightings without writing attendance records',
+        )
+
+    def handle(self, *args, **options):
+        import cv2
+
+        video_path = options['video']
+        if not os.path.isfile(video_path):
+            raise CommandError(f'Video file not found: {video_path}')
+        if options['sample_rate'] <= 0:
+            raise CommandError('--sample-rate must be positive')
+
+        capture = cv2.VideoCapture(video_path)
+        if not capture.isOpened():
+            raise CommandError(f'Could not open video: {video_path}')
+
+        video_fps = capture.get(cv2.CAP_PROP_FPS) or 25.0
+        frame_count = int(capture.get(cv2.CAP_PROP_FRAME_COUNT) or 0)
+        step = max(1, round(video_fps / options['sample_rate']))
+        recorded_at = self._recording_start(video_path, options['recorded_at'], frame_count / video_fps)
+        if not options['dry_run']:
+            try:
+                ensure_not_archived([recorded_at])
+            except ArchivedDateError as e:
+                raise CommandError(str(e))
+
+        gallery = FaceGallery.load()
+        if not len(gallery):
+            raise CommandError('No registered faces to match against')
+
+        self.stdout.write(
+            f'Analysing {video_path}: {video_fps:.1f} fps, every {step} frame(s), '
+            f'{options["workers"]} worker(s), {len(gallery)} registered faces'
+        )
+
+        # user_id -> [first_seen_seconds, last_seen_seconds, sightings, best_distance]
+        sightings = {}
+        workers = max(1, options['workers'])
+        max_in_flight = workers * 2
+        in_flight = deque()
+        decoded = 0
+        sampled = 0
+        started = time.time()
+        last_report = started
+
+        def collect(future):
+            frame_index, encodings = future.result()
+            seconds = frame_index / video_fps
+            for encoding in encodings:
+                user_id, distance = gallery.match(encoding)
+                if user_id is None:
+                    continue
+                seen = sightings.get(user_id)
+                if seen is None:
+                    sightings[user_id] = [seconds, seconds, 1, distance]
+                else:
+                    seen[0] = min(seen[0], seconds)
+                    seen[1] = max(seen[1], seconds)
+                    seen[2] += 1
+                    seen[3] = min(seen[3], distance)
+
+        with ProcessPoolExecutor(max_workers=workers, initializer=django.setup) as pool:
+            frame_index = 0
+            while True:
+                # grab() skips decoding for frames we are not going to analyse
+                if not capture.grab():
+                    break
+                decoded += 1
+                if frame_index % step == 0:
+                    ok, frame = capture.retrieve()
+                    if ok:
+                        if options['scale'] != 1.0:
+                            frame = cv2.resize(frame, None, fx=options['scale'], fy=options['scale'])
+                        frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+
+                        # Bounded queue of pending frames keeps memory flat for any video length
+                        if len(in_flight) >= max_in_flight:
+                            collect(in_flight.popleft())
+                        in_flight.append(pool.submit(_encode_frame, frame_index, frame))
+                        sampled += 1
+                frame_index += 1
+
+                now = time.time()
+                if now - last_report >= 10:
+                    self._report_progress(sampled, decoded, now - started)
+                    last_report = now
+
+            while in_flight:
+                collect(in_flight.popleft())
+
+        capture.release()
+        elapsed = time.time() - started
+        self._report_progress(sampled, decoded, elapsed)
+
+        present = {
+            user_id: seen for user_id, seen in sightings.items()
+            if seen[2] >= options['min_sightings']
+        }
+        self.stdout.write(
+            f'{len(sightings)} people sighted, {len(present)} with at least '
+            f'{options["min_sightings"]} sightings'
+        )
+
+        if options['dry_run']:
+            for user_id, (first, last, count, distance) in sorted(present.items()):
+                self.stdout.write(
+                    f'  user {user_id}: {count} sightings, {first:.0f}s-{last:.0f}s, '
+                    f'best distance {distance:.3f}'
+                )
+            return
+
+        created = self._write_attendance(present, recorded_at, options['location'])
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'Marked {created} attendance records for {timezone.localtime(recorded_at).date()} '
+                f'({len(present) - created} already had a record)'
+            )
+        )
+
+    def _recording_start(self, video_path, recorded_at, duration_seconds):
+        if recorded_at:
+            try:
+                start = datetime.strptime(recorded_at, '%Y-%m-%dT%H:%M')
+            except ValueError:
+                raise CommandError('--recorded-at must be YYYY-MM-DDTHH:MM')
+            return timezone.make_aware(start)
+
+        modified = datetime.fromtimestamp(os.path.getmtime(video_path), tz=dt_timezone.utc)
+        return modified - timedelta(seconds=duration_seconds)
+
+    def _report_progress(self, sampled, decoded, elapsed):
+        elapsed = max(elapsed, 1e-6)
+        self.stdout.write(
+            f'{sampled} frames analysed ({decoded} decoded) in {elapsed:.1f}s - '
+            f'{sampled / elapsed:.2f} analysed frames/s, {decoded / elapsed:.1f} decoded frames/s'
+        )
+
+    def _write_attendance(self, present, recorded_at, location):
+        attendance_date = timezone.localtime(recorded_at).date()
+        schedule = start_times(present.keys())
+        records = []
+        for user_id, (first, last, count, distance) in present.items():
+            check_in = recorded_at + timedelta(seconds=first)
+            check_out = recorded_at + timedelta(seconds=last) if last > first else None
+            records.append(AttendanceRecord(
+                user_id=user_id,
+                date=attendance_date,
+                check_in_time=check_in,
+                check_out_time=check_out,
+                status=check_in_status(check_in, schedule.get(user_id)),
+                marked_by_face_recognition=True,
+                confidence_score=1 - distance,
+                location=location,
+                notes=f'Recorded video: seen in {count} sampled frames',
+            ))
+
+        existing = set(
+            AttendanceRecord.objects.filter(
+                date=attendance_date, user_id__in=present.keys()
+            ).values_list('user_id', flat=True)
+        )
+        written = set(present) - existing
+        with transaction.atomic():
+            AttendanceRecord.objects.bulk_create(records, batch_size=500, ignore_conflicts=True)
+            # bulk_create skips the post_save receivers that keep summaries in step
+            refresh_summaries({(user_id, attendance_date) for user_id in written})
+        return len(written)
@@ -0,0 +1,26 @@
+# Generated by Django 4.2.7 on 2026-10-19 07:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('face_recognition_app', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FaceImage',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('content_hash', models.CharField(max_length=64, unique=True)),
+                ('encoding_data', models.TextField()),
+                ('image_path', models.CharField(max_length=500)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'db_table': 'face_images',
+            },
+        ),
+    ]
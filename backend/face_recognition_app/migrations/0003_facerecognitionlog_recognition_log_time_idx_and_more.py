@@ -0,0 +1,25 @@
+# Generated by Django 4.2.7 on 2026-10-19 07:58
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('face_recognition_app', '0002_faceimage'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='facerecognitionlog',
+            index=models.Index(fields=['timestamp'], name='recognition_log_time_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='facerecognitionlog',
+            index=models.Index(fields=['status', 'timestamp'], name='recognition_log_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='facerecognitionlog',
+            index=models.Index(fields=['user', 'timestamp'], name='recognition_log_user_idx'),
+        ),
+    ]
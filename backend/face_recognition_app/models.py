@@ -52,7 +52,26 @@ class FaceRecognitionLog(models.Model):
     class Meta:
         ordering = ['-timestamp']
         db_table = 'face_recognition_logs'
+        indexes = [
+            models.Index(fields=['timestamp'], name='recognition_log_time_idx'),
+            models.Index(fields=['status', 'timestamp'], name='recognition_log_status_idx'),
+            models.Index(fields=['user', 'timestamp'], name='recognition_log_user_idx'),
+        ]
 
     def __str__(self):
         user_str = self.user.username if self.user else 'Unknown'
-        return f"{user_str} - {self.status} ({self.timestamp})"
\ No newline at end of file
+        return f"{user_str} - {self.status} ({self.timestamp})"
+
+
+class FaceImage(models.Model):
+    """Content-addressed enrolment image and its face encoding"""
+    content_hash = models.CharField(max_length=64, unique=True)  # SHA-256 of the raw upload
+    encoding_data = models.TextField()  # JSON string of face encoding array
+    image_path = models.CharField(max_length=500)  # relative to MEDIA_ROOT
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        db_table = 'face_images'
+
+    def __str__(self):
+        return f"Face image {self.content_hash[:12]}"
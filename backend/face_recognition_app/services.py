@@ -1,16 +1,28 @@
-# Temporarily commented out for basic setup
-# import face_recognition
-import cv2
-import numpy as np
-from PIL import Image
-import os
+# cv2, numpy and PIL are imported inside the methods that need them so that
+# importing this module (views, URLconf, management commands) stays cheap
+import io
+import json
 import time
 from django.conf import settings
 from django.contrib.auth import get_user_model
-from .models import FaceEncoding, FaceRecognitionLog
+from .audit import get_audit_writer
+from .gallery import get_gallery
+from .image_store import read_upload, content_hash, store_image, stored_image
+from .models import FaceEncoding, FaceRecognitionLog, FaceImage
 
 User = get_user_model()
 
+_face_recognition = None
+
+
+def load_face_recognition():
+    """Import face_recognition (and dlib, numpy) on first use"""
+    global _face_recognition
+    if _face_recognition is None:
+        import face_recognition
+        _face_recognition = face_recognition
+    return _face_recognition
+
 
 class FaceRecognitionService:
     """Service class for face recognition operations - temporarily disabled"""
@@ -27,8 +39,16 @@ class FaceRecognitionService:
         Returns:
             tuple: (encoding_array, success_boolean, error_message)
         """
+        encoding, face_location, success, error, processing_time = self._encode_single_face(
+            image_path_or_array
+        )
+        return encoding, success, error, processing_time
+
+    def _encode_single_face(self, image_path_or_array):
+        """Like encode_face_from_image, but also returns the face location"""
         try:
             start_time = time.time()
+            face_recognition = load_face_recognition()
             
             # Load image
             if isinstance(image_path_or_array, str):
@@ -44,10 +64,10 @@ class FaceRecognitionService:
             processing_time = time.time() - start_time
             
             if len(face_locations) == 0:
-                return None, False, "No face detected in the image", processing_time
+                return None, None, False, "No face detected in the image", processing_time
             
             if len(face_locations) > 1:
-                return None, False, "Multiple faces detected. Please use an image with only one face", processing_time
+                return None, None, False, "Multiple faces detected. Please use an image with only one face", processing_time
             
             # Extract face encoding
             face_encodings = face_recognition.face_encodings(
@@ -55,14 +75,34 @@ class FaceRecognitionService:
             )
             
             if len(face_encodings) == 0:
-                return None, False, "Could not encode the face", processing_time
+                return None, face_locations[0], False, "Could not encode the face", processing_time
             
             processing_time = time.time() - start_time
-            return face_encodings[0], True, None, processing_time
+            return face_encodings[0], face_locations[0], True, None, processing_time
             
         except Exception as e:
-            return None, False, str(e), time.time() - start_time
-    
+            return None, None, False, str(e), time.time() - start_time
+
+    def encode_all_faces(self, image_array):
+        """
+        Extract encodings for every face in an image (e.g. a classroom frame)
+        Args:
+            image_array: RGB numpy array
+        Returns:
+            list: (face_location, encoding_array) pairs, empty if no faces
+        """
+        face_recognition = load_face_recognition()
+        face_locations = face_recognition.face_locations(
+            image_array, model=self.model
+        )
+        if not face_locations:
+            return []
+
+        face_encodings = face_recognition.face_encodings(
+            image_array, face_locations, model='large'
+        )
+        return list(zip(face_locations, face_encodings))
+
     def recognize_face(self, image_path_or_array, location=None):
         """
         Recognize a face from an image
@@ -73,17 +113,20 @@ class FaceRecognitionService:
             dict: Recognition result with user, confidence, success status
         """
         start_time = time.time()
+        audit_image = None if isinstance(image_path_or_array, str) else image_path_or_array
+        face_location = None
         
         try:
             # Extract face encoding from input image
-            encoding, success, error, proc_time = self.encode_face_from_image(
+            encoding, face_location, success, error, proc_time = self._encode_single_face(
                 image_path_or_array
             )
             
             if not success:
                 self._log_recognition_attempt(
                     None, 'no_face' if 'No face' in error else 'failed',
-                    None, location, error, proc_time
+                    None, location, error, proc_time,
+                    audit_image, face_location
                 )
                 return {
                     'success': False,
@@ -92,13 +135,14 @@ class FaceRecognitionService:
                     'confidence': None
                 }
             
-            # Get all stored face encodings
-            stored_encodings = FaceEncoding.objects.filter(is_active=True)
+            # Match against the cached gallery of stored encodings
+            gallery = get_gallery()
             
-            if not stored_encodings.exists():
+            if not len(gallery):
                 self._log_recognition_attempt(
                     None, 'unknown_person', None, location,
-                    "No registered users found", proc_time
+                    "No registered users found", proc_time,
+                    audit_image, face_location
                 )
                 return {
                     'success': False,
@@ -107,41 +151,30 @@ class FaceRecognitionService:
                     'confidence': None
                 }
             
-            # Compare with stored encodings
-            best_match = None
-            best_distance = float('inf')
-            
-            for stored in stored_encodings:
-                stored_encoding = np.array(stored.get_encoding())
-                
-                # Calculate face distance
-                distance = face_recognition.face_distance(
-                    [stored_encoding], encoding
-                )[0]
-                
-                if distance < best_distance:
-                    best_distance = distance
-                    best_match = stored
+            user_id, best_distance = gallery.match(encoding)
             
             # Check if best match is within tolerance
             confidence = 1 - best_distance
             processing_time = time.time() - start_time
             
-            if best_distance <= self.tolerance:
+            if user_id is not None:
+                user = User.objects.get(pk=user_id)
                 self._log_recognition_attempt(
-                    best_match.user, 'success', confidence,
-                    location, None, processing_time
+                    user, 'success', confidence,
+                    location, None, processing_time,
+                    audit_image, face_location
                 )
                 return {
                     'success': True,
-                    'user': best_match.user,
+                    'user': user,
                     'confidence': confidence,
                     'error': None
                 }
             else:
                 self._log_recognition_attempt(
                     None, 'unknown_person', confidence,
-                    location, "Face not recognized", processing_time
+                    location, "Face not recognized", processing_time,
+                    audit_image, face_location
                 )
                 return {
                     'success': False,
@@ -153,7 +186,8 @@ class FaceRecognitionService:
         except Exception as e:
             processing_time = time.time() - start_time
             self._log_recognition_attempt(
-                None, 'failed', None, location, str(e), processing_time
+                None, 'failed', None, location, str(e), processing_time,
+                audit_image, face_location
             )
             return {
                 'success': False,
@@ -196,10 +230,61 @@ class FaceRecognitionService:
             
         except Exception as e:
             return False, str(e)
+
+    def register_user_face_from_upload(self, user, image_file):
+        """
+        Register a user's face from an uploaded image, reusing the encoding
+        of any byte-identical image enrolled before
+        Args:
+            user: User instance
+            image_file: Django uploaded file
+        Returns:
+            tuple: (success_boolean, error_message)
+        """
+        try:
+            data = read_upload(image_file)
+            digest = content_hash(data)
+
+            face_image = FaceImage.objects.filter(content_hash=digest).first()
+            if face_image is None:
+                image_array = self.preprocess_image(io.BytesIO(data))
+                encoding, success, error, proc_time = self.encode_face_from_image(
+                    image_array
+                )
+
+                if not success:
+                    return False, error
+
+                image_data, extension = stored_image(data)
+                face_image, created = FaceImage.objects.get_or_create(
+                    content_hash=digest,
+                    defaults={
+                        'encoding_data': json.dumps(encoding.tolist()),
+                        'image_path': store_image(image_data, digest, extension),
+                    }
+                )
+
+            face_encoding, created = FaceEncoding.objects.get_or_create(
+                user=user,
+                defaults={
+                    'confidence_threshold': self.tolerance,
+                    'is_active': True
+                }
+            )
+
+            face_encoding.encoding_data = face_image.encoding_data
+            face_encoding.image_path = face_image.image_path
+            face_encoding.save()
+
+            return True, None
+
+        except Exception as e:
+            return False, str(e)
     
-    def _log_recognition_attempt(self, user, status, confidence, location, error, processing_time):
-        """Log face recognition attempt"""
-        FaceRecognitionLog.objects.create(
+    def _log_recognition_attempt(self, user, status, confidence, location, error, processing_time,
+                                 audit_image=None, face_location=None):
+        """Log face recognition attempt, handing the image to the audit writer if enabled"""
+        log = FaceRecognitionLog.objects.create(
             user=user,
             status=status,
             confidence_score=confidence,
@@ -207,6 +292,12 @@ class FaceRecognitionService:
             error_message=error,
             processing_time=processing_time
         )
+
+        audit_writer = get_audit_writer()
+        if audit_writer is not None and audit_image is not None:
+            audit_writer.submit(log.pk, audit_image, face_location)
+
+        return log
     
     def preprocess_image(self, image_file):
         """
@@ -217,6 +308,9 @@ class FaceRecognitionService:
             numpy array of the processed image
         """
         try:
+            import numpy as np
+            from PIL import Image
+
             # Convert to PIL Image
             pil_image = Image.open(image_file)
             
@@ -240,6 +334,7 @@ class FaceRecognitionService:
                     new_width = int(new_height * aspect_ratio)
                 
                 # Resize using cv2
+                import cv2
                 image_array = cv2.resize(image_array, (new_width, new_height))
             
             return image_array
@@ -256,6 +351,7 @@ class FaceRecognitionService:
             dict: Face landmarks data
         """
         try:
+            face_recognition = load_face_recognition()
             if isinstance(image_path_or_array, str):
                 image = face_recognition.load_image_file(image_path_or_array)
             else:
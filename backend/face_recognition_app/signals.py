@@ -0,0 +1,10 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from .gallery import invalidate_gallery
+from .models import FaceEncoding
+
+
+@receiver([post_save, post_delete], sender=FaceEncoding)
+def face_encoding_changed(sender, instance, **kwargs):
+    """Reload the in-memory gallery after an encoding changes"""
+    invalidate_gallery()
@@ -0,0 +1,79 @@
+import io
+from datetime import datetime
+from unittest import mock
+from django.contrib.auth import get_user_model
+from django.test import SimpleTestCase, TestCase
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+from attendance.models import AttendanceRecord
+from . import warmup
+from .image_store import stored_image
+from .management.commands.ingest_video import Command as IngestVideoCommand
+
+User = get_user_model()
+
+
+class IngestVideoAttendanceTests(TestCase):
+    def test_ingested_attendance_shows_in_monthly_stats(self):
+        user = User.objects.create(username='filmed', email='filmed@example.com', user_type='employee')
+        recorded_at = timezone.make_aware(datetime(2026, 9, 14, 8, 0))
+        # user_id -> (first seen, last seen in seconds, frames seen, best face distance)
+        written = IngestVideoCommand()._write_attendance({user.id: (30, 3600, 12, 0.3)}, recorded_at, 'Gate')
+        self.assertEqual(written, 1)
+        record = AttendanceRecord.objects.get(user=user)
+        self.assertTrue(record.marked_by_face_recognition)
+
+        client = APIClient()
+        client.force_authenticate(user)
+        # A whole month is served from the monthly summaries
+        response = client.get(reverse('attendance-stats'), {'start_date': '2026-09-01', 'end_date': '2026-09-30'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['present_days'] + response.data['late_days'], 1)
+        self.assertEqual(response.data['absent_days'], 0)
+        self.assertEqual(response.data['total_hours_worked'], str(record.check_out_time - record.check_in_time))
+
+
+class WarmupForkTests(SimpleTestCase):
+    """A worker forked after warm-up started (gunicorn --preload) warms up itself"""
+
+    def setUp(self):
+        patcher = mock.patch.multiple(warmup, _warmup_thread=None, _warmup_pid=None)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_starts_once_per_process(self):
+        with mock.patch.object(warmup, 'warm_up') as warm_up:
+            first = warmup.start_warmup()
+            first.join()
+            self.assertIs(warmup.start_warmup(), first)
+            # The forked worker inherits the thread object, not the thread
+            with mock.patch('os.getpid', return_value=-1):
+                forked = warmup.start_warmup()
+            forked.join()
+        self.assertIsNot(forked, first)
+        self.assertEqual(warm_up.call_count, 2)
+
+
+class StoredImageTests(SimpleTestCase):
+    """Stored face images take their extension from the decoded format"""
+
+    def encode(self, format):
+        from PIL import Image
+
+        output = io.BytesIO()
+        Image.new('RGB', (8, 8), 'white').save(output, format=format)
+        return output.getvalue()
+
+    def test_keeps_jpeg_and_png(self):
+        for format, extension in (('JPEG', '.jpg'), ('PNG', '.png')):
+            data = self.encode(format)
+            self.assertEqual(stored_image(data), (data, extension))
+
+    def test_reencodes_other_formats_to_jpeg(self):
+        from PIL import Image
+
+        data, extension = stored_image(self.encode('BMP'))
+        self.assertEqual(extension, '.jpg')
+        self.assertEqual(Image.open(io.BytesIO(data)).format, 'JPEG')
+
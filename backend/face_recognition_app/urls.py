@@ -5,7 +5,8 @@ from .views import (
     register_face,
     recognize_face,
     recognition_stats,
-    delete_face_encoding
+    delete_face_encoding,
+    recognition_health
 )
 
 urlpatterns = [
@@ -15,4 +16,5 @@ urlpatterns = [
     path('recognize/', recognize_face, name='recognize-face'),
     path('stats/', recognition_stats, name='recognition-stats'),
     path('delete-encoding/<int:user_id>/', delete_face_encoding, name='delete-face-encoding'),
+    path('health/', recognition_health, name='recognition-health'),
 ]
\ No newline at end of file
@@ -1,8 +1,8 @@
 from rest_framework import generics, permissions, status
-from rest_framework.decorators import api_view, permission_classes
+from rest_framework.decorators import api_view, permission_classes, authentication_classes
 from rest_framework.response import Response
+from django.conf import settings
 from django.contrib.auth import get_user_model
-from django.utils import timezone
 from django.db import models
 from .models import FaceEncoding, FaceRecognitionLog
 from .serializers import (
@@ -12,8 +12,13 @@ from .serializers import (
     FaceRecognitionSerializer,
     FaceRecognitionResponseSerializer
 )
-from .services_basic import FaceRecognitionService
-from attendance.models import AttendanceRecord
+from .audit import get_audit_writer
+from .services import FaceRecognitionService
+from .warmup import start_warmup, warmup_state
+from attendance.archive import archived_log_summary
+from attendance.debounce import debounced_check, get_debouncer
+from attendance.services import ALREADY_CHECKED_OUT
+from attendance_system.pagination import KeysetPagination
 
 User = get_user_model()
 
@@ -36,12 +41,14 @@ class FaceRecognitionLogListView(generics.ListAPIView):
     queryset = FaceRecognitionLog.objects.all()
     serializer_class = FaceRecognitionLogSerializer
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = KeysetPagination
+    keyset_ordering = ('-timestamp', '-id')
     
     def get_queryset(self):
         # Admin can see all, users can only see their own
         if self.request.user.user_type == 'admin':
-            return FaceRecognitionLog.objects.all().order_by('-timestamp')
-        return FaceRecognitionLog.objects.filter(user=self.request.user)
+            return FaceRecognitionLog.objects.all().order_by(*self.keyset_ordering)
+        return FaceRecognitionLog.objects.filter(user=self.request.user).order_by(*self.keyset_ordering)
 
 
 @api_view(['POST'])
@@ -76,11 +83,8 @@ def register_face(request):
         # Initialize face recognition service
         face_service = FaceRecognitionService()
         
-        # Preprocess image
-        image_array = face_service.preprocess_image(image)
-        
-        # Register face
-        success, error = face_service.register_user_face(user, image_array)
+        # Register face (identical re-uploads skip detection and encoding)
+        success, error = face_service.register_user_face_from_upload(user, image)
         
         if success:
             return Response({
@@ -135,29 +139,17 @@ def recognize_face(request):
             from users.serializers import UserProfileSerializer
             response_data['user'] = UserProfileSerializer(user).data
             
-            # Optionally mark attendance
-            today = timezone.now().date()
-            attendance, created = AttendanceRecord.objects.get_or_create(
-                user=user,
-                date=today,
-                defaults={
-                    'check_in_time': timezone.now(),
-                    'status': 'present',
-                    'marked_by_face_recognition': True,
-                    'confidence_score': result['confidence'],
-                    'location': location
-                }
+            # Mark attendance: first scan checks in, second checks out;
+            # repeats within the cooldown get the last result without a write
+            attendance, action, suppressed = debounced_check(
+                user,
+                location=location,
+                marked_by_face_recognition=True,
+                confidence_score=result['confidence']
             )
             
-            if not created and not attendance.check_out_time:
-                # Update check-out time if this is a second scan
-                attendance.check_out_time = timezone.now()
-                attendance.save()
-                response_data['action'] = 'check_out'
-            else:
-                response_data['action'] = 'check_in'
-            
-            response_data['attendance_marked'] = True
+            response_data['action'] = action
+            response_data['attendance_marked'] = action != ALREADY_CHECKED_OUT and not suppressed
             
         return Response(response_data, status=status.HTTP_200_OK)
         
@@ -178,21 +170,30 @@ def recognition_stats(request):
             status=status.HTTP_403_FORBIDDEN
         )
     
-    # Get statistics
-    total_attempts = FaceRecognitionLog.objects.count()
-    successful = FaceRecognitionLog.objects.filter(status='success').count()
-    failed = FaceRecognitionLog.objects.filter(status='failed').count()
-    no_face = FaceRecognitionLog.objects.filter(status='no_face').count()
-    unknown_person = FaceRecognitionLog.objects.filter(status='unknown_person').count()
+    # Get statistics (archived logs are counted from the archive manifest)
+    archived_counts, archived_time, archived_timed = archived_log_summary()
+    total_attempts = FaceRecognitionLog.objects.count() + sum(archived_counts.values())
+    successful = FaceRecognitionLog.objects.filter(status='success').count() + archived_counts.get('success', 0)
+    failed = FaceRecognitionLog.objects.filter(status='failed').count() + archived_counts.get('failed', 0)
+    no_face = FaceRecognitionLog.objects.filter(status='no_face').count() + archived_counts.get('no_face', 0)
+    unknown_person = (
+        FaceRecognitionLog.objects.filter(status='unknown_person').count()
+        + archived_counts.get('unknown_person', 0)
+    )
     
     # Calculate success rate
     success_rate = (successful / total_attempts * 100) if total_attempts > 0 else 0
     
     # Get average processing time
     logs_with_time = FaceRecognitionLog.objects.filter(processing_time__isnull=False)
-    avg_processing_time = logs_with_time.aggregate(
-        avg_time=models.Avg('processing_time')
-    )['avg_time'] or 0
+    timing = logs_with_time.aggregate(
+        total_time=models.Sum('processing_time'), timed=models.Count('id')
+    )
+    timed = timing['timed'] + archived_timed
+    avg_processing_time = ((timing['total_time'] or 0) + archived_time) / timed if timed else 0
+    
+    audit_writer = get_audit_writer()
+    debouncer = get_debouncer()
     
     return Response({
         'total_attempts': total_attempts,
@@ -201,7 +202,9 @@ def recognition_stats(request):
         'no_face_detected': no_face,
         'unknown_person': unknown_person,
         'success_rate': round(success_rate, 2),
-        'average_processing_time': round(avg_processing_time, 3)
+        'average_processing_time': round(avg_processing_time, 3),
+        'audit_capture': dict(audit_writer.stats) if audit_writer else None,
+        'check_debounce': dict(debouncer.stats) if debouncer else None
     })
 
 
@@ -235,4 +238,25 @@ def delete_face_encoding(request, user_id):
         return Response(
             {'error': 'No face encoding found for this user'}, 
             status=status.HTTP_404_NOT_FOUND
-        )
\ No newline at end of file
+        )
+
+
+@api_view(['GET'])
+@authentication_classes([])
+@permission_classes([permissions.AllowAny])
+def recognition_health(request):
+    """Readiness probe: 503 until the face recognition models are warm"""
+    preload = getattr(settings, 'FACE_RECOGNITION_PRELOAD', False)
+    if not preload:
+        # Models load lazily on the first request; nothing to wait for
+        return Response({'status': 'lazy', 'ready': True}, status=status.HTTP_200_OK)
+    
+    # No-op once running here; starts it in workers forked after AppConfig.ready
+    start_warmup()
+    ready = warmup_state['status'] == 'ready'
+    return Response({
+        'status': warmup_state['status'],
+        'ready': ready,
+        'warmup_seconds': warmup_state['duration'],
+        'error': warmup_state['error']
+    }, status=status.HTTP_200_OK if ready else status.HTTP_503_SERVICE_UNAVAILABLE)
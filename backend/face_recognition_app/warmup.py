@@ -0,0 +1,69 @@
+import logging
+import os
+import threading
+import time
+from django.apps import apps
+from django.db import connection
+
+logger = logging.getLogger(__name__)
+
+# 'cold' until warm_up() starts, then 'warming' -> 'ready' or 'failed'
+warmup_state = {
+    'status': 'cold',
+    'error': None,
+    'duration': None,
+}
+_warmup_thread = None
+_warmup_pid = None  # process that started _warmup_thread
+_warmup_lock = threading.Lock()
+
+
+def warm_up():
+    """
+    Import the vision stack, load the detector, shape-predictor and encoder
+    models with a dummy inference, and load the face gallery
+    """
+    warmup_state.update(status='warming', error=None, duration=None)
+    start_time = time.time()
+    try:
+        import numpy as np
+        from .services import load_face_recognition
+
+        face_recognition = load_face_recognition()
+        dummy = np.zeros((100, 100, 3), dtype=np.uint8)
+        face_recognition.face_locations(dummy)
+        # Passing a known location forces the landmark and encoder models to run
+        face_recognition.face_encodings(dummy, [(10, 90, 90, 10)], model='large')
+
+        # The gallery needs the ORM, which is only usable once app loading has finished
+        while not apps.ready:
+            time.sleep(0.05)
+        from .gallery import get_gallery
+        gallery = get_gallery()
+
+        warmup_state.update(status='ready', duration=round(time.time() - start_time, 3))
+        logger.info(
+            "Face recognition warm-up finished in %.2fs (%d registered faces)",
+            warmup_state['duration'], len(gallery)
+        )
+    except Exception as e:
+        warmup_state.update(status='failed', error=str(e), duration=round(time.time() - start_time, 3))
+        logger.exception("Face recognition warm-up failed")
+    finally:
+        # This thread's connection is never reused
+        connection.close()
+
+
+def start_warmup():
+    """
+    Run warm_up() once per process on a background thread. Workers forked
+    from the process that started it (gunicorn --preload) inherit its state
+    but not the thread, so they start their own.
+    """
+    global _warmup_thread, _warmup_pid
+    with _warmup_lock:
+        if _warmup_thread is None or _warmup_pid != os.getpid():
+            _warmup_pid = os.getpid()
+            _warmup_thread = threading.Thread(target=warm_up, name='face-recognition-warmup', daemon=True)
+            _warmup_thread.start()
+    return _warmup_thread
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.7 on 2026-10-19 07:58
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('students', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='student',
+            index=models.Index(fields=['class_obj', 'section', 'roll_number'], name='student_roster_idx'),
+        ),
+    ]
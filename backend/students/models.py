@@ -206,6 +206,9 @@ class Student(models.Model):
         ]
         ordering = ['class_obj', 'section', 'roll_number']
         db_table = 'students'
+        indexes = [
+            models.Index(fields=['class_obj', 'section', 'roll_number'], name='student_roster_idx'),
+        ]
 
     def __str__(self):
         return f"{self.student_id} - {self.user.get_full_name()}"
@@ -0,0 +1,178 @@
+import base64
+from collections import defaultdict
+from datetime import timedelta
+from django.db.models import Count, F, FilteredRelation, Q, Window
+from django.db.models.functions import RowNumber
+from attendance.analytics import NO_RECORD, STATUS_CODES
+from attendance.archive import ATTENDANCE_TABLE, archived_status_counts, load_archived
+from attendance.models import AttendanceRecord
+from attendance.working_days import working_dates, working_days_between
+from .models import Student
+
+RECENT_RECORDS = 5
+
+
+def _roster_attendance(students, start_date, end_date, include_section=False):
+    """
+    Per-student attendance for a roster: present days come from one grouped
+    query and the latest records from one windowed query, whatever the
+    number of students
+    """
+    total_days = working_days_between(start_date, end_date)
+    in_period = Q(
+        user__attendance_records__date__range=[start_date, end_date],
+        user__attendance_records__status__in=['present', 'late']
+    )
+    rows = students.select_related('user', 'section').annotate(
+        present_days=Count('user__attendance_records', filter=in_period)
+    ).order_by('class_obj', 'section', 'roll_number')
+
+    recent = defaultdict(list)
+    records = AttendanceRecord.objects.filter(
+        user_id__in=students.values('user_id'),
+        date__range=[start_date, end_date]
+    ).annotate(
+        position=Window(RowNumber(), partition_by=[F('user_id')], order_by=F('date').desc())
+    ).filter(position__lte=RECENT_RECORDS).values(
+        'user_id', 'date', 'status', 'check_in_time', 'marked_by_face_recognition'
+    ).order_by('user_id', '-date')
+    for record in records:
+        recent[record.pop('user_id')].append(record)
+
+    archived = archived_status_counts(start_date, end_date)
+    attendance_data = []
+    for student in rows:
+        present_days = student.present_days
+        if student.user_id in archived:
+            present_days += archived[student.user_id]['present_days'] + archived[student.user_id]['late_days']
+        percentage = (present_days / total_days * 100) if total_days > 0 else 0
+
+        item = {
+            'student_id': student.student_id,
+            'student_name': student.full_name,
+            'roll_number': student.roll_number,
+        }
+        if include_section:
+            item['section'] = student.section.name
+        item.update({
+            'present_days': present_days,
+            'total_days': total_days,
+            'attendance_percentage': round(percentage, 2),
+            'recent_records': recent.get(student.user_id, []),
+        })
+        attendance_data.append(item)
+    return attendance_data
+
+
+def build_class_report(class_obj, start_date, end_date):
+    """Attendance of every active student of a class for a date range"""
+    attendance_data = _roster_attendance(
+        Student.objects.filter(class_obj=class_obj, is_active=True),
+        start_date, end_date, include_section=True
+    )
+    return {
+        'class_info': {
+            'id': class_obj.id,
+            'name': class_obj.name,
+            'department': class_obj.department.name,
+            'total_students': len(attendance_data)
+        },
+        'period': {
+            'start_date': start_date,
+            'end_date': end_date
+        },
+        'students_attendance': attendance_data
+    }
+
+
+def build_section_report(section, start_date, end_date):
+    """Attendance of every active student of a section for a date range"""
+    attendance_data = _roster_attendance(
+        Student.objects.filter(section=section, is_active=True),
+        start_date, end_date
+    )
+    return {
+        'section_info': {
+            'id': section.id,
+            'name': section.name,
+            'class_name': section.class_obj.name,
+            'department': section.class_obj.department.name,
+            'total_students': len(attendance_data)
+        },
+        'period': {
+            'start_date': start_date,
+            'end_date': end_date
+        },
+        'students_attendance': attendance_data
+    }
+
+
+def build_attendance_matrix(students, start_date, end_date):
+    """
+    A roster's attendance as a students x days grid of 2-bit status codes.
+
+    The roster and its records come from one LEFT JOIN query. Cells are
+    packed row-major, four per byte, first cell in the high bits, and
+    base64 encoded: 1,000 students x 30 days is about 10 KB of text.
+    """
+    import numpy as np
+
+    rows = students.annotate(
+        period_records=FilteredRelation(
+            'user__attendance_records',
+            condition=Q(user__attendance_records__date__range=[start_date, end_date])
+        )
+    ).order_by('section_id', 'roll_number', 'id').values_list(
+        'user_id', 'student_id', 'roll_number', 'period_records__date', 'period_records__status'
+    )
+
+    day_count = (end_date - start_date).days + 1
+    row_of = {}
+    student_ids = []
+    roll_numbers = []
+    cells = []
+    for user_id, student_id, roll_number, record_date, record_status in rows:
+        if user_id not in row_of:
+            row_of[user_id] = len(student_ids)
+            student_ids.append(student_id)
+            roll_numbers.append(roll_number)
+        if record_date is not None:
+            cells.append((row_of[user_id], (record_date - start_date).days, STATUS_CODES.get(record_status, NO_RECORD)))
+
+    codes = np.zeros((len(student_ids), day_count), dtype=np.uint8)
+    if cells:
+        cells = np.array(cells, dtype=np.int64)
+        codes[cells[:, 0], cells[:, 1]] = cells[:, 2]
+
+    archived = load_archived(ATTENDANCE_TABLE, start_date, end_date)
+    if archived is not None and row_of:
+        user_ids = np.array(list(row_of), dtype=np.int64)
+        keep = np.isin(archived['user_id'], user_ids)
+        student_rows = np.array([row_of[user_id] for user_id in archived['user_id'][keep].tolist()], dtype=np.int64)
+        days = (archived['date'][keep] - np.datetime64(start_date)).astype(np.int64)
+        statuses = np.array([STATUS_CODES.get(status, NO_RECORD) for status in archived['status'][keep]], dtype=np.uint8)
+        codes[student_rows, days] = statuses
+
+    flat = codes.ravel()
+    flat = np.concatenate([flat, np.zeros(-len(flat) % 4, dtype=np.uint8)]).reshape(-1, 4)
+    packed = (flat[:, 0] << 6) | (flat[:, 1] << 4) | (flat[:, 2] << 2) | flat[:, 3]
+
+    dates = [start_date + timedelta(days=offset) for offset in range(day_count)]
+    working = set(working_dates(start_date, end_date))
+    return {
+        'period': {
+            'start_date': start_date,
+            'end_date': end_date
+        },
+        'student_ids': student_ids,
+        'roll_numbers': roll_numbers,
+        'dates': dates,
+        'non_working_days': [index for index, day in enumerate(dates) if day not in working],
+        'encoding': {
+            'bits_per_cell': 2,
+            'order': 'row-major, first cell in the high bits',
+            'codes': {NO_RECORD: None, **{code: status for status, code in STATUS_CODES.items()}}
+        },
+        'matrix': base64.b64encode(packed.astype(np.uint8).tobytes()).decode()
+    }
+
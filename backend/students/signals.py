@@ -1,7 +1,8 @@
 from django.db.models.signals import post_save, post_delete
 from django.dispatch import receiver
 from django.contrib.auth import get_user_model
-from .models import Student
+from attendance.working_days import invalidate_calendars
+from .models import AcademicYear, Student
 
 User = get_user_model()
 
@@ -30,4 +31,11 @@ def update_counts_on_delete(sender, instance, **kwargs):
     if instance.section:
         instance.section.update_student_count()
     if instance.class_obj:
-        instance.class_obj.update_student_count()
\ No newline at end of file
+        instance.class_obj.update_student_count()
+
+
+@receiver(post_save, sender=AcademicYear)
+@receiver(post_delete, sender=AcademicYear)
+def refresh_working_day_calendars(sender, instance, **kwargs):
+    """Academic year dates changed: rebuild the working-day calendars on next use"""
+    invalidate_calendars()
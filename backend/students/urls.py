@@ -9,6 +9,7 @@ from .views import (
     dashboard_stats,
     attendance_by_class,
     attendance_by_section,
+    attendance_matrix,
     student_search
 )
 
@@ -34,4 +35,5 @@ urlpatterns = [
     path('dashboard/stats/', dashboard_stats, name='dashboard-stats'),
     path('attendance/class/<int:class_id>/', attendance_by_class, name='attendance-by-class'),
     path('attendance/section/<int:section_id>/', attendance_by_section, name='attendance-by-section'),
+    path('attendance/matrix/', attendance_matrix, name='attendance-matrix'),
 ]
\ No newline at end of file
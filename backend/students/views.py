@@ -5,9 +5,10 @@ from django.contrib.auth import get_user_model
 from django.utils import timezone
 from django.db.models import Count, Q, Case, When, IntegerField, FloatField
 from django.db.models.functions import Cast
-from datetime import datetime, date
+from datetime import datetime, date, timedelta
 from django_filters.rest_framework import DjangoFilterBackend
 
+from .reports import build_class_report, build_section_report, build_attendance_matrix
 from .models import (
     AcademicYear, Department, Class, Section, Student, 
     Subject, ClassSubject
@@ -18,7 +19,8 @@ from .serializers import (
     SubjectSerializer, ClassSubjectSerializer, AttendanceByClassSerializer,
     AttendanceBySectionSerializer, DashboardStatsSerializer
 )
-from attendance.models import AttendanceRecord
+from attendance.services import present_user_ids
+from attendance_system.pagination import KeysetPagination
 
 User = get_user_model()
 
@@ -107,6 +109,9 @@ class StudentListCreateView(generics.ListCreateAPIView):
     filterset_fields = ['class_obj', 'section', 'gender', 'is_active']
     search_fields = ['student_id', 'roll_number', 'user__first_name', 'user__last_name', 'user__email']
     ordering_fields = ['student_id', 'roll_number', 'admission_date', 'created_at']
+    pagination_class = KeysetPagination
+    # Grouped by class and section as before, keyed on indexed columns
+    keyset_ordering = ('class_obj_id', 'section_id', 'roll_number', 'id')
     
     def get_serializer_class(self):
         if self.request.method == 'POST':
@@ -134,7 +139,7 @@ class StudentListCreateView(generics.ListCreateAPIView):
             except Student.DoesNotExist:
                 queryset = queryset.none()
         
-        return queryset.order_by('class_obj', 'section', 'roll_number')
+        return queryset.order_by(*self.keyset_ordering)
     
     def perform_create(self, serializer):
         if self.request.user.user_type not in ['admin', 'employee']:
@@ -180,9 +185,9 @@ def dashboard_stats(request):
     total_sections = Section.objects.filter(is_active=True).count()
     total_departments = Department.objects.filter(is_active=True).count()
     
-    # Today's attendance
-    today_attendance = AttendanceRecord.objects.filter(date=today)
-    present_today = today_attendance.filter(status__in=['present', 'late']).count()
+    # Today's attendance (includes check-ins not yet group-committed)
+    present_ids = present_user_ids(today)
+    present_today = len(present_ids)
     absent_today = total_students - present_today
     
     overall_attendance_percentage = (present_today / total_students * 100) if total_students > 0 else 0
@@ -194,10 +199,9 @@ def dashboard_stats(request):
         total_class_students = students_in_class.count()
         
         if total_class_students > 0:
-            present_in_class = today_attendance.filter(
-                user__in=[s.user for s in students_in_class],
-                status__in=['present', 'late']
-            ).count()
+            present_in_class = len(present_ids.intersection(
+                students_in_class.values_list('user_id', flat=True)
+            ))
             
             absent_in_class = total_class_students - present_in_class
             class_percentage = (present_in_class / total_class_students * 100)
@@ -219,10 +223,9 @@ def dashboard_stats(request):
         total_section_students = students_in_section.count()
         
         if total_section_students > 0:
-            present_in_section = today_attendance.filter(
-                user__in=[s.user for s in students_in_section],
-                status__in=['present', 'late']
-            ).count()
+            present_in_section = len(present_ids.intersection(
+                students_in_section.values_list('user_id', flat=True)
+            ))
             
             absent_in_section = total_section_students - present_in_section
             section_percentage = (present_in_section / total_section_students * 100)
@@ -282,51 +285,7 @@ def attendance_by_class(request, class_id):
     else:
         end_date = datetime.strptime(end_date, '%Y-%m-%d').date()
     
-    students = Student.objects.filter(class_obj=class_obj, is_active=True)
-    attendance_data = []
-    
-    for student in students:
-        attendance_records = AttendanceRecord.objects.filter(
-            user=student.user,
-            date__range=[start_date, end_date]
-        )
-        
-        present_days = attendance_records.filter(status__in=['present', 'late']).count()
-        total_days = (end_date - start_date).days + 1
-        percentage = (present_days / total_days * 100) if total_days > 0 else 0
-        
-        attendance_data.append({
-            'student_id': student.student_id,
-            'student_name': student.full_name,
-            'roll_number': student.roll_number,
-            'section': student.section.name,
-            'present_days': present_days,
-            'total_days': total_days,
-            'attendance_percentage': round(percentage, 2),
-            'recent_records': [
-                {
-                    'date': record.date,
-                    'status': record.status,
-                    'check_in_time': record.check_in_time,
-                    'marked_by_face_recognition': record.marked_by_face_recognition
-                }
-                for record in attendance_records.order_by('-date')[:5]
-            ]
-        })
-    
-    return Response({
-        'class_info': {
-            'id': class_obj.id,
-            'name': class_obj.name,
-            'department': class_obj.department.name,
-            'total_students': len(attendance_data)
-        },
-        'period': {
-            'start_date': start_date,
-            'end_date': end_date
-        },
-        'students_attendance': attendance_data
-    })
+    return Response(build_class_report(class_obj, start_date, end_date))
 
 
 @api_view(['GET'])
@@ -360,51 +319,56 @@ def attendance_by_section(request, section_id):
     else:
         end_date = datetime.strptime(end_date, '%Y-%m-%d').date()
     
-    students = Student.objects.filter(section=section, is_active=True)
-    attendance_data = []
+    return Response(build_section_report(section, start_date, end_date))
+
+
+@api_view(['GET'])
+@permission_classes([permissions.IsAuthenticated])
+def attendance_matrix(request):
+    """A class's or section's month as a packed students x days status matrix"""
+    section_id = request.query_params.get('section_id')
+    class_id = request.query_params.get('class_id')
+    if bool(section_id) == bool(class_id):
+        return Response(
+            {'error': 'Pass exactly one of section_id or class_id'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    
+    try:
+        month = request.query_params.get('month')
+        start_date = datetime.strptime(month, '%Y-%m').date() if month else timezone.now().date().replace(day=1)
+    except ValueError:
+        return Response(
+            {'error': 'Invalid month format. Use YYYY-MM'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    end_date = (start_date.replace(day=28) + timedelta(days=4)).replace(day=1) - timedelta(days=1)
     
-    for student in students:
-        attendance_records = AttendanceRecord.objects.filter(
-            user=student.user,
-            date__range=[start_date, end_date]
+    if section_id:
+        try:
+            section = Section.objects.select_related('class_obj').get(id=section_id, is_active=True)
+        except (Section.DoesNotExist, ValueError):
+            return Response({'error': 'Section not found'}, status=status.HTTP_404_NOT_FOUND)
+        allowed = request.user.id in (section.section_teacher_id, section.class_obj.class_teacher_id)
+        students = Student.objects.filter(section=section, is_active=True)
+        scope = {'type': 'section', 'id': section.id, 'name': section.name}
+    else:
+        try:
+            class_obj = Class.objects.get(id=class_id, is_active=True)
+        except (Class.DoesNotExist, ValueError):
+            return Response({'error': 'Class not found'}, status=status.HTTP_404_NOT_FOUND)
+        allowed = request.user.id == class_obj.class_teacher_id
+        students = Student.objects.filter(class_obj=class_obj, is_active=True)
+        scope = {'type': 'class', 'id': class_obj.id, 'name': class_obj.name}
+    
+    # Check permissions
+    if request.user.user_type not in ['admin'] and not allowed:
+        return Response(
+            {'error': 'Access denied'}, 
+            status=status.HTTP_403_FORBIDDEN
         )
-        
-        present_days = attendance_records.filter(status__in=['present', 'late']).count()
-        total_days = (end_date - start_date).days + 1
-        percentage = (present_days / total_days * 100) if total_days > 0 else 0
-        
-        attendance_data.append({
-            'student_id': student.student_id,
-            'student_name': student.full_name,
-            'roll_number': student.roll_number,
-            'present_days': present_days,
-            'total_days': total_days,
-            'attendance_percentage': round(percentage, 2),
-            'recent_records': [
-                {
-                    'date': record.date,
-                    'status': record.status,
-                    'check_in_time': record.check_in_time,
-                    'marked_by_face_recognition': record.marked_by_face_recognition
-                }
-                for record in attendance_records.order_by('-date')[:5]
-            ]
-        })
     
-    return Response({
-        'section_info': {
-            'id': section.id,
-            'name': section.name,
-            'class_name': section.class_obj.name,
-            'department': section.class_obj.department.name,
-            'total_students': len(attendance_data)
-        },
-        'period': {
-            'start_date': start_date,
-            'end_date': end_date
-        },
-        'students_attendance': attendance_data
-    })
+    return Response({'scope': scope, **build_attendance_matrix(students, start_date, end_date)})
 
 
 @api_view(['GET'])
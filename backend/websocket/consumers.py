@@ -5,7 +5,7 @@ from channels.db import database_sync_to_async
 from django.contrib.auth import get_user_model
 from django.utils import timezone
 from students.models import Student, Class, Section
-from attendance.models import AttendanceRecord
+from attendance.services import day_records, present_user_ids
 
 User = get_user_model()
 
@@ -122,9 +122,9 @@ class DashboardConsumer(AsyncWebsocketConsumer):
         total_classes = Class.objects.filter(is_active=True).count()
         total_sections = Section.objects.filter(is_active=True).count()
         
-        # Today's attendance
-        today_attendance = AttendanceRecord.objects.filter(date=today)
-        present_today = today_attendance.filter(status__in=['present', 'late']).count()
+        # Today's attendance (includes check-ins not yet group-committed)
+        present_ids = present_user_ids(today)
+        present_today = len(present_ids)
         absent_today = total_students - present_today
         
         overall_percentage = (present_today / total_students * 100) if total_students > 0 else 0
@@ -136,10 +136,9 @@ class DashboardConsumer(AsyncWebsocketConsumer):
             total_class_students = students_in_class.count()
             
             if total_class_students > 0:
-                present_in_class = today_attendance.filter(
-                    user__in=[s.user for s in students_in_class],
-                    status__in=['present', 'late']
-                ).count()
+                present_in_class = len(present_ids.intersection(
+                    students_in_class.values_list('user_id', flat=True)
+                ))
                 
                 class_percentage = (present_in_class / total_class_students * 100)
                 
@@ -173,17 +172,15 @@ class DashboardConsumer(AsyncWebsocketConsumer):
         
         today = timezone.now().date()
         students = Student.objects.filter(class_obj=class_obj, is_active=True)
+        records = day_records(today, [student.user_id for student in students])
         
         attendance_data = []
         for student in students:
-            try:
-                today_record = AttendanceRecord.objects.get(
-                    user=student.user, 
-                    date=today
-                )
+            today_record = records.get(student.user_id)
+            if today_record is not None:
                 status = today_record.status
                 check_in_time = today_record.check_in_time.strftime('%H:%M') if today_record.check_in_time else None
-            except AttendanceRecord.DoesNotExist:
+            else:
                 status = 'absent'
                 check_in_time = None
             
@@ -216,17 +213,15 @@ class DashboardConsumer(AsyncWebsocketConsumer):
         
         today = timezone.now().date()
         students = Student.objects.filter(section=section, is_active=True)
+        records = day_records(today, [student.user_id for student in students])
         
         attendance_data = []
         for student in students:
-            try:
-                today_record = AttendanceRecord.objects.get(
-                    user=student.user, 
-                    date=today
-                )
+            today_record = records.get(student.user_id)
+            if today_record is not None:
                 status = today_record.status
                 check_in_time = today_record.check_in_time.strftime('%H:%M') if today_record.check_in_time else None
-            except AttendanceRecord.DoesNotExist:
+            else:
                 status = 'absent'
                 check_in_time = None
             
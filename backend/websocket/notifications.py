@@ -0,0 +1,25 @@
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+def send_group_messages(messages):
+    """
+    Send {group_name: event} messages over the channel layer.
+
+    Fails soft: real-time updates are best effort, so a missing or
+    unreachable channel layer (e.g. Redis not running) is logged and ignored.
+    """
+    try:
+        from asgiref.sync import async_to_sync
+        from channels.layers import get_channel_layer
+
+        channel_layer = get_channel_layer()
+        if channel_layer is None:
+            return False
+        for group, event in messages.items():
+            async_to_sync(channel_layer.group_send)(group, event)
+        return True
+    except Exception:
+        logger.warning("Could not send real-time update to %s", ', '.join(messages), exc_info=True)
+        return False